@@ -0,0 +1,123 @@
+"""Shared fixtures for benchmarks.
+
+The stub LLM server's behaviour can be tuned with environment variables:
+``BENCH_STUB_LATENCY`` (seconds before the first token, default 0) and
+``BENCH_STUB_TOKENS_PER_SECOND`` (simulated generation rate, default
+unlimited).
+
+LLM traffic can instead come from a cassette: ``BENCH_LLM_CASSETTE`` replays
+the given file (``BENCH_REPLAY_LATENCY`` scales the recorded latencies,
+default 1), or records to it with ``BENCH_LLM_CASSETTE_MODE=record``.
+``BENCH_LLM_MODEL`` sends live requests to that model's provider instead of
+the stub server, for recording real traffic.
+"""
+
+import os
+
+# Avoid litellm fetching its model cost map over the network on import
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from typing import Optional
+
+import pytest
+from homework_generator.cassettes import Cassette
+from homework_generator.llm_client import LLMClient
+from homework_generator.models import Assignment
+from .stub_server import StubLLMServer
+
+STUB_MODEL = "openai/stub"
+BENCH_MODEL = os.getenv("BENCH_LLM_MODEL", STUB_MODEL)
+
+
+def make_assignments(count: int, questions_per_assignment: int) -> list:
+    """Build synthetic assignments for benchmarking."""
+    return [
+        Assignment(
+            title=f"Assignment {i}: Fractions & Decimals",
+            grade_level="5th Grade",
+            subject="Mathematics",
+            difficulty="Medium",
+            estimated_time="20 minutes",
+            instructions="Solve each problem. Show <all> your work.",
+            questions=[
+                f"Question {j}: What is {j}/{j + 1} + 1/2?"
+                for j in range(questions_per_assignment)
+            ],
+            materials_needed=["pencil", "paper"],
+            learning_objectives=["Add fractions with unlike denominators"],
+        )
+        for i in range(count)
+    ]
+
+
+def weasyprint_available() -> bool:
+    """Return whether WeasyPrint and its native libraries can be loaded."""
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+requires_weasyprint = pytest.mark.skipif(
+    not weasyprint_available(), reason="WeasyPrint native libraries not available"
+)
+
+
+@pytest.fixture
+def assignment_factory():
+    """Factory fixture returning synthetic assignments."""
+    return make_assignments
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    """Local OpenAI-compatible server shared by the benchmark session."""
+    tokens_per_second = os.getenv("BENCH_STUB_TOKENS_PER_SECOND")
+    server = StubLLMServer(
+        latency=float(os.getenv("BENCH_STUB_LATENCY", "0")),
+        tokens_per_second=float(tokens_per_second) if tokens_per_second else None,
+    )
+    with server:
+        yield server
+
+
+def bench_cassette() -> Optional[Cassette]:
+    """Open the cassette named by ``BENCH_LLM_CASSETTE``, if any."""
+    path = os.getenv("BENCH_LLM_CASSETTE")
+    if not path:
+        return None
+    return Cassette(
+        path,
+        mode=os.getenv("BENCH_LLM_CASSETTE_MODE", "replay"),
+        latency_scale=float(os.getenv("BENCH_REPLAY_LATENCY", "1")),
+    )
+
+
+def bench_llm_config(stub_server) -> str:
+    """The ``llm`` section of a CLI config matching :func:`stub_client`."""
+    lines = ["llm:"]
+    if BENCH_MODEL == STUB_MODEL:
+        lines += [f"  base_url: {stub_server.url}", "  api_key: stub"]
+    path = os.getenv("BENCH_LLM_CASSETTE")
+    if path:
+        lines += [
+            f"  cassette: {path}",
+            f"  cassette_mode: {os.getenv('BENCH_LLM_CASSETTE_MODE', 'replay')}",
+            f"  replay_latency: {os.getenv('BENCH_REPLAY_LATENCY', '1')}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def stub_client(stub_server):
+    """Uncached LLM client pointed at the stub server or a cassette."""
+    if BENCH_MODEL != STUB_MODEL:
+        return LLMClient(BENCH_MODEL, cache_enabled=False, cassette=bench_cassette())
+    return LLMClient(
+        STUB_MODEL,
+        cache_enabled=False,
+        api_key="stub",
+        base_url=stub_server.url,
+        cassette=bench_cassette(),
+    )
@@ -0,0 +1,255 @@
+"""Local OpenAI-compatible stub LLM server for benchmarks.
+
+The server answers ``POST /v1/chat/completions`` with a schema-valid
+assignments payload sized from the prompt ("creating N ... assignments"),
+after a configurable fixed latency and a simulated token generation rate.
+Both plain and ``stream=True`` (server-sent events) responses are supported.
+
+Run standalone to point the CLI at it::
+
+    python -m benchmarks.stub_server --port 8765 --latency 0.5 --tokens-per-second 400
+    homework-gen "fractions" --model openai/stub --config stub.yaml
+
+where ``stub.yaml`` sets ``llm.base_url: http://127.0.0.1:8765/v1`` and
+``llm.api_key: stub``.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+COUNT_PATTERN = re.compile(r"creating (\d+)")
+ANSWER_KEY_MARKER = "ANSWER KEY:"
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_CHARS = 64
+
+
+def build_assignments_payload(
+    count: int, questions_per_assignment: int = 10, answers: bool = False
+) -> str:
+    """Build a schema-valid assignments response with ``count`` assignments.
+
+    With ``answers`` each assignment also carries an answer per question, as
+    when the prompt requests an answer key.
+    """
+    assignments = [
+        {
+            "title": f"Practice Set {i + 1}",
+            "grade_level": "5th Grade",
+            "subject": "Mathematics",
+            "difficulty": "Medium",
+            "estimated_time": "20 minutes",
+            "instructions": "Solve each problem and show your work.",
+            "questions": [
+                f"What is {i + j} + {j * 3}?" for j in range(questions_per_assignment)
+            ],
+            "materials_needed": ["pencil", "paper"],
+            "learning_objectives": ["Practice multi-digit addition"],
+        }
+        for i in range(count)
+    ]
+    if answers:
+        for i, assignment in enumerate(assignments):
+            assignment["answers"] = [
+                str(i + j + j * 3) for j in range(questions_per_assignment)
+            ]
+    return json.dumps({"assignments": assignments})
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class StubLLMServer:
+    """Threaded OpenAI-compatible server with simulated latency.
+
+    Args:
+        latency: Seconds to wait before the first token
+        tokens_per_second: Simulated generation rate; ``None`` means instant
+        questions_per_assignment: Questions in each generated assignment
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        tokens_per_second: Optional[float] = None,
+        questions_per_assignment: int = 10,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.questions_per_assignment = questions_per_assignment
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as the OpenAI ``api_base``."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _generation_delay(self, tokens: int) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return tokens / self.tokens_per_second
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.request_count += 1
+
+                prompt = "".join(
+                    message.get("content") or ""
+                    for message in request.get("messages", [])
+                )
+                match = COUNT_PATTERN.search(prompt)
+                count = int(match.group(1)) if match else 1
+                content = build_assignments_payload(
+                    count,
+                    server.questions_per_assignment,
+                    answers=ANSWER_KEY_MARKER in prompt,
+                )
+                usage = {
+                    "prompt_tokens": _count_tokens(prompt),
+                    "completion_tokens": _count_tokens(content),
+                    "total_tokens": _count_tokens(prompt) + _count_tokens(content),
+                }
+                model = request.get("model", "stub")
+
+                time.sleep(server.latency)
+                if request.get("stream"):
+                    self._stream(model, content, usage)
+                else:
+                    time.sleep(server._generation_delay(usage["completion_tokens"]))
+                    self._send_json(
+                        {
+                            "id": "chatcmpl-stub",
+                            "object": "chat.completion",
+                            "created": int(time.time()),
+                            "model": model,
+                            "choices": [
+                                {
+                                    "index": 0,
+                                    "message": {
+                                        "role": "assistant",
+                                        "content": content,
+                                    },
+                                    "finish_reason": "stop",
+                                }
+                            ],
+                            "usage": usage,
+                        }
+                    )
+
+            def _send_json(self, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, model: str, content: str, usage: dict):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                chunks: List[str] = [
+                    content[i : i + STREAM_CHUNK_CHARS]
+                    for i in range(0, len(content), STREAM_CHUNK_CHARS)
+                ]
+                delay = server._generation_delay(
+                    _count_tokens(STREAM_CHUNK_CHARS * "x")
+                )
+                for index, chunk in enumerate(chunks):
+                    if index:
+                        time.sleep(delay)
+                    self._send_event(model, {"content": chunk}, None)
+                self._send_event(model, {}, "stop", usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _send_event(self, model, delta, finish_reason, usage=None):
+                payload = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+                if usage:
+                    payload["usage"] = usage
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    args = parser.parse_args()
+
+    server = StubLLMServer(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Stub LLM server listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmarks for HTML and Markdown formatting.
+
+Run with ``pytest benchmarks/`` (requires pytest-benchmark).
+"""
+
+import io
+import time
+import tracemalloc
+import pytest
+from homework_generator.formatter import AssignmentFormatter
+from homework_generator.html_builder import HTMLBuilder
+from .conftest import make_assignments
+
+QUESTION_COUNTS = [100, 1000, 5000]
+
+
+@pytest.fixture(scope="module")
+def formatter():
+    return AssignmentFormatter()
+
+
+@pytest.mark.parametrize("questions", QUESTION_COUNTS)
+def test_format_assignment_basic(benchmark, formatter, questions):
+    """Fallback HTML formatter over a single long assignment."""
+    (assignment,) = make_assignments(1, questions)
+    html = benchmark(formatter._format_assignment_basic, assignment)
+    assert html.count("<li>") >= questions
+
+
+@pytest.mark.parametrize("questions", QUESTION_COUNTS)
+def test_format_to_markdown(benchmark, formatter, questions):
+    """Markdown formatter over a single long assignment."""
+    (assignment,) = make_assignments(1, questions)
+    md = benchmark(formatter.format_to_markdown, assignment)
+    assert f"{questions}. " in md
+
+
+@pytest.mark.parametrize("questions", QUESTION_COUNTS)
+def test_question_list(benchmark, questions):
+    """Escaped question list, as used by PDFGenerator._format_questions_html."""
+    items = [f"Is {i} < {i + 1}?" for i in range(questions)]
+    html = benchmark(lambda: HTMLBuilder().list("ol", items).build())
+    assert html.count("<li>") == questions
+
+
+def _best_of(func, arg, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_basic_formatter_scales_linearly(formatter):
+    """10x more questions should cost roughly 10x, not 100x."""
+    (small,) = make_assignments(1, 2000)
+    (large,) = make_assignments(1, 20000)
+
+    ratio = _best_of(formatter._format_assignment_basic, large) / _best_of(
+        formatter._format_assignment_basic, small
+    )
+
+    assert ratio < 30
+
+
+PACKET_SIZES = [50, 500]
+
+
+@pytest.mark.parametrize("count", PACKET_SIZES)
+def test_format_packet(benchmark, formatter, count):
+    """Full packet materialized as one string."""
+    assignments = make_assignments(count, 20)
+    html = benchmark(formatter.format_packet, assignments)
+    assert html.count('<div class="assignment">') == count
+
+
+@pytest.mark.parametrize("count", PACKET_SIZES)
+def test_write_packet_html(benchmark, formatter, count):
+    """Full packet streamed into a sink."""
+    assignments = make_assignments(count, 20)
+    benchmark(formatter.write_packet_html, assignments, io.StringIO())
+
+
+def _peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_peak_memory_is_flat(formatter):
+    """Streaming 500 assignments should not hold the whole document."""
+    assignments = make_assignments(500, 20)
+
+    class NullWriter:
+        def write(self, fragment):
+            pass
+
+    streamed = _peak_memory(
+        lambda: formatter.write_packet_html(iter(assignments), NullWriter())
+    )
+    joined = _peak_memory(lambda: formatter.format_packet(assignments))
+
+    assert streamed * 5 < joined
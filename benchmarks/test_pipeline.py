@@ -0,0 +1,228 @@
+"""End-to-end throughput benchmarks against the stub LLM server.
+
+Covers each pipeline stage (generate, validate, format, render) and full
+CLI runs across packet sizes and concurrency levels. Save results for
+trend tracking with ``pytest benchmarks/ --benchmark-json=results.json``.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from click.testing import CliRunner
+from homework_generator import metrics
+from homework_generator.content_generator import ContentGenerator
+from homework_generator.drills import DrillGenerator
+from homework_generator.question_bank import QuestionBank
+from homework_generator.formatter import AssignmentFormatter
+from homework_generator.llm_client import LLMClient
+from .conftest import (
+    BENCH_MODEL,
+    bench_llm_config,
+    make_assignments,
+    requires_weasyprint,
+)
+from .stub_server import build_assignments_payload
+
+PACKET_SIZES = [1, 10, 100, 500]
+RENDER_SIZES = [1, 10, 50]
+THEMES = ["classroom", "fast"]
+OUTPUT_OPTIONS = {
+    "default": {},
+    "uncompressed": {"compress": False},
+    "full_fonts": {"subset_fonts": False},
+    "optimized_images": {"optimize_images": True, "jpeg_quality": 80, "dpi": 150},
+    "pdf_a": {"pdf_variant": "pdf/a-3b"},
+}
+CONCURRENCY_LEVELS = [1, 4, 16]
+
+
+def _generate(client: LLMClient, count: int):
+    return ContentGenerator(client).generate_assignments(
+        topic="fractions",
+        count=count,
+        difficulty="medium",
+        grade_level="5th Grade",
+        template="math",
+    )
+
+
+@pytest.mark.parametrize("count", PACKET_SIZES)
+def test_generate(benchmark, stub_client, count):
+    """Prompt build, stub round-trip, validation and model construction."""
+    benchmark.extra_info["assignments"] = count
+    assignments = benchmark.pedantic(
+        _generate, args=(stub_client, count), rounds=5, warmup_rounds=1
+    )
+    assert len(assignments) == count
+
+
+@pytest.mark.parametrize("count", PACKET_SIZES)
+def test_validate(benchmark, stub_client, count):
+    """JSON parsing and schema validation of a raw response."""
+    benchmark.extra_info["assignments"] = count
+    generator = ContentGenerator(stub_client)
+    payload = build_assignments_payload(count)
+
+    data = benchmark(generator._validate_response, payload)
+    assert len(data["assignments"]) == count
+
+
+@pytest.mark.parametrize("count", PACKET_SIZES)
+def test_format(benchmark, count):
+    """Packet HTML formatting."""
+    benchmark.extra_info["assignments"] = count
+    formatter = AssignmentFormatter()
+    assignments = make_assignments(count, 10)
+
+    html = benchmark(formatter.format_packet, assignments)
+    assert html.count('<div class="assignment">') == count
+
+
+@requires_weasyprint
+@pytest.mark.parametrize("count", RENDER_SIZES)
+def test_render(benchmark, tmp_path, count):
+    """WeasyPrint layout and PDF write."""
+    from homework_generator.pdf_generator import PDFGenerator
+
+    benchmark.extra_info["assignments"] = count
+    formatter = AssignmentFormatter()
+    generator = PDFGenerator()
+    assignments = make_assignments(count, 10)
+    output_path = tmp_path / "packet.pdf"
+
+    benchmark.pedantic(
+        lambda: generator.generate_pdf_from_fragments(
+            formatter.iter_packet_html(assignments), output_path
+        ),
+        rounds=3,
+    )
+    benchmark.extra_info["bytes"] = output_path.stat().st_size
+    assert output_path.stat().st_size > 0
+
+
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_drill_generate(benchmark, count):
+    """Drill worksheets generated locally, with no LLM requests."""
+    generator = DrillGenerator(seed=0)
+    sheets = benchmark(generator.generate, "arithmetic", count, "medium", "6th Grade")
+    assert len(sheets) == count
+    benchmark.extra_info["count"] = count
+    if benchmark.stats:  # None with --benchmark-disable
+        benchmark.extra_info["worksheets_per_second"] = (
+            count / benchmark.stats.stats.mean
+        )
+
+
+@pytest.mark.parametrize("count", [10, 100])
+def test_bank_assemble(benchmark, tmp_path, count):
+    """Packets assembled from a 5000-assignment question bank, no LLM calls."""
+    bank = QuestionBank(tmp_path / "bank.db")
+    topics = ["fractions", "decimals", "geometry", "ratios", "algebra"]
+    for topic in topics:
+        assignments = [
+            a.model_copy(update={"title": f"{topic}: {a.title}"})
+            for a in make_assignments(1000, 10)
+        ]
+        bank.add(assignments, topic, "5th Grade", "medium")
+    assert len(bank) == 5000
+
+    assignments = benchmark(
+        bank.search, "fractions", "5th Grade", "medium", limit=count
+    )
+    assert len(assignments) == count
+    bank.close()
+
+
+@requires_weasyprint
+@pytest.mark.parametrize("theme", THEMES)
+def test_render_theme(benchmark, tmp_path, theme):
+    """Pages per second for each PDF theme on a 50-assignment packet."""
+    from homework_generator.pdf_generator import PDFGenerator
+
+    formatter = AssignmentFormatter(theme=theme)
+    generator = PDFGenerator(theme=theme)
+    assignments = make_assignments(50, 10)
+    output_path = tmp_path / "packet.pdf"
+
+    def render():
+        generator.generate_pdf_from_fragments(
+            formatter.iter_packet_html(assignments), output_path
+        )
+
+    with metrics.collect() as run:
+        render()
+    pages = next(r["pages"] for r in run.records if r["stage"] == "pdf_layout")
+
+    benchmark.pedantic(render, rounds=3)
+    benchmark.extra_info["theme"] = theme
+    benchmark.extra_info["pages"] = pages
+    if benchmark.stats:  # None with --benchmark-disable
+        benchmark.extra_info["pages_per_second"] = pages / benchmark.stats.stats.mean
+
+
+@requires_weasyprint
+@pytest.mark.parametrize("preset", OUTPUT_OPTIONS)
+def test_render_output_options(benchmark, tmp_path, preset):
+    """Render time versus output size for PDF output options."""
+    from homework_generator.pdf_generator import PDFGenerator
+
+    formatter = AssignmentFormatter()
+    generator = PDFGenerator(**OUTPUT_OPTIONS[preset])
+    assignments = make_assignments(10, 10)
+    output_path = tmp_path / "packet.pdf"
+
+    benchmark.pedantic(
+        lambda: generator.generate_pdf_from_fragments(
+            formatter.iter_packet_html(assignments), output_path
+        ),
+        rounds=3,
+    )
+    benchmark.extra_info["preset"] = preset
+    benchmark.extra_info["bytes"] = output_path.stat().st_size
+
+
+@pytest.mark.parametrize("concurrency", CONCURRENCY_LEVELS)
+def test_generate_concurrent(benchmark, stub_client, concurrency):
+    """Independent 5-assignment jobs issued from a thread pool."""
+    jobs = concurrency * 2
+    benchmark.extra_info["concurrency"] = concurrency
+    benchmark.extra_info["jobs"] = jobs
+
+    def run():
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(lambda _: _generate(stub_client, 5), range(jobs)))
+
+    results = benchmark.pedantic(run, rounds=3)
+    assert all(len(assignments) == 5 for assignments in results)
+
+
+@requires_weasyprint
+@pytest.mark.parametrize("count", [1, 10, 100])
+def test_cli_full_run(benchmark, stub_server, tmp_path, count):
+    """Complete ``homework-gen`` invocation writing a PDF."""
+    from homework_generator.cli import main
+
+    benchmark.extra_info["assignments"] = count
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(bench_llm_config(stub_server))
+    output_path = tmp_path / "packet.pdf"
+    runner = CliRunner()
+
+    def run():
+        return runner.invoke(
+            main,
+            [
+                "fractions",
+                "--count",
+                str(count),
+                "--model",
+                BENCH_MODEL,
+                "--config",
+                str(config_path),
+                "--output",
+                str(output_path),
+            ],
+        )
+
+    result = benchmark.pedantic(run, rounds=3)
+    assert result.exit_code == 0, result.output
+    assert output_path.exists()
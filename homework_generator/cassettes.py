@@ -0,0 +1,194 @@
+"""Record and replay of LLM traffic.
+
+In ``record`` mode every completion the LLM client receives is appended to
+a cassette, a JSON-lines file, with its token counts and timing. In
+``replay`` mode requests are answered from the cassette instead of the
+network, so the CLI and benchmarks run offline and deterministically.
+Replay can wait for the recorded latency, scaled by ``latency_scale``, to
+reproduce production-like throughput; the default serves responses
+immediately.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+CASSETTE_MODES = ("record", "replay")
+
+# Request parameters that don't affect the response
+_CONNECTION_PARAMS = frozenset(
+    {"api_base", "api_key", "timeout", "stream", "stream_options"}
+)
+
+
+class CassetteMiss(LookupError):
+    """A replayed request has no recorded response."""
+
+
+class Interaction(BaseModel):
+    """One recorded request and its response."""
+
+    key: str = Field(..., description="Hash identifying the request")
+    model: str = Field(..., description="Model the request was sent to")
+    messages: List[Dict[str, Any]] = Field(..., description="Chat messages sent")
+    params: Dict[str, Any] = Field(
+        default_factory=dict, description="Generation parameters sent"
+    )
+    content: str = Field(..., description="Response text")
+    finish_reason: Optional[str] = Field(
+        default=None, description="Why the provider stopped generating"
+    )
+    tokens_in: Optional[int] = Field(default=None, description="Prompt tokens")
+    tokens_out: Optional[int] = Field(default=None, description="Completion tokens")
+    latency: float = Field(..., description="Seconds the request took")
+    ttft: Optional[float] = Field(
+        default=None, description="Seconds to the first streamed token"
+    )
+    recorded_at: str = Field(..., description="ISO timestamp of the recording")
+
+
+def request_key(
+    model: str, messages: List[Dict[str, Any]], params: Dict[str, Any]
+) -> str:
+    """Identify a request by what determines its response.
+
+    Connection details (endpoint URL, API key, timeouts, streaming) are
+    left out, so a cassette replays regardless of where it was recorded.
+    """
+    data = {
+        "model": model,
+        "messages": messages,
+        "params": _generation_params(params),
+    }
+    content = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _generation_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in params.items() if k not in _CONNECTION_PARAMS}
+
+
+class Cassette:
+    """A cassette file opened for recording or replay.
+
+    Args:
+        path: Cassette file; appended to when recording, read when replaying
+        mode: ``record`` or ``replay``
+        latency_scale: On replay, wait this multiple of each recorded
+            latency before answering (0 answers immediately)
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        mode: str = "replay",
+        latency_scale: float = 0.0,
+    ):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(
+                f"Unknown cassette mode '{mode}'. "
+                f"Available: {', '.join(CASSETTE_MODES)}"
+            )
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Interaction]] = {}
+        self._served: Dict[str, int] = {}
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._interactions.values())
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = Interaction.model_validate_json(line)
+                    self._interactions.setdefault(interaction.key, []).append(
+                        interaction
+                    )
+
+    def replay(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        params: Dict[str, Any],
+        info: Dict[str, Any],
+    ) -> Tuple[str, Optional[str]]:
+        """Answer a request from the cassette.
+
+        Requests recorded more than once get their responses in recorded
+        order, cycling when they run out. Token counts and time to first
+        token go into ``info`` like for a live request.
+
+        Returns:
+            The response text and finish reason
+
+        Raises:
+            CassetteMiss: If the request was never recorded
+        """
+        key = request_key(model, messages, params)
+        with self._lock:
+            entries = self._interactions.get(key)
+            if not entries:
+                raise CassetteMiss(
+                    f"No recorded response for this {model} request in "
+                    f"{self.path}; record the cassette again"
+                )
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+        interaction = entries[index % len(entries)]
+
+        if self.latency_scale > 0:
+            time.sleep(interaction.latency * self.latency_scale)
+        for field in ("tokens_in", "tokens_out"):
+            value = getattr(interaction, field)
+            if value is not None:
+                info[field] = value
+        if interaction.ttft is not None:
+            info["ttft"] = interaction.ttft * self.latency_scale
+        return interaction.content, interaction.finish_reason
+
+    def record(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        params: Dict[str, Any],
+        content: str,
+        finish_reason: Optional[str],
+        info: Dict[str, Any],
+        latency: float,
+    ) -> None:
+        """Append a completed request to the cassette file."""
+        interaction = Interaction(
+            key=request_key(model, messages, params),
+            model=model,
+            messages=messages,
+            params=_generation_params(params),
+            content=content,
+            finish_reason=finish_reason,
+            tokens_in=info.get("tokens_in"),
+            tokens_out=info.get("tokens_out"),
+            latency=latency,
+            ttft=info.get("ttft"),
+            recorded_at=datetime.now().isoformat(),
+        )
+        line = interaction.model_dump_json() + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Appended per request so a crashed run keeps what it recorded
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._interactions.setdefault(interaction.key, []).append(interaction)
@@ -6,16 +6,36 @@ with progress bars, error handling, and verbose output options.
 
 import click
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional
 from rich.console import Console
 from rich.progress import Progress
+from rich.table import Table
 from datetime import datetime
 
+from . import metrics, retries, tracing
 from .config import load_config
 from .llm_client import LLMClient
 from .content_generator import ContentGenerator
+from .drills import DRILL_TEMPLATE
 from .formatter import AssignmentFormatter
-from .pdf_generator import PDFGenerator
+from .question_bank import QuestionBank
+from .versions import PacketVersion, plan_versions
+from .output import (
+    OUTPUT_FORMATS,
+    answer_key_path,
+    build_packet,
+    read_class_list,
+    variant_path,
+    version_path,
+    write_class_set,
+    write_packet,
+)
+
+if TYPE_CHECKING:
+    from .profiling import ProfileReport
+
+# Assignments generated when neither --count nor the template sets a number
+DEFAULT_COUNT = 5
 
 # Global console for rich output
 console = Console()
@@ -26,9 +46,9 @@ console = Console()
 @click.option(
     "--count",
     "-c",
-    default=5,
-    show_default=True,
-    help="Number of assignments to generate",
+    type=int,
+    help="Number of assignments to generate  [default: the template's "
+    f"default_count, or {DEFAULT_COUNT}]",
 )
 @click.option(
     "--difficulty",
@@ -49,7 +69,20 @@ console = Console()
     "--output",
     "-o",
     type=click.Path(),
-    help="Output PDF file path (auto-generated if not specified)",
+    help="Output file path (auto-generated if not specified)",
+)
+@click.option(
+    "--format",
+    "output_format",
+    default="pdf",
+    show_default=True,
+    type=click.Choice(list(OUTPUT_FORMATS), case_sensitive=False),
+    help="Output format; html, md and json skip PDF rendering",
+)
+@click.option(
+    "--answer-key",
+    is_flag=True,
+    help="Also write an answer key (requested in the same LLM call)",
 )
 @click.option(
     "--model",
@@ -65,6 +98,45 @@ console = Console()
     show_default=True,
     help="Prompt template to use. Available: math, science, english, social_studies, computer_science, art, music, health, etc. Use --list-templates to see all options.",
 )
+@click.option(
+    "--drills",
+    is_flag=True,
+    help="Generate arithmetic, fraction and decimal drill sheets locally "
+    "(same as --template math_drills)",
+)
+@click.option(
+    "--variants",
+    type=click.IntRange(min=1),
+    help="Write this many versions of the packet with different values in "
+    "each question (OUTPUT_v1, OUTPUT_v2, ...), from one LLM call",
+)
+@click.option(
+    "--shuffle",
+    type=click.IntRange(min=2),
+    help="Write this many versions of one packet with the assignments and "
+    "questions in a different order (OUTPUT_A, OUTPUT_B, ...), without extra "
+    "LLM calls",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Seed for --variants and --shuffle; the same seed gives the same "
+    "versions",
+)
+@click.option(
+    "--class-list",
+    type=click.Path(exists=True, dir_okay=False),
+    help="CSV of student names (and optional IDs): write one PDF copy per "
+    "student with their name in the page header, rendered once",
+)
+@click.option(
+    "--from-bank",
+    is_flag=True,
+    help="Assemble the packet from previously generated assignments in the "
+    "question bank, generating only what it lacks",
+)
 @click.option(
     "--config", type=click.Path(exists=True), help="Path to configuration file"
 )
@@ -79,17 +151,61 @@ console = Console()
     is_flag=True,
     help="List all available prompt templates and exit",
 )
+@click.option(
+    "--timings",
+    is_flag=True,
+    help="Print per-stage timings and token counts after the run",
+)
+@click.option(
+    "--metrics-out",
+    type=click.Path(dir_okay=False),
+    help="Append per-stage metrics to this file as JSON lines",
+)
+@click.option(
+    "--trace-out",
+    type=click.Path(dir_okay=False),
+    help="Append tracing spans to this file as JSON lines",
+)
+@click.option(
+    "--record-llm",
+    type=click.Path(dir_okay=False),
+    help="Record LLM requests and responses to this cassette file",
+)
+@click.option(
+    "--replay-llm",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Answer LLM requests from this cassette instead of the network",
+)
+@click.option(
+    "--replay-latency",
+    type=click.FloatRange(min=0),
+    help="With --replay-llm, wait this multiple of each recorded latency",
+)
 def main(
     topic: Optional[str],
-    count: int,
+    count: Optional[int],
     difficulty: str,
     grade_level: str,
     output: Optional[str],
+    output_format: str,
+    answer_key: bool,
     model: str,
     template: str,
+    drills: bool,
+    variants: Optional[int],
+    shuffle: Optional[int],
+    seed: int,
+    from_bank: bool,
+    class_list: Optional[str],
     config: Optional[str],
     verbose: bool,
     list_templates: bool,
+    timings: bool,
+    metrics_out: Optional[str],
+    trace_out: Optional[str],
+    record_llm: Optional[str],
+    replay_llm: Optional[str],
+    replay_latency: Optional[float],
 ) -> None:
     """Generate homework packets using AI.
 
@@ -112,6 +228,7 @@ def main(
       homework-gen "algebra basics" --count 3 --difficulty easy --grade-level "8th Grade"
       homework-gen "cell biology" --grade-level "7th Grade" --verbose
       homework-gen "creative writing prompts" --grade-level "3rd Grade" --output stories.pdf
+      homework-gen "fractions" --format json --output fractions.json
     """
     if list_templates:
         # List available templates and exit
@@ -121,8 +238,14 @@ def main(
         
         console.print("[bold green]Available Prompt Templates:[/bold green]")
         console.print()
-        for template_name in sorted(templates):
-            console.print(f"  [blue]{template_name}[/blue]")
+        for template_name in templates:
+            info = template_manager.get_template_info(template_name)
+            if info and info.description:
+                console.print(
+                    f"  [blue]{template_name}[/blue] [dim]- {info.description}[/dim]"
+                )
+            else:
+                console.print(f"  [blue]{template_name}[/blue]")
         console.print()
         console.print("[dim]Use with: homework-gen \"topic\" --template TEMPLATE_NAME --grade-level \"Grade\"[/dim]")
         return
@@ -130,10 +253,29 @@ def main(
     if not topic:
         raise click.ClickException("TOPIC is required when not using --list-templates")
 
-    if verbose:
-        console.print(
-            f"[bold green]📚 Generating {count} {difficulty} assignments on: {topic}"
-        )
+    if record_llm and replay_llm:
+        raise click.ClickException("Use only one of --record-llm and --replay-llm")
+
+    if variants and from_bank:
+        raise click.ClickException("Use only one of --variants and --from-bank")
+
+    if variants and shuffle:
+        raise click.ClickException("Use only one of --variants and --shuffle")
+
+    output_format = output_format.lower()
+    students = []
+    if class_list:
+        if output_format != "pdf":
+            raise click.ClickException("--class-list requires PDF output")
+        if variants:
+            raise click.ClickException("Use only one of --variants and --class-list")
+        if shuffle:
+            raise click.ClickException("Use only one of --shuffle and --class-list")
+        students = read_class_list(Path(class_list))
+        if not students:
+            raise click.ClickException(f"No students found in {class_list}")
+    if drills:
+        template = DRILL_TEMPLATE
 
     try:
         # Load configuration
@@ -152,74 +294,215 @@ def main(
                 c for c in topic if c.isalnum() or c in (" ", "-", "_")
             ).rstrip()
             safe_topic = safe_topic.replace(" ", "_")[:30]  # Limit length
-            output = f"homework_packet_{safe_topic}_{timestamp}.pdf"
+            output = (
+                f"homework_packet_{safe_topic}_{timestamp}"
+                f"{OUTPUT_FORMATS[output_format]}"
+            )
 
         output_path = Path(output)
 
+        if record_llm or replay_llm:
+            app_config.llm.cassette = record_llm or replay_llm
+            app_config.llm.cassette_mode = "record" if record_llm else "replay"
+        if replay_latency is not None:
+            app_config.llm.replay_latency = replay_latency
+
         # Initialize components
-        llm_client = LLMClient(
-            api_key=app_config.llm.api_key,
+        llm_client = LLMClient.from_config(
+            app_config.llm,
             model=model,
-            base_url=app_config.llm.base_url,
+            # Streaming lets us measure time to first token
+            stream=bool(timings or metrics_out),
         )
 
+        bank_path = app_config.generation.question_bank
+        if from_bank and not bank_path:
+            raise click.ClickException(
+                "--from-bank needs generation.question_bank in the configuration"
+            )
         content_generator = ContentGenerator(
-            llm_client=llm_client
+            llm_client=llm_client,
+            question_bank=QuestionBank(bank_path) if bank_path else None,
         )
+        if count is None:
+            template_info = content_generator.template_manager.get_template_info(
+                template
+            )
+            count = (template_info and template_info.default_count) or DEFAULT_COUNT
+
+        if verbose:
+            console.print(
+                f"[bold green]📚 Generating {count} {difficulty} assignments on: {topic}"
+            )
 
-        formatter = AssignmentFormatter(template_dir="templates")
-        pdf_generator = PDFGenerator(styles_path=Path("templates/styles.css"))
+        formatter = AssignmentFormatter(theme=app_config.pdf.theme)
 
         # Generate assignments with progress tracking
-        with Progress() as progress:
+        run_metrics = metrics.RunMetrics()
+        if trace_out:
+            tracing.enable(tracing.FileSpanExporter(trace_out))
+        with Progress() as progress, metrics.collect(run_metrics), tracing.span(
+            "cli.generate_packet"
+        ):
             # Generate content
             task1 = progress.add_task(
                 "[green]Generating assignment content...", total=1
             )
 
             try:
-                assignments = content_generator.generate_assignments(
-                    topic=topic,
-                    count=count,
-                    difficulty=difficulty,
-                    grade_level=grade_level,
-                    template=template,
-                )
+                with retries.deadline(app_config.llm.deadline):
+                    if variants:
+                        # One LLM call for templates, versions made locally
+                        versions = content_generator.generate_variants(
+                            topic=topic,
+                            count=count,
+                            difficulty=difficulty,
+                            grade_level=grade_level,
+                            variants=variants,
+                            template=template,
+                            include_answers=answer_key,
+                            seed=seed,
+                        )
+                        output_paths = [
+                            variant_path(output_path, i)
+                            for i in range(1, variants + 1)
+                        ]
+                    elif from_bank:
+                        versions = [
+                            content_generator.assemble_from_bank(
+                                topic=topic,
+                                count=count,
+                                difficulty=difficulty,
+                                grade_level=grade_level,
+                                template=template,
+                                include_answers=answer_key,
+                            )
+                        ]
+                        output_paths = [output_path]
+                    else:
+                        versions = [
+                            content_generator.generate_assignments(
+                                topic=topic,
+                                count=count,
+                                difficulty=difficulty,
+                                grade_level=grade_level,
+                                template=template,
+                                include_answers=answer_key,
+                            )
+                        ]
+                        output_paths = [output_path]
                 progress.update(task1, advance=1)
             except Exception as e:
                 raise click.ClickException(f"Failed to generate assignments: {e}")
 
+            assignments = versions[0]
             if not assignments:
                 raise click.ClickException("Failed to generate any assignments")
 
-            # Format assignments to HTML
-            task2 = progress.add_task("[green]Formatting assignments...", total=1)
-
-            combined_html = formatter.format_packet(assignments)
-
-            progress.update(task2, advance=1)
-
-            # Generate PDF
-            task3 = progress.add_task("[green]Generating PDF...", total=1)
-
-            pdf_generator.generate_pdf(
-                html_content=combined_html, output_path=output_path
-            )
-
-            progress.update(task3, advance=1)
+            orders: List[Optional[PacketVersion]] = [None] * len(versions)
+            if shuffle:
+                # Reordered copies of the one packet; formatted fragments
+                # are shared between them
+                planned = plan_versions(assignments, shuffle, seed=seed)
+                orders = list(planned)
+                versions = [assignments] * shuffle
+                output_paths = [
+                    version_path(output_path, order.label) for order in planned
+                ]
+
+            # Write the packet; only PDF output loads WeasyPrint
+            if output_format == "pdf":
+                label = "Generating PDF"
+            else:
+                label = f"Writing {output_format.upper()}"
+            task2 = progress.add_task(f"[green]{label}...", total=len(versions))
+
+            packets = []
+            for version, order, path in zip(versions, orders, output_paths):
+                packet = build_packet(version, topic, model)
+                packets.append(packet)
+                if students:
+                    copies = write_class_set(
+                        packet,
+                        path,
+                        students,
+                        formatter=formatter,
+                        pdf_config=app_config.pdf,
+                    )
+                else:
+                    write_packet(
+                        packet,
+                        path,
+                        output_format,
+                        formatter=formatter,
+                        pdf_config=app_config.pdf,
+                        version=order,
+                    )
+                progress.update(task2, advance=1)
+
+            # The answer key is rendered from the same response, so it costs
+            # no extra LLM call
+            if answer_key:
+                task3 = progress.add_task(
+                    "[green]Writing answer key...", total=len(packets)
+                )
+                for packet, order, path in zip(packets, orders, output_paths):
+                    write_packet(
+                        packet,
+                        answer_key_path(path),
+                        output_format,
+                        formatter=formatter,
+                        pdf_config=app_config.pdf,
+                        answer_key=True,
+                        version=order,
+                    )
+                    progress.update(task3, advance=1)
 
         # Success message
-        console.print(
-            f"[bold green]✓ Generated {len(assignments)} assignments in PDF: {output_path}"
-        )
+        if students:
+            written = copies
+            console.print(
+                f"[bold green]✓ Generated {len(assignments)} assignments in "
+                f"{len(copies)} student copies: {copies[0]} ... {copies[-1]}"
+            )
+        else:
+            written = output_paths
+            for path in output_paths:
+                console.print(
+                    f"[bold green]✓ Generated {len(assignments)} assignments in "
+                    f"{output_format.upper()}: {path}"
+                )
+        if answer_key:
+            for path in output_paths:
+                console.print(f"[bold green]✓ Answer key: {answer_key_path(path)}")
+            if not any(assignment.has_answers for assignment in assignments):
+                console.print(
+                    "[yellow]Warning: the model returned no answers; "
+                    "the answer key is empty.[/yellow]"
+                )
 
         if verbose:
-            console.print(f"Output file size: {output_path.stat().st_size} bytes")
+            for path in written:
+                console.print(f"Output file size: {path.stat().st_size} bytes")
             for i, assignment in enumerate(assignments, 1):
                 console.print(
                     f"Assignment {i}: {assignment.title} ({len(assignment.questions)} questions)"
                 )
 
+        if timings:
+            _print_timings(run_metrics)
+
+        if metrics_out:
+            with open(metrics_out, "a", encoding="utf-8") as f:
+                run_metrics.write_jsonl(
+                    f,
+                    topic=topic,
+                    model=model,
+                    count=count,
+                    format=output_format,
+                    output=str(output_path),
+                )
+
     except Exception as e:
         console.print(f"[bold red]Error: {e}")
         if verbose:
@@ -227,6 +510,166 @@ def main(
 
             console.print(traceback.format_exc())
         raise click.ClickException(str(e))
+    finally:
+        if trace_out:
+            tracing.disable()
+
+
+def _print_timings(run_metrics: metrics.RunMetrics) -> None:
+    """Print a per-stage timing summary table."""
+    table = Table(title="Stage timings")
+    table.add_column("Stage")
+    table.add_column("Calls", justify="right")
+    table.add_column("Time (s)", justify="right")
+    table.add_column("Details")
+
+    for entry in run_metrics.summary():
+        details = []
+        if "ttft" in entry:
+            details.append(f"first token {entry['ttft']:.3f}s")
+        if "tokens_in" in entry or "tokens_out" in entry:
+            details.append(
+                f"tokens {entry.get('tokens_in', '?')} in / "
+                f"{entry.get('tokens_out', '?')} out"
+            )
+        if "hits" in entry:
+            details.append(f"{entry['hits']} hit(s)")
+        if "bytes" in entry:
+            details.append(f"{entry['bytes'] / 1024:.1f} KiB written")
+        table.add_row(
+            entry["stage"],
+            str(entry["calls"]),
+            f"{entry['seconds']:.3f}",
+            ", ".join(details),
+        )
+
+    console.print(table)
+    console.print(
+        "[dim]HTML is formatted while the PDF parser reads it, so pdf_parse "
+        "includes html_format time.[/dim]"
+    )
+
+
+@click.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False),
+    help="Profile output path (default: INPUT.folded or INPUT.prof)",
+)
+@click.option(
+    "--pdf-out",
+    type=click.Path(dir_okay=False),
+    help="Where to write the rendered PDF (default: INPUT.pdf)",
+)
+@click.option(
+    "--mode",
+    default="sample",
+    show_default=True,
+    type=click.Choice(["sample", "cprofile"]),
+    help="Stack sampling (folded stacks) or cProfile (pstats)",
+)
+@click.option(
+    "--interval",
+    default=0.001,
+    show_default=True,
+    help="Sampling interval in seconds",
+)
+@click.option(
+    "--theme",
+    default="classroom",
+    show_default=True,
+    type=click.Choice(["classroom", "fast"]),
+    help="Packaged PDF theme to render with",
+)
+@click.option(
+    "--styles",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Stylesheet to render with instead of the packaged one",
+)
+@click.option(
+    "--top-pages",
+    default=5,
+    show_default=True,
+    help="Number of most expensive pages to list",
+)
+def profile(
+    input_file: str,
+    output: Optional[str],
+    pdf_out: Optional[str],
+    mode: str,
+    interval: float,
+    theme: str,
+    styles: Optional[str],
+    top_pages: int,
+) -> None:
+    """Profile rendering an HTML file or packet JSON to PDF.
+
+    Reports time per render phase and per page, and writes a profile:
+    folded stacks for flamegraph.pl or speedscope in ``sample`` mode, or a
+    pstats file for snakeviz or flameprof in ``cprofile`` mode.
+
+    \b
+    Examples:
+      homework-gen-profile packet.json
+      homework-gen-profile packet.html --mode cprofile -o render.prof
+    """
+    from . import profiling
+
+    input_path = Path(input_file)
+    profile_path = Path(output) if output else input_path.with_suffix(
+        ".folded" if mode == "sample" else ".prof"
+    )
+    pdf_path = Path(pdf_out) if pdf_out else input_path.with_suffix(".pdf")
+
+    try:
+        report = profiling.profile_render(
+            profiling.load_html_fragments(input_path, theme=theme),
+            pdf_path,
+            profile_path,
+            mode=mode,
+            interval=interval,
+            styles_path=Path(styles) if styles else None,
+            theme=theme,
+        )
+    except Exception as e:
+        raise click.ClickException(f"Failed to profile render: {e}")
+
+    _print_profile(report, top_pages)
+    console.print(f"[bold green]✓ Profile written to {report.profile_path}")
+
+
+def _print_profile(report: "ProfileReport", top_pages: int) -> None:
+    """Print phase and per-page tables for a profiling report."""
+    table = Table(title="Render phases")
+    table.add_column("Phase")
+    table.add_column("Time (s)", justify="right")
+    table.add_column("Share", justify="right")
+    for phase, seconds in report.phases.items():
+        share = seconds / report.total_seconds if report.total_seconds else 0.0
+        table.add_row(phase, f"{seconds:.3f}", f"{share:.0%}")
+    table.add_row("total", f"{report.total_seconds:.3f}", "")
+    console.print(table)
+
+    costs = report.page_costs()
+    if not costs:
+        return
+    console.print(
+        f"{report.pages} page(s), {sum(costs) / len(costs) * 1000:.1f} ms/page "
+        f"(layout + paint)"
+    )
+    pages = Table(title="Most expensive pages")
+    pages.add_column("Page", justify="right")
+    pages.add_column("Layout (ms)", justify="right")
+    pages.add_column("Paint (ms)", justify="right")
+    ranked = sorted(range(len(costs)), key=costs.__getitem__, reverse=True)
+    for index in ranked[:top_pages]:
+        layout = report.page_layout[index] if index < len(report.page_layout) else 0.0
+        paint = report.page_paint[index] if index < len(report.page_paint) else 0.0
+        pages.add_row(str(index + 1), f"{layout * 1000:.1f}", f"{paint * 1000:.1f}")
+    console.print(pages)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,12 +2,24 @@
 
 import os
 import yaml
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from pathlib import Path
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
 
+class LLMEndpoint(BaseModel):
+    """An additional endpoint requests can be balanced across."""
+
+    model: Optional[str] = Field(
+        default=None, description="Model to use (defaults to the run's model)"
+    )
+    api_key: Optional[str] = Field(
+        default=None, description="API key (defaults to the main api_key)"
+    )
+    base_url: Optional[str] = Field(default=None, description="Custom API base URL")
+
+
 class LLMConfig(BaseModel):
     """LLM-related configuration."""
 
@@ -17,6 +29,58 @@ class LLMConfig(BaseModel):
     local_models: List[str] = Field(
         default_factory=list, description="Available local models"
     )
+    endpoints: List[LLMEndpoint] = Field(
+        default_factory=list,
+        description="Additional endpoints to round-robin requests across",
+    )
+    balance_local_models: bool = Field(
+        default=False, description="Also balance requests across local_models"
+    )
+    hedge_percentile: Optional[float] = Field(
+        default=None,
+        gt=0,
+        lt=100,
+        description="Send a duplicate request once one is slower than this "
+        "percentile of recent requests",
+    )
+    breaker_failures: int = Field(
+        default=3, ge=1, description="Consecutive failures that disable an endpoint"
+    )
+    breaker_cooldown: float = Field(
+        default=30.0,
+        ge=0,
+        description="Seconds before a disabled endpoint is tried again",
+    )
+    max_continuations: int = Field(
+        default=2,
+        ge=0,
+        description="Follow-up requests to finish a response cut off by max_tokens",
+    )
+    max_attempts: int = Field(
+        default=3, ge=1, description="Attempts per request, for transient errors"
+    )
+    retry_base_delay: float = Field(
+        default=0.5, ge=0, description="Initial retry backoff in seconds"
+    )
+    retry_max_delay: float = Field(
+        default=10.0, ge=0, description="Maximum retry backoff in seconds"
+    )
+    deadline: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Seconds a generation job may take, retries included",
+    )
+    cassette: Optional[str] = Field(
+        default=None, description="Cassette file to record LLM traffic to or replay"
+    )
+    cassette_mode: Literal["record", "replay"] = Field(
+        default="replay", description="Whether to record or replay the cassette"
+    )
+    replay_latency: float = Field(
+        default=0.0,
+        ge=0,
+        description="Multiple of the recorded latency to wait on replay",
+    )
     
     def __init__(self, **data):
         # Handle environment variable substitution for api_key
@@ -28,18 +92,50 @@ class LLMConfig(BaseModel):
 class PDFConfig(BaseModel):
     """PDF generation configuration."""
 
-    theme: str = Field(default="classroom", description="PDF theme")
+    theme: str = Field(
+        default="classroom",
+        description="PDF theme: 'classroom', or 'fast' for high-volume print runs",
+    )
     font_family: str = Field(default="Arial", description="Font family")
     page_size: str = Field(default="letter", description="Page size")
+    subset_fonts: bool = Field(
+        default=True, description="Embed only the glyphs each PDF uses"
+    )
+    compress: bool = Field(default=True, description="Compress PDF content streams")
+    optimize_images: bool = Field(
+        default=False, description="Losslessly recompress embedded images"
+    )
+    jpeg_quality: Optional[int] = Field(
+        default=None, ge=0, le=95, description="Re-encode JPEG images at this quality"
+    )
+    dpi: Optional[int] = Field(
+        default=None, gt=0, description="Maximum resolution of embedded images"
+    )
+    pdf_variant: Optional[str] = Field(
+        default=None, description="PDF variant, e.g. 'pdf/a-3b' or 'pdf/ua-1'"
+    )
+    atomic_writes: bool = Field(
+        default=False,
+        description="Write PDFs to a temporary file and rename them into place",
+    )
 
 
 class GenerationConfig(BaseModel):
-    """Assignment generation configuration."""
+    """Assignment generation configuration.
+
+    The question bank is opt-in: set ``question_bank`` to a SQLite file path
+    to store every generated assignment there and enable ``--from-bank``.
+    """
 
     default_count: int = Field(default=5, description="Default number of assignments")
     default_difficulty: str = Field(
         default="medium", description="Default difficulty level"
     )
+    question_bank: Optional[str] = Field(
+        default=None,
+        description="SQLite file generated assignments are stored in; "
+        "unset disables the bank",
+    )
 
 
 class AppConfig(BaseSettings):
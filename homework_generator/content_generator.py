@@ -1,7 +1,8 @@
 """Content generation and assignment creation."""
 
 import json
-from typing import List, Dict, Any
+import math
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 try:
@@ -11,13 +12,62 @@ try:
 except ImportError:
     JSONSCHEMA_AVAILABLE = False
 
+from . import metrics, tracing
+from .drills import DrillGenerator, drill_kinds
 from .models import Assignment, HomeworkPacket
-from .llm_client import LLMClient
+from .llm_client import LLMClient, TruncatedResponse
 from .prompt_templates import PromptTemplateManager
+from .question_bank import QuestionBank
+from .question_templates import AssignmentTemplate
+
+# Appended to the prompt when an answer key is requested with the assignments
+ANSWERS_INSTRUCTION = """ANSWER KEY:
+For every assignment also include an "answers" array with exactly one answer
+per question, in the same order as "questions". Keep answers concise; for
+open-ended questions give a model answer or the key points expected."""
+
+# Replaces the output format when parameterized question templates are
+# requested instead of concrete questions
+QUESTION_TEMPLATES_INSTRUCTION = """QUESTION TEMPLATES:
+Write every question as a template so that many different versions can be
+generated from it. Put expressions over the question's variables in braces,
+like {a + b}, in the question "text" and in its "answer"; use {{ and }} for
+literal braces and an optional format spec for decimals, like {price * qty:.2f}.
+Declare every variable with either an integer or decimal range ("min", "max",
+optional "step" and "decimals") or a list of "choices". Add "constraints",
+expressions that must be true for a valid version (e.g. "a > b" so a
+difference is positive, or "a % b == 0" so a division is exact). Expressions
+may use + - * / // % **, comparisons, and, or, not, and the functions abs,
+round, min, max, gcd, lcm, sqrt, floor and ceil. Every answer must be
+computed from the variables, never written out as a fixed value."""
+
+# Rough output tokens per assignment by difficulty, and the factor an answer
+# key adds; used to size max_tokens so large packets are not cut off
+TOKENS_PER_ASSIGNMENT = {"easy": 400, "medium": 550, "hard": 700}
+ANSWERS_TOKEN_FACTOR = 1.75
+MIN_MAX_TOKENS = 1024
+
+
+def estimate_max_tokens(
+    count: int, difficulty: str, include_answers: bool = False
+) -> int:
+    """Estimate the output tokens needed for ``count`` assignments.
+
+    The estimate includes headroom for the JSON wrapper and for longer than
+    usual assignments; responses that still run over are continued by the
+    LLM client.
+    """
+    per_assignment = float(
+        TOKENS_PER_ASSIGNMENT.get(difficulty.lower(), TOKENS_PER_ASSIGNMENT["medium"])
+    )
+    if include_answers:
+        per_assignment *= ANSWERS_TOKEN_FACTOR
+    # Rounded up once, after all the scaling
+    return max(MIN_MAX_TOKENS, math.ceil(count * per_assignment * 1.25) + 200)
 
 
 # JSON Schema for validating LLM responses
-ASSIGNMENT_SCHEMA = {
+ASSIGNMENT_SCHEMA: Dict[str, Any] = {
     "$schema": "http://json-schema.org/draft-07/schema#",
     "type": "object",
     "properties": {
@@ -41,6 +91,7 @@ ASSIGNMENT_SCHEMA = {
                         "type": "array",
                         "items": {"type": "string"},
                     },
+                    "answers": {"type": "array", "items": {"type": "string"}},
                 },
                 "required": [
                     "title",
@@ -57,12 +108,88 @@ ASSIGNMENT_SCHEMA = {
 }
 
 
+# JSON Schema for validating question-template responses
+_VARIABLE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "min": {"type": "number"},
+        "max": {"type": "number"},
+        "step": {"type": "number"},
+        "decimals": {"type": "integer"},
+        "choices": {"type": "array", "items": {"type": ["string", "number"]}},
+    },
+    "required": ["name"],
+}
+QUESTION_TEMPLATE_SCHEMA: Dict[str, Any] = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "properties": {
+        "assignments": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    **ASSIGNMENT_SCHEMA["properties"]["assignments"]["items"][
+                        "properties"
+                    ],
+                    "questions": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "text": {"type": "string"},
+                                "answer": {"type": "string"},
+                                "variables": {
+                                    "type": "array",
+                                    "items": _VARIABLE_SCHEMA,
+                                },
+                                "constraints": {
+                                    "type": "array",
+                                    "items": {"type": "string"},
+                                },
+                            },
+                            "required": ["text", "answer", "variables"],
+                        },
+                    },
+                },
+                "required": ASSIGNMENT_SCHEMA["properties"]["assignments"]["items"][
+                    "required"
+                ],
+            },
+        }
+    },
+    "required": ["assignments"],
+}
+
+
 class ContentGenerator:
-    """Generates homework content using LLM."""
+    """Generates homework content using LLM.
+
+    Templates whose front-matter sets ``engine: drills`` (``math_drills``)
+    generate drill topics such as "fractions" or "multiplication" locally
+    with ``drill_generator`` and only call the LLM for other topics.
+
+    :meth:`generate_variants` asks the LLM once for parameterized question
+    templates and instantiates as many seeded versions as needed locally.
 
-    def __init__(self, llm_client: LLMClient):
+    With a ``question_bank`` every assignment the LLM generates is stored,
+    and :meth:`assemble_from_bank` builds packets from stored assignments.
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        drill_generator: Optional[DrillGenerator] = None,
+        question_bank: Optional[QuestionBank] = None,
+    ):
         self.llm_client = llm_client
         self.template_manager = PromptTemplateManager()
+        self.drill_generator = drill_generator or DrillGenerator()
+        self.question_bank = question_bank
+        # Parsed question templates by request, so repeated variant runs in
+        # the process neither call the LLM nor parse the response again
+        self._question_templates: Dict[tuple, List[AssignmentTemplate]] = {}
 
     def generate_assignments(
         self,
@@ -71,30 +198,142 @@ class ContentGenerator:
         difficulty: str,
         grade_level: str,
         template: str = "generic",
+        include_answers: bool = False,
     ) -> List[Assignment]:
-        """Generate assignments based on parameters."""
+        """Generate assignments based on parameters.
+
+        With ``include_answers`` the answer key is requested in the same LLM
+        call and returned in each assignment's ``answers``.
+
+        If the response is still cut off after the LLM client's
+        continuations, the complete assignments it contains are kept and
+        only the missing ones are requested again.
+        """
+        template_info = self.template_manager.get_template_info(template)
+        if template_info is not None and template_info.engine == "drills":
+            kinds = drill_kinds(topic, grade_level)
+            if kinds:
+                with metrics.stage("drill_generate"):
+                    return self.drill_generator.generate(
+                        topic=topic,
+                        count=count,
+                        difficulty=difficulty,
+                        grade_level=grade_level,
+                        kinds=kinds,
+                        include_answers=include_answers,
+                    )
 
         # Create the prompt using template
-        prompt = self._build_prompt(
-            template=template,
-            topic=topic,
-            count=count,
-            difficulty=difficulty,
-            grade_level=grade_level,
-        )
+        with metrics.stage("prompt_build"):
+            prompt = self._build_prompt(
+                template=template,
+                topic=topic,
+                count=count,
+                difficulty=difficulty,
+                grade_level=grade_level,
+                include_answers=include_answers,
+            )
 
         # Get response from LLM
-        response = self.llm_client.generate_response(prompt)
-
-        # Validate and parse response
-        validated_data = self._validate_response(response)
+        truncated = False
+        try:
+            response = self.llm_client.generate_response(
+                prompt,
+                max_tokens=estimate_max_tokens(count, difficulty, include_answers),
+            )
+        except TruncatedResponse as e:
+            response = e.content
+            truncated = True
+
+        # Validate and parse response, then convert to Assignment objects
+        salvaged = False
+        with metrics.stage("parse_validate") as info:
+            try:
+                assignments_data = self._validate_response(response)["assignments"]
+            except ValueError:
+                # Only a cut off response has complete assignments worth keeping
+                if not truncated:
+                    raise
+                assignments_data = self._salvage_assignments(response)
+                if not assignments_data:
+                    raise
+                salvaged = True
+                info["salvaged"] = len(assignments_data)
+                tracing.set_attribute("content.salvaged", len(assignments_data))
+
+            assignments = []
+            for assignment_data in assignments_data:
+                assignment = Assignment(**assignment_data)
+                assignments.append(assignment)
+
+        if self.question_bank is not None:
+            with metrics.stage("bank_store") as info:
+                info["added"] = self.question_bank.add(
+                    assignments,
+                    topic=topic,
+                    grade_level=grade_level,
+                    difficulty=difficulty,
+                    template=template,
+                )
+
+        if salvaged and len(assignments) < count:
+            # Each round keeps at least one assignment, so this terminates
+            assignments.extend(
+                self.generate_assignments(
+                    topic=topic,
+                    count=count - len(assignments),
+                    difficulty=difficulty,
+                    grade_level=grade_level,
+                    template=template,
+                    include_answers=include_answers,
+                )
+            )
 
-        # Convert to Assignment objects
-        assignments = []
-        for assignment_data in validated_data["assignments"]:
-            assignment = Assignment(**assignment_data)
-            assignments.append(assignment)
+        return assignments
 
+    def assemble_from_bank(
+        self,
+        topic: str,
+        count: int,
+        difficulty: str,
+        grade_level: str,
+        template: str = "generic",
+        include_answers: bool = False,
+    ) -> List[Assignment]:
+        """Assemble assignments from the question bank.
+
+        Only the assignments the bank can't supply are generated (and then
+        stored for next time).
+
+        Raises:
+            ValueError: If the generator has no question bank
+        """
+        if self.question_bank is None:
+            raise ValueError("No question bank configured")
+
+        with metrics.stage("bank_lookup") as info:
+            assignments = self.question_bank.search(
+                topic=topic,
+                grade_level=grade_level,
+                difficulty=difficulty,
+                template=template,
+                limit=count,
+                include_answers=include_answers,
+            )
+            info["found"] = len(assignments)
+        tracing.set_attribute("bank.found", len(assignments))
+
+        if len(assignments) < count:
+            assignments.extend(
+                self.generate_assignments(
+                    topic=topic,
+                    count=count - len(assignments),
+                    difficulty=difficulty,
+                    grade_level=grade_level,
+                    template=template,
+                    include_answers=include_answers,
+                )
+            )
         return assignments
 
     def generate_homework_packet(
@@ -104,6 +343,7 @@ class ContentGenerator:
         difficulty: str,
         grade_level: str,
         template: str = "generic",
+        include_answers: bool = False,
     ) -> HomeworkPacket:
         """Generate a complete homework packet."""
 
@@ -113,6 +353,7 @@ class ContentGenerator:
             difficulty=difficulty,
             grade_level=grade_level,
             template=template,
+            include_answers=include_answers,
         )
 
         packet = HomeworkPacket(
@@ -124,10 +365,116 @@ class ContentGenerator:
 
         return packet
 
+    def generate_variants(
+        self,
+        topic: str,
+        count: int,
+        difficulty: str,
+        grade_level: str,
+        variants: int,
+        template: str = "generic",
+        include_answers: bool = False,
+        seed: int = 0,
+    ) -> List[List[Assignment]]:
+        """Generate ``variants`` versions of ``count`` assignments.
+
+        Every version has the same assignments with different values in
+        their questions. The question templates cost one LLM call (cached
+        like any response); the versions are instantiated locally, and the
+        same ``seed`` gives the same versions.
+        """
+        templates = self.generate_question_templates(
+            topic=topic,
+            count=count,
+            difficulty=difficulty,
+            grade_level=grade_level,
+            template=template,
+        )
+        with metrics.stage("template_instantiate") as info:
+            info["variants"] = variants
+            return [
+                [
+                    assignment.instantiate(f"{seed}:{variant}", include_answers)
+                    for assignment in templates
+                ]
+                for variant in range(variants)
+            ]
+
+    def generate_question_templates(
+        self,
+        topic: str,
+        count: int,
+        difficulty: str,
+        grade_level: str,
+        template: str = "generic",
+    ) -> List[AssignmentTemplate]:
+        """Request ``count`` assignments as parameterized question templates.
+
+        Questions whose templates can't be instantiated are dropped, as are
+        assignments left without questions.
+
+        Raises:
+            ValueError: If the response contains no usable templates
+        """
+        key = (template, topic, count, difficulty, grade_level)
+        if key in self._question_templates:
+            return self._question_templates[key]
+
+        with metrics.stage("prompt_build"):
+            prompt = self._build_prompt(
+                template=template,
+                topic=topic,
+                count=count,
+                difficulty=difficulty,
+                grade_level=grade_level,
+                question_templates=True,
+            )
+
+        # Templates always carry their answer formulas
+        response = self.llm_client.generate_response(
+            prompt, max_tokens=estimate_max_tokens(count, difficulty, True)
+        )
+
+        with metrics.stage("parse_validate") as info:
+            data = self._validate_response(response, QUESTION_TEMPLATE_SCHEMA)
+            templates = []
+            dropped = 0
+            for item in data["assignments"]:
+                try:
+                    parsed = AssignmentTemplate.model_validate(item)
+                    usable = parsed.valid_questions()
+                except (TypeError, ValueError):
+                    dropped += len(item.get("questions") or [1])
+                    continue
+                dropped += len(parsed.questions) - len(usable.questions)
+                if usable.questions:
+                    templates.append(usable)
+            info["dropped_questions"] = dropped
+            tracing.set_attribute("content.dropped_questions", dropped)
+
+        if not templates:
+            raise ValueError("Response contains no usable question templates")
+
+        self._question_templates[key] = templates
+        return templates
+
+    @tracing.traced("content.build_prompt")
     def _build_prompt(
-        self, template: str, topic: str, count: int, difficulty: str, grade_level: str
+        self,
+        template: str,
+        topic: str,
+        count: int,
+        difficulty: str,
+        grade_level: str,
+        include_answers: bool = False,
+        question_templates: bool = False,
     ) -> str:
-        """Build the complete prompt for the LLM."""
+        """Build the complete prompt for the LLM.
+
+        With ``question_templates`` the response format is parameterized
+        question templates (``QUESTION_TEMPLATE_SCHEMA``) instead of
+        concrete questions.
+        """
 
         # Render the template content
         template_content = self.template_manager.render_template(
@@ -141,16 +488,21 @@ class ContentGenerator:
         # Build the complete prompt
         system_message = "You are an expert educator creating homework assignments."
 
-        json_schema = json.dumps(ASSIGNMENT_SCHEMA, indent=2)
-
-        # TODO: Load few-shot examples from templates/examples/{template}.json
-        examples = self._get_examples(template)
+        if question_templates:
+            json_schema = json.dumps(QUESTION_TEMPLATE_SCHEMA, indent=2)
+            examples = self._get_question_template_examples()
+            answers_section = f"\n{QUESTION_TEMPLATES_INSTRUCTION}\n"
+        else:
+            json_schema = json.dumps(ASSIGNMENT_SCHEMA, indent=2)
+            # TODO: Load few-shot examples from templates/examples/{template}.json
+            examples = self._get_examples(template)
+            answers_section = f"\n{ANSWERS_INSTRUCTION}\n" if include_answers else ""
 
         prompt = f"""
 {system_message}
 
 {template_content}
-
+{answers_section}
 OUTPUT FORMAT:
 You must respond with valid JSON containing an array of assignments.
 Each assignment must follow this exact structure:
@@ -167,8 +519,15 @@ Remember: Respond ONLY with valid JSON. No additional text or explanations.
 
         return prompt.strip()
 
-    def _validate_response(self, response: str) -> Dict[str, Any]:
-        """Validate LLM response against JSON schema."""
+    @tracing.traced("content.validate_response")
+    def _validate_response(
+        self, response: str, schema: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Validate LLM response against JSON schema.
+
+        ``schema`` defaults to ``ASSIGNMENT_SCHEMA``.
+        """
+        schema = schema or ASSIGNMENT_SCHEMA
         try:
             # Parse JSON
             data = json.loads(response)
@@ -181,7 +540,7 @@ Remember: Respond ONLY with valid JSON. No additional text or explanations.
         # Validate against schema if jsonschema is available
         if JSONSCHEMA_AVAILABLE:
             try:
-                jsonschema.validate(data, ASSIGNMENT_SCHEMA)
+                jsonschema.validate(data, schema)
             except jsonschema.ValidationError as e:
                 raise ValueError(f"Response doesn't match schema: {e}")
 
@@ -208,6 +567,40 @@ Remember: Respond ONLY with valid JSON. No additional text or explanations.
 
         return data
 
+    def _salvage_assignments(self, response: str) -> List[Dict[str, Any]]:
+        """Recover the complete assignments from a truncated response.
+
+        Walks the ``assignments`` array and decodes one object at a time,
+        stopping at the first one that is cut off. Objects that don't match
+        the assignment schema are dropped.
+        """
+        key = response.find('"assignments"')
+        start = response.find("[", key) if key >= 0 else -1
+        if start < 0:
+            return []
+
+        decoder = json.JSONDecoder()
+        item_schema = ASSIGNMENT_SCHEMA["properties"]["assignments"]["items"]
+        salvaged = []
+        position = start + 1
+        while True:
+            while position < len(response) and response[position] in " \t\r\n,":
+                position += 1
+            try:
+                item, position = decoder.raw_decode(response, position)
+            except json.JSONDecodeError:
+                break
+            if not isinstance(item, dict):
+                continue
+            if JSONSCHEMA_AVAILABLE:
+                if not jsonschema.Draft7Validator(item_schema).is_valid(item):
+                    continue
+            elif any(field not in item for field in item_schema["required"]):
+                continue
+            salvaged.append(item)
+
+        return salvaged
+
     def _extract_json_from_text(self, text: str) -> Dict[str, Any]:
         """Try to extract JSON from text that might contain extra content."""
         import re
@@ -244,3 +637,44 @@ Remember: Respond ONLY with valid JSON. No additional text or explanations.
             },
             indent=2,
         )
+
+    def _get_question_template_examples(self) -> str:
+        """Get a few-shot example of question templates."""
+        return json.dumps(
+            {
+                "assignments": [
+                    {
+                        "title": "Example Assignment",
+                        "grade_level": "5th Grade",
+                        "subject": "Mathematics",
+                        "difficulty": "Medium",
+                        "estimated_time": "15 minutes",
+                        "instructions": "Complete the following problems.",
+                        "questions": [
+                            {
+                                "text": "{name} buys {packs} packs of {size} "
+                                "stickers. How many stickers is that?",
+                                "answer": "{packs * size} stickers",
+                                "variables": [
+                                    {"name": "name", "choices": ["Maya", "Leo"]},
+                                    {"name": "packs", "min": 2, "max": 9},
+                                    {"name": "size", "min": 4, "max": 12},
+                                ],
+                            },
+                            {
+                                "text": "What is {a * b} ÷ {b}?",
+                                "answer": "{a}",
+                                "variables": [
+                                    {"name": "a", "min": 2, "max": 12},
+                                    {"name": "b", "min": 2, "max": 12},
+                                ],
+                                "constraints": ["a != b"],
+                            },
+                        ],
+                        "materials_needed": ["pencil"],
+                        "learning_objectives": ["Example objective"],
+                    }
+                ]
+            },
+            indent=2,
+        )
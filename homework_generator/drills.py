@@ -0,0 +1,406 @@
+"""Procedural arithmetic drill sheets, generated without an LLM.
+
+Drill worksheets (addition, subtraction, multiplication, division,
+fractions and decimals) follow simple rules, so they are generated locally
+from operand ranges chosen by grade and difficulty. Problems of the same
+kind are generated in one batch; with NumPy installed the operands are
+sampled and the answers computed as whole arrays, otherwise the standard
+library's ``random`` module is used row by row.
+"""
+
+import math
+import random
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from .models import Assignment
+
+# Prompt template whose front-matter selects this engine
+DRILL_TEMPLATE = "math_drills"
+
+DRILL_KINDS = (
+    "addition",
+    "subtraction",
+    "multiplication",
+    "division",
+    "fractions",
+    "decimals",
+)
+
+# Topic words that select each kind; GENERAL_KEYWORDS select every kind
+# suitable for the grade
+KIND_KEYWORDS = {
+    "addition": ("addition", "adding", "add ", "sums"),
+    "subtraction": ("subtraction", "subtracting", "subtract", "minus"),
+    "multiplication": ("multiplication", "multiplying", "multiply", "times table"),
+    "division": ("division", "dividing", "divide", "long division"),
+    "fractions": ("fraction",),
+    "decimals": ("decimal",),
+}
+GENERAL_KEYWORDS = ("arithmetic", "math facts", "computation", "drill", "operations")
+
+# First level (grade, shifted by difficulty) each kind is offered at
+KIND_MIN_LEVEL = {
+    "addition": 0,
+    "subtraction": 0,
+    "multiplication": 3,
+    "division": 4,
+    "fractions": 5,
+    "decimals": 5,
+}
+DIFFICULTY_SHIFT = {"easy": -1, "medium": 0, "hard": 1}
+MAX_LEVEL = 8
+
+# Largest addition/subtraction operand per level
+ADD_MAX = (10, 20, 100, 1_000, 10_000, 100_000, 100_000, 1_000_000, 1_000_000)
+# Largest multiplication factors (first, second) per level; division uses
+# them for quotient and divisor
+MULTIPLY_MAX = (
+    (5, 5),
+    (5, 5),
+    (5, 5),
+    (10, 10),
+    (12, 12),
+    (99, 9),
+    (99, 99),
+    (999, 99),
+    (999, 999),
+)
+
+KIND_TITLES = {
+    "addition": "Addition",
+    "subtraction": "Subtraction",
+    "multiplication": "Multiplication",
+    "division": "Division",
+    "fractions": "Fractions",
+    "decimals": "Decimals",
+}
+KIND_INSTRUCTIONS = {
+    "fractions": (
+        "Solve each problem. Write answers in simplest form, using mixed "
+        "numbers for fractions greater than one."
+    ),
+    "decimals": "Solve each problem. Line up the decimal points.",
+}
+DEFAULT_INSTRUCTIONS = "Solve each problem. Write your answer on the line."
+# Typical seconds per problem, for the estimated time
+KIND_SECONDS = {
+    "addition": 20,
+    "subtraction": 25,
+    "multiplication": 25,
+    "division": 40,
+    "fractions": 60,
+    "decimals": 45,
+}
+
+# Elementwise helpers that work on NumPy arrays in batch mode and on plain
+# ints in row mode
+_maximum: Callable[..., Any]
+_minimum: Callable[..., Any]
+_gcd: Callable[..., Any]
+_where: Callable[..., Any]
+if NUMPY_AVAILABLE:
+    _maximum, _minimum, _gcd, _where = np.maximum, np.minimum, np.gcd, np.where
+else:
+    _maximum, _minimum, _gcd = max, min, math.gcd
+
+    def _where_scalar(condition: bool, x: Any, y: Any) -> Any:
+        return x if condition else y
+
+    _where = _where_scalar
+
+
+Problem = Tuple[str, str]
+
+
+def parse_grade(grade_level: str) -> int:
+    """Return the numeric grade for a grade description (K is 0)."""
+    text = grade_level.lower()
+    match = re.search(r"\d+", text)
+    if match:
+        return min(int(match.group()), 12)
+    if "kinder" in text or re.fullmatch(r"\s*k\s*", text):
+        return 0
+    if "high" in text:
+        return 9
+    if "middle" in text:
+        return 7
+    return 5
+
+
+def drill_level(grade_level: str, difficulty: str) -> int:
+    """Operand-range level for a grade, one step easier or harder by difficulty."""
+    level = parse_grade(grade_level) + DIFFICULTY_SHIFT.get(difficulty.lower(), 0)
+    return max(0, min(level, MAX_LEVEL))
+
+
+def drill_kinds(topic: str, grade_level: str) -> List[str]:
+    """Return the drill kinds a topic asks for, or [] if it isn't a drill."""
+    text = f" {topic.lower()} "
+    kinds = [
+        kind
+        for kind, keywords in KIND_KEYWORDS.items()
+        if any(keyword in text for keyword in keywords)
+    ]
+    number_kinds = [kind for kind in kinds if kind in ("fractions", "decimals")]
+    if number_kinds:
+        # "adding fractions" means fraction drills, not whole-number addition
+        return number_kinds
+    if kinds:
+        return kinds
+    if any(keyword in text for keyword in GENERAL_KEYWORDS):
+        grade = parse_grade(grade_level)
+        return [kind for kind in DRILL_KINDS if KIND_MIN_LEVEL[kind] <= grade]
+    return []
+
+
+class DrillGenerator:
+    """Generates drill worksheets as :class:`Assignment` objects.
+
+    Args:
+        seed: Seed for reproducible worksheets (for a given backend)
+        questions_per_assignment: Problems on each worksheet
+    """
+
+    def __init__(self, seed: Optional[int] = None, questions_per_assignment: int = 20):
+        self.seed = seed
+        self.questions_per_assignment = questions_per_assignment
+
+    def generate(
+        self,
+        topic: str,
+        count: int,
+        difficulty: str,
+        grade_level: str,
+        kinds: Optional[Sequence[str]] = None,
+        include_answers: bool = True,
+    ) -> List[Assignment]:
+        """Generate ``count`` worksheets, cycling through ``kinds``.
+
+        Without ``kinds`` they are taken from the topic, falling back to
+        every kind suitable for the grade.
+        """
+        level = drill_level(grade_level, difficulty)
+        kinds = list(kinds or drill_kinds(topic, grade_level))
+        if not kinds:
+            kinds = [k for k in DRILL_KINDS if KIND_MIN_LEVEL[k] <= level] or [
+                "addition"
+            ]
+        unknown = set(kinds) - set(DRILL_KINDS)
+        if unknown:
+            raise ValueError(
+                f"Unknown drill kind(s): {', '.join(sorted(unknown))}. "
+                f"Available: {', '.join(DRILL_KINDS)}"
+            )
+
+        rng: Any
+        if NUMPY_AVAILABLE:
+            rng = np.random.default_rng(self.seed)
+        else:
+            rng = random.Random(self.seed)
+        # One batch per kind covering all of that kind's worksheets
+        plan = [kinds[i % len(kinds)] for i in range(count)]
+        per_sheet = self.questions_per_assignment
+        batches: Dict[str, Iterator[Problem]] = {
+            kind: iter(PROBLEM_BUILDERS[kind](level, sheets * per_sheet, rng))
+            for kind, sheets in Counter(plan).items()
+        }
+
+        sheet_numbers: Counter = Counter()
+        assignments = []
+        for kind in plan:
+            sheet_numbers[kind] += 1
+            problems = [next(batches[kind]) for _ in range(per_sheet)]
+            minutes = max(5, math.ceil(per_sheet * KIND_SECONDS[kind] / 60))
+            assignments.append(
+                Assignment(
+                    title=f"{KIND_TITLES[kind]} Drill {sheet_numbers[kind]}",
+                    subject="Mathematics",
+                    difficulty=difficulty.capitalize(),
+                    grade_level=grade_level,
+                    estimated_time=f"{minutes} minutes",
+                    instructions=KIND_INSTRUCTIONS.get(kind, DEFAULT_INSTRUCTIONS),
+                    questions=[question for question, _ in problems],
+                    answers=(
+                        [answer for _, answer in problems] if include_answers else None
+                    ),
+                    materials_needed=["pencil"],
+                    learning_objectives=[
+                        f"Build fluency with {KIND_TITLES[kind].lower()}"
+                    ],
+                )
+            )
+        return assignments
+
+
+def _integers(rng: Any, low: int, high: Any, size: int) -> Any:
+    """``size`` uniform integers in ``[low, high]``.
+
+    ``high`` may be a column, giving each row its own bound.
+    """
+    if NUMPY_AVAILABLE:
+        return rng.integers(low, np.asarray(high) + 1, size)
+    if isinstance(high, list):
+        return [rng.randint(low, h) for h in high]
+    return [rng.randint(low, high) for _ in range(size)]
+
+
+def _apply(func: Callable[..., Any], *columns: Any) -> Any:
+    """Apply an elementwise function to columns: in one call, or per row."""
+    if NUMPY_AVAILABLE:
+        return func(*columns)
+    return [func(*row) for row in zip(*columns)]
+
+
+def _rows(*columns: Any) -> Iterator[Tuple[int, ...]]:
+    """Iterate over columns row by row as plain ints."""
+    if NUMPY_AVAILABLE:
+        columns = tuple(column.tolist() for column in columns)
+    return zip(*columns)
+
+
+def _addition(level: int, size: int, rng: Any) -> List[Problem]:
+    high = ADD_MAX[level]
+    a = _integers(rng, 0, high, size)
+    b = _integers(rng, 0, high, size)
+    total = _apply(lambda x, y: x + y, a, b)
+    return [(f"{x} + {y} = ____", str(s)) for x, y, s in _rows(a, b, total)]
+
+
+def _subtraction(level: int, size: int, rng: Any) -> List[Problem]:
+    high = ADD_MAX[level]
+    a = _integers(rng, 0, high, size)
+    b = _integers(rng, 0, high, size)
+    # Larger number first, so answers are never negative
+    top = _apply(_maximum, a, b)
+    bottom = _apply(_minimum, a, b)
+    difference = _apply(lambda x, y: x - y, top, bottom)
+    return [(f"{x} − {y} = ____", str(d)) for x, y, d in _rows(top, bottom, difference)]
+
+
+def _multiplication(level: int, size: int, rng: Any) -> List[Problem]:
+    first_max, second_max = MULTIPLY_MAX[level]
+    a = _integers(rng, 1, first_max, size)
+    b = _integers(rng, 1, second_max, size)
+    product = _apply(lambda x, y: x * y, a, b)
+    return [(f"{x} × {y} = ____", str(p)) for x, y, p in _rows(a, b, product)]
+
+
+def _division(level: int, size: int, rng: Any) -> List[Problem]:
+    quotient_max, divisor_max = MULTIPLY_MAX[level]
+    quotient = _integers(rng, 0, quotient_max, size)
+    divisor = _integers(rng, 2, max(divisor_max, 2), size)
+    # Built from the answer so every problem divides exactly
+    dividend = _apply(lambda q, d: q * d, quotient, divisor)
+    return [
+        (f"{n} ÷ {d} = ____", str(q)) for n, d, q in _rows(dividend, divisor, quotient)
+    ]
+
+
+def _fractions(level: int, size: int, rng: Any) -> List[Problem]:
+    denominator_max = 10 if level <= 5 else 12
+    b = _integers(rng, 2, denominator_max, size)
+    # Like denominators below level 5
+    d = b if level < 5 else _integers(rng, 2, denominator_max, size)
+    a = _integers(rng, 1, _apply(lambda x: x - 1, b), size)
+    c = _integers(rng, 1, _apply(lambda x: x - 1, d), size)
+    # 0: +, 1: −, and from level 6 also 2: ×, 3: ÷
+    op = _integers(rng, 0, 1 if level < 6 else 3, size)
+
+    # Put the larger fraction first in subtractions
+    swap = _apply(lambda o, p, q, r, s: (o == 1) & (p * s < r * q), op, a, b, c, d)
+    a, b, c, d = (
+        _apply(_where, swap, c, a),
+        _apply(_where, swap, d, b),
+        _apply(_where, swap, a, c),
+        _apply(_where, swap, b, d),
+    )
+    numerator = _apply(
+        lambda o, p, q, r, s: _where(
+            o == 0,
+            p * s + r * q,
+            _where(o == 1, p * s - r * q, _where(o == 2, p * r, p * s)),
+        ),
+        op,
+        a,
+        b,
+        c,
+        d,
+    )
+    denominator = _apply(lambda o, q, r, s: _where(o == 3, q * r, q * s), op, b, c, d)
+    divisor = _apply(_gcd, numerator, denominator)
+    numerator = _apply(lambda n, g: n // g, numerator, divisor)
+    denominator = _apply(lambda n, g: n // g, denominator, divisor)
+
+    symbols = ("+", "−", "×", "÷")
+    return [
+        (f"{p}/{q} {symbols[o]} {r}/{s} = ____", _format_fraction(n, m))
+        for o, p, q, r, s, n, m in _rows(op, a, b, c, d, numerator, denominator)
+    ]
+
+
+def _decimals(level: int, size: int, rng: Any) -> List[Problem]:
+    places = 1 if level <= 4 else 2
+    scale = 10**places
+    whole_max = 10 if level <= 4 else 100
+    # Values as integers in units of 10**-places, so answers are exact
+    a = _integers(rng, 1, whole_max * scale, size)
+    b = _integers(rng, 1, whole_max * scale, size)
+    # 0: +, 1: −, and from level 6 also 2: × (by a one-digit decimal)
+    op = _integers(rng, 0, 1 if level < 6 else 2, size)
+    b = _apply(lambda o, x: _where(o == 2, x % (10 * scale - 1) + 1, x), op, b)
+    top = _apply(lambda o, x, y: _where(o == 1, _maximum(x, y), x), op, a, b)
+    bottom = _apply(lambda o, x, y: _where(o == 1, _minimum(x, y), y), op, a, b)
+    result = _apply(
+        lambda o, x, y: _where(o == 0, x + y, _where(o == 1, x - y, x * y)),
+        op,
+        top,
+        bottom,
+    )
+
+    symbols = ("+", "−", "×")
+    return [
+        (
+            f"{_format_decimal(x, places)} {symbols[o]} "
+            f"{_format_decimal(y, places)} = ____",
+            _format_decimal(r, places * 2 if o == 2 else places, strip=True),
+        )
+        for o, x, y, r in _rows(op, top, bottom, result)
+    ]
+
+
+def _format_fraction(numerator: int, denominator: int) -> str:
+    """Format a reduced fraction, as a mixed number when above one."""
+    if denominator == 1:
+        return str(numerator)
+    whole, remainder = divmod(numerator, denominator)
+    if whole == 0:
+        return f"{remainder}/{denominator}"
+    return f"{whole} {remainder}/{denominator}"
+
+
+def _format_decimal(value: int, places: int, strip: bool = False) -> str:
+    """Format an integer count of ``10**-places`` units as a decimal."""
+    whole, fraction = divmod(value, 10**places)
+    text = f"{whole}.{fraction:0{places}d}"
+    if strip:
+        text = text.rstrip("0").rstrip(".")
+    return text
+
+
+PROBLEM_BUILDERS: Dict[str, Callable[[int, int, Any], List[Problem]]] = {
+    "addition": _addition,
+    "subtraction": _subtraction,
+    "multiplication": _multiplication,
+    "division": _division,
+    "fractions": _fractions,
+    "decimals": _decimals,
+}
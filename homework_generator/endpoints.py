@@ -0,0 +1,157 @@
+"""Load balancing and health tracking across LLM endpoints.
+
+An :class:`EndpointPool` hands out endpoints round-robin and keeps a circuit
+breaker per endpoint, so a failing provider is skipped instead of slowing
+every request down. It also tracks recent request latencies, from which
+:meth:`EndpointPool.hedge_delay` says when a slow request is worth
+duplicating on another endpoint.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Collection, Deque, Dict, List, Optional, Sequence
+
+
+class Endpoint:
+    """A model served at a base URL with an API key, plus its health."""
+
+    def __init__(
+        self, model: str, api_key: Optional[str] = None, base_url: Optional[str] = None
+    ):
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        # Circuit breaker state, guarded by the owning pool's lock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def name(self) -> str:
+        """Human-readable identifier for logs, metrics and traces."""
+        return f"{self.model}@{self.base_url}" if self.base_url else self.model
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the circuit breaker is currently rejecting requests."""
+        return self.opened_at is not None
+
+    def params(self) -> Dict[str, Any]:
+        """Connection parameters to pass to ``litellm.completion``."""
+        params: Dict[str, Any] = {}
+        if self.base_url:
+            params["api_base"] = self.base_url
+        if self.api_key:
+            params["api_key"] = self.api_key
+        return params
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.name!r})"
+
+
+class EndpointPool:
+    """Round-robin endpoint selection with a circuit breaker per endpoint.
+
+    An endpoint's breaker opens after ``failure_threshold`` consecutive
+    failures. It is skipped for ``cooldown`` seconds and then allowed a
+    single probe request, which closes the breaker on success or reopens it
+    on failure.
+
+    Args:
+        endpoints: Endpoints to balance across, in rotation order
+        failure_threshold: Consecutive failures that open an endpoint's breaker
+        cooldown: Seconds an open breaker waits before probing the endpoint
+        hedge_percentile: Latency percentile (0-100) of recent requests after
+            which to send a duplicate request; None disables hedging
+        window: Number of recent latencies the percentile is taken over
+        clock: Monotonic time source, replaceable in tests
+    """
+
+    # Latencies needed before the percentile is trusted for hedging
+    MIN_HEDGE_SAMPLES = 10
+
+    def __init__(
+        self,
+        endpoints: Sequence[Endpoint],
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        hedge_percentile: Optional[float] = None,
+        window: int = 100,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        self.endpoints: List[Endpoint] = list(endpoints)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_percentile = hedge_percentile
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def acquire(self, exclude: Collection[Endpoint] = ()) -> Optional[Endpoint]:
+        """Return the next healthy endpoint not in ``exclude``.
+
+        Returns None when every candidate's breaker is open.
+        """
+        with self._lock:
+            now = self._clock()
+            count = len(self.endpoints)
+            for offset in range(count):
+                index = (self._next + offset) % count
+                endpoint = self.endpoints[index]
+                if endpoint not in exclude and self._admit(endpoint, now):
+                    self._next = (index + 1) % count
+                    return endpoint
+            return None
+
+    def _admit(self, endpoint: Endpoint, now: float) -> bool:
+        if endpoint.opened_at is None:
+            return True
+        if endpoint.probing or now - endpoint.opened_at < self.cooldown:
+            return False
+        # Half-open: let one request through to test the endpoint
+        endpoint.probing = True
+        return True
+
+    def record_success(self, endpoint: Endpoint, seconds: float) -> None:
+        """Close the endpoint's breaker and add the request latency."""
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.opened_at = None
+            endpoint.probing = False
+            self._latencies.append(seconds)
+
+    def record_failure(self, endpoint: Endpoint) -> None:
+        """Count a failure, opening the breaker at the threshold."""
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.probing = False
+            if endpoint.failures >= self.failure_threshold:
+                endpoint.opened_at = self._clock()
+
+    def release(self, endpoint: Endpoint) -> None:
+        """End the endpoint's probe without judging its health.
+
+        For attempts that were cancelled, rejected as bad requests or never
+        sent, so a half-open endpoint can be probed again.
+        """
+        with self._lock:
+            endpoint.probing = False
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging a request, or None not to hedge."""
+        if self.hedge_percentile is None:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.MIN_HEDGE_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        index = math.ceil(self.hedge_percentile / 100 * len(latencies)) - 1
+        return latencies[max(index, 0)]
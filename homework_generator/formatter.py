@@ -1,24 +1,154 @@
 """Markdown to HTML formatting for assignments."""
 
-from typing import List
+import itertools
+import weakref
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+)
 from pathlib import Path
 
 try:
     import markdown
     import jinja2
+    from markupsafe import escape
+
+    from .jinja_env import get_environment
 
     DEPENDENCIES_AVAILABLE = True
 except ImportError:
     DEPENDENCIES_AVAILABLE = False
 
+from . import resources, tracing
+from .html_builder import HTMLBuilder
 from .models import Assignment
+from .versions import PacketVersion, reorder_questions
+
+EMPTY_PACKET_HTML = "<html><body><p>No assignments to display.</p></body></html>"
+
+PACKET_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Homework Packet</title>
+    <style>{styles}</style>
+</head>
+<body>
+"""
+
+BASIC_PACKET_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Homework Packet</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        .assignment { page-break-after: always; margin-bottom: 40px; }
+        .assignment:last-child { page-break-after: avoid; }
+        h1 { color: #333; border-bottom: 2px solid #ccc; }
+        .metadata { background: #f5f5f5; padding: 10px; margin: 10px 0; }
+        ol, ul { margin: 10px 0; }
+    </style>
+</head>
+<body>
+"""
+
+PACKET_TAIL = "</body>\n</html>\n"
+
+# Labels every page of a shuffled version: a running element in the PDF page
+# margin, and a line at the top of the document in browsers
+VERSION_BANNER = """<style>
+.version-label {{ position: running(version-label); font-weight: bold; }}
+@page {{ @top-left {{ content: element(version-label); }} }}
+</style>
+<div class="version-label">Version {label}</div>
+"""
+
+# Stand-in for question text, rendered to find where each question's
+# fragment sits in an assignment body
+_SLOT = "\x1eslot-{}\x1e"
+
+
+class _BodyLayout:
+    """An assignment body split around its repeated per-question fragment.
+
+    Rendering the body with the questions in any order is then a join of
+    cached pieces instead of a template render.
+    """
+
+    def __init__(self, prefix: str, inner: List[str], separator: str, suffix: str):
+        self.prefix = prefix
+        self.inner = inner
+        self.separator = separator
+        self.suffix = suffix
+
+    def render(self, items: Iterable[Sequence[str]]) -> str:
+        """Render the body with one item (its field values) per question."""
+        parts = []
+        for values in items:
+            item = [str(escape(values[0]))]
+            for inner, value in zip(self.inner, values[1:]):
+                item.append(inner)
+                item.append(str(escape(value)))
+            parts.append("".join(item))
+        return self.prefix + self.separator.join(parts) + self.suffix
+
+    @classmethod
+    def split(cls, text: str, items: int, fields: int) -> Optional["_BodyLayout"]:
+        """Split a body rendered with ``items`` items of ``fields`` slots each.
+
+        Returns None unless every slot appears exactly once, in order, and
+        every item and separator is rendered identically.
+        """
+        pieces = []
+        rest = text
+        for slot in range(items * fields):
+            token = _SLOT.format(slot)
+            if text.count(token) != 1:
+                return None
+            head, found, rest = rest.partition(token)
+            if not found:
+                return None
+            pieces.append(head)
+        pieces.append(rest)
+        if not items:
+            return cls(text, [], "", "")
+
+        # pieces: prefix, then per item its inner pieces and the following
+        # separator (the suffix after the last item)
+        inners = [pieces[i + 1 : i + fields] for i in range(0, len(pieces) - 1, fields)]
+        separators = pieces[fields:-1:fields]
+        if any(inner != inners[0] for inner in inners) or len(set(separators)) > 1:
+            return None
+        return cls(
+            pieces[0], inners[0], separators[0] if separators else "", pieces[-1]
+        )
 
 
 class AssignmentFormatter:
-    """Formats assignments into HTML for PDF generation."""
-
-    def __init__(self, template_dir: str = "templates"):
-        self.template_dir = Path(template_dir)
+    """Formats assignments into HTML for PDF generation.
+
+    By default the HTML template and stylesheet shipped inside the package
+    are used; pass ``template_dir`` to load them from a directory instead.
+    ``theme`` selects the stylesheet (see ``resources.THEME_STYLESHEETS``).
+    """
+
+    def __init__(
+        self, template_dir: Optional[str] = None, theme: str = resources.DEFAULT_THEME
+    ):
+        self.template_dir = Path(template_dir) if template_dir else None
+        self.stylesheet = resources.theme_stylesheet(theme)
+        # Split assignment bodies for shuffled versions, by assignment id and
+        # then answer key; an entry is dropped when its assignment is freed
+        self._layouts: Dict[int, Dict[bool, Optional[_BodyLayout]]] = {}
 
         if DEPENDENCIES_AVAILABLE:
             self.md = markdown.Markdown(
@@ -29,153 +159,265 @@ class AssignmentFormatter:
                 ]
             )
 
-            # Load HTML template for assignments
-            try:
-                env = jinja2.Environment(
-                    loader=jinja2.FileSystemLoader(template_dir),
-                    autoescape=jinja2.select_autoescape(["html", "xml"]),
-                )
-                self.html_template = env.get_template("assignment.html")
-            except (jinja2.TemplateNotFound, jinja2.loaders.TemplateNotFound):
-                # Fallback to basic template
-                self.html_template = None
+            # Load HTML templates for standalone assignments and packet bodies
+            env = get_environment(self.template_dir)
+            self.html_template = self._get_template(env, "assignment.html")
+            self.body_template = self._get_template(env, "assignment_body.html")
+            self.answer_key_template = self._get_template(env, "answer_key_body.html")
         else:
             self.md = None
             self.html_template = None
+            self.body_template = None
+            self.answer_key_template = None
+
+    @staticmethod
+    def _get_template(
+        env: "jinja2.Environment", name: str
+    ) -> Optional["jinja2.Template"]:
+        """Load a template, or None so callers fall back to basic formatting."""
+        try:
+            return env.get_template(name)
+        except (jinja2.TemplateNotFound, jinja2.loaders.TemplateNotFound):
+            return None
 
     def format_assignment(self, assignment: Assignment) -> str:
         """Format a single assignment as HTML."""
         if not DEPENDENCIES_AVAILABLE or not self.html_template:
             return self._format_assignment_basic(assignment)
 
-        # Load CSS styles
-        styles = self._load_styles()
-
         # Render the assignment using the template
-        html = self.html_template.render(
-            title=assignment.title,
-            grade_level=assignment.grade_level,
-            subject=assignment.subject,
-            difficulty=assignment.difficulty,
-            estimated_time=assignment.estimated_time,
-            instructions=assignment.instructions,
-            problems=assignment.questions,  # Use questions field
-            materials_needed=assignment.materials_needed or [],
-            learning_objectives=assignment.learning_objectives or [],
-            styles=styles,
+        return self.html_template.render(
+            styles=self._load_styles(), **self._template_context(assignment)
         )
 
-        return html
-
+    @tracing.traced("formatter.format_packet")
     def format_packet(self, assignments: List[Assignment]) -> str:
         """Format multiple assignments into a complete HTML document."""
-        if not assignments:
-            return "<html><body><p>No assignments to display.</p></body></html>"
+        return "".join(self.iter_packet_html(assignments))
 
-        # Format each assignment
-        assignment_htmls = []
-        for assignment in assignments:
-            assignment_html = self.format_assignment(assignment)
-            assignment_htmls.append(assignment_html)
+    def iter_packet_html(self, assignments: Iterable[Assignment]) -> Iterator[str]:
+        """Yield a complete packet HTML document as a stream of fragments.
+
+        The stylesheet is emitted once in the document head and each
+        assignment body is rendered straight into the stream, so the whole
+        document never has to exist as a single string. ``assignments`` may
+        itself be a lazy iterable.
+        """
+        return self._iter_document(assignments, self._iter_assignment_body)
+
+    def iter_answer_key_html(self, assignments: Iterable[Assignment]) -> Iterator[str]:
+        """Yield an answer-key HTML document as a stream of fragments.
+
+        Each assignment gets one page listing its questions with their
+        answers; see ``iter_packet_html`` for the streaming behaviour.
+        """
+        return self._iter_document(assignments, self._iter_answer_key_body)
+
+    def iter_version_html(
+        self,
+        assignments: Sequence[Assignment],
+        version: PacketVersion,
+        answer_key: bool = False,
+    ) -> Iterator[str]:
+        """Yield the HTML document of one shuffled version of a packet.
+
+        Each assignment body is rendered once and split around its
+        questions; every version after that reuses the cached pieces and
+        only joins the questions in its own order. Custom templates that
+        can't be split are rendered per version.
+
+        Args:
+            assignments: The packet's assignments, in generated order
+            version: Ordering of the version, from ``plan_versions``
+            answer_key: Yield the version's answer key instead
+        """
+        return self._iter_document(
+            version.assignment_order,
+            lambda index: self._iter_version_body(
+                assignments[index], version.question_orders[index], answer_key
+            ),
+            preamble=VERSION_BANNER.format(label=escape(version.label)),
+        )
+
+    def _iter_version_body(
+        self, assignment: Assignment, order: Sequence[int], answer_key: bool
+    ) -> Iterator[str]:
+        """Yield one assignment body with its questions in ``order``."""
+        layout = self._body_layout(assignment, answer_key)
+        if layout is None:
+            reordered = reorder_questions(assignment, order)
+            if answer_key:
+                yield from self._iter_answer_key_body(reordered)
+            else:
+                yield from self._iter_assignment_body(reordered)
+            return
+
+        if answer_key:
+            pairs = assignment.question_answers()
+            yield layout.render(pairs[i] for i in order)
+        else:
+            yield layout.render((assignment.questions[i],) for i in order)
+
+    def _body_layout(
+        self, assignment: Assignment, answer_key: bool
+    ) -> Optional[_BodyLayout]:
+        """Return the cached split body of an assignment, if it splits."""
+        layouts = self._layouts.get(id(assignment))
+        if layouts is None:
+            layouts = self._layouts[id(assignment)] = {}
+            # Before the id can be reused by another assignment
+            weakref.finalize(assignment, self._layouts.pop, id(assignment), None)
+        if answer_key in layouts:
+            return layouts[answer_key]
+
+        layout = None
+        template = self.answer_key_template if answer_key else self.body_template
+        if DEPENDENCIES_AVAILABLE and template:
+            # Rendered with as many stand-ins as questions, so anything
+            # derived from the question count is rendered correctly
+            fields = 2 if answer_key else 1
+            slots = [
+                [_SLOT.format(i * fields + f) for f in range(fields)]
+                for i in range(len(assignment.questions))
+            ]
+            if answer_key:
+                text = template.render(
+                    title=assignment.title,
+                    answered_problems=[tuple(item) for item in slots],
+                )
+            else:
+                context = self._template_context(assignment)
+                context["problems"] = [item[0] for item in slots]
+                text = template.render(**context)
+            layout = _BodyLayout.split(text, len(slots), fields)
+        layouts[answer_key] = layout
+        return layout
+
+    def _iter_document(
+        self,
+        assignments: Iterable[Any],
+        body: Callable[[Any], Iterator[str]],
+        preamble: str = "",
+    ) -> Iterator[str]:
+        """Yield a packet document with ``body`` rendering each assignment.
+
+        ``preamble`` is emitted at the start of the body.
+        """
+        assignments = iter(assignments)
+        first = next(assignments, None)
+        if first is None:
+            yield EMPTY_PACKET_HTML
+            return
 
-        # Combine into complete document
         if DEPENDENCIES_AVAILABLE:
-            return self._combine_assignments_advanced(assignment_htmls)
+            yield PACKET_HEAD.format(styles=self._load_styles())
         else:
-            return self._combine_assignments_basic(assignment_htmls)
+            yield BASIC_PACKET_HEAD
+        if preamble:
+            yield preamble
+
+        for assignment in itertools.chain((first,), assignments):
+            yield from body(assignment)
+            yield "\n"
+
+        yield PACKET_TAIL
+
+    def write_packet_html(
+        self, assignments: Iterable[Assignment], stream: TextIO
+    ) -> None:
+        """Stream a packet HTML document into a text file object."""
+        for fragment in self.iter_packet_html(assignments):
+            stream.write(fragment)
+
+    def _iter_assignment_body(self, assignment: Assignment) -> Iterator[str]:
+        """Yield the HTML fragments for one assignment inside a packet."""
+        if DEPENDENCIES_AVAILABLE and self.body_template:
+            yield from self.body_template.generate(**self._template_context(assignment))
+        else:
+            # Custom template directories may only provide assignment.html
+            yield self.format_assignment(assignment)
+
+    def _iter_answer_key_body(self, assignment: Assignment) -> Iterator[str]:
+        """Yield the answer-key HTML fragments for one assignment."""
+        if DEPENDENCIES_AVAILABLE and self.answer_key_template:
+            yield from self.answer_key_template.generate(
+                title=assignment.title,
+                answered_problems=assignment.question_answers(),
+            )
+        else:
+            yield self._format_answer_key_basic(assignment)
+
+    def _template_context(self, assignment: Assignment) -> Dict[str, Any]:
+        """Build the template variables for an assignment."""
+        return {
+            "title": assignment.title,
+            "grade_level": assignment.grade_level,
+            "subject": assignment.subject,
+            "difficulty": assignment.difficulty,
+            "estimated_time": assignment.estimated_time,
+            "instructions": assignment.instructions,
+            "problems": assignment.questions,  # Use questions field
+            "materials_needed": assignment.materials_needed or [],
+            "learning_objectives": assignment.learning_objectives or [],
+        }
 
     def _format_assignment_basic(self, assignment: Assignment) -> str:
         """Basic assignment formatting without dependencies."""
-        html = f"""
-        <div class="assignment">
-            <h1>{assignment.title}</h1>
-            <div class="metadata">
-                <p><strong>Grade Level:</strong> {assignment.grade_level}</p>
-                <p><strong>Subject:</strong> {assignment.subject}</p>
-                <p><strong>Difficulty:</strong> {assignment.difficulty}</p>
-                <p><strong>Estimated Time:</strong> {assignment.estimated_time}</p>
-            </div>
-            
-            <h2>Instructions</h2>
-            <p>{assignment.instructions}</p>
-            
-            <h2>Problems</h2>
-            <ol>
-        """
-
-        for problem in assignment.questions:  # Use questions field
-            html += f"<li>{problem}</li>\n"
-
-        html += "</ol>"
+        html = HTMLBuilder()
+        html.raw('<div class="assignment">\n')
+        html.element("h1", assignment.title)
+        html.raw('\n<div class="metadata">\n')
+        for label, value in (
+            ("Grade Level", assignment.grade_level),
+            ("Subject", assignment.subject),
+            ("Difficulty", assignment.difficulty),
+            ("Estimated Time", assignment.estimated_time),
+        ):
+            html.raw(f"<p><strong>{label}:</strong> ").text(value).raw("</p>\n")
+        html.raw("</div>\n<h2>Instructions</h2>\n")
+        html.element("p", assignment.instructions)
+        html.raw("\n<h2>Problems</h2>\n")
+        html.list("ol", assignment.questions)
 
         if assignment.materials_needed:
-            html += "<h2>Materials Needed</h2><ul>"
-            for material in assignment.materials_needed:
-                html += f"<li>{material}</li>"
-            html += "</ul>"
+            html.raw("<h2>Materials Needed</h2>")
+            html.list("ul", assignment.materials_needed)
 
         if assignment.learning_objectives:
-            html += "<h2>Learning Objectives</h2><ul>"
-            for objective in assignment.learning_objectives:
-                html += f"<li>{objective}</li>"
-            html += "</ul>"
-
-        html += "</div>"
-        return html
-
-    def _combine_assignments_advanced(self, assignment_htmls: List[str]) -> str:
-        """Combine assignments by concatenating HTML content."""
-        # Create a complete HTML document
-        base_html = """
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Homework Packet</title>
-            <style>{styles}</style>
-        </head>
-        <body>
-            {assignments}
-        </body>
-        </html>
-        """
-
-        styles = self._load_styles()
-        assignments_content = "\n".join(assignment_htmls)
-
-        return base_html.format(styles=styles, assignments=assignments_content)
+            html.raw("<h2>Learning Objectives</h2>")
+            html.list("ul", assignment.learning_objectives)
+
+        html.raw("</div>")
+        return html.build()
+
+    def _format_answer_key_basic(self, assignment: Assignment) -> str:
+        """Basic answer-key formatting without dependencies."""
+        html = HTMLBuilder()
+        html.raw('<div class="assignment answer-key">\n')
+        html.element("h1", f"Answer Key: {assignment.title}")
+        html.raw('\n<ol class="answers">\n')
+        for question, answer in assignment.question_answers():
+            html.raw('<li class="answer">')
+            html.element("p", question, 'class="question"')
+            html.raw("<p><strong>Answer:</strong> ").text(answer).raw("</p></li>\n")
+        html.raw("</ol>\n</div>")
+        return html.build()
 
     def _combine_assignments_basic(self, assignment_htmls: List[str]) -> str:
         """Basic assignment combination."""
-        html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Homework Packet</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 20px; }
-                .assignment { page-break-after: always; margin-bottom: 40px; }
-                .assignment:last-child { page-break-after: avoid; }
-                h1 { color: #333; border-bottom: 2px solid #ccc; }
-                .metadata { background: #f5f5f5; padding: 10px; margin: 10px 0; }
-                ol, ul { margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-        """
-
-        html += "\n".join(assignment_htmls)
-        html += "</body></html>"
-
-        return html
+        return "".join((BASIC_PACKET_HEAD, "\n".join(assignment_htmls), PACKET_TAIL))
 
     def _load_styles(self) -> str:
         """Load CSS styles for assignment formatting."""
-        styles_path = self.template_dir / "styles.css"
-
-        if styles_path.exists():
-            return styles_path.read_text()
+        if self.template_dir is None:
+            try:
+                return resources.read_text(self.stylesheet)
+            except FileNotFoundError:
+                pass
+        else:
+            styles_path = self.template_dir / self.stylesheet
+            if styles_path.exists():
+                return styles_path.read_text()
 
         # Fallback styles
         return """
@@ -210,31 +452,53 @@ class AssignmentFormatter:
         }
         """
 
+    def format_packet_markdown(self, assignments: Iterable[Assignment]) -> str:
+        """Format multiple assignments as one Markdown document."""
+        return "\n---\n\n".join(
+            self.format_to_markdown(assignment) for assignment in assignments
+        )
+
+    def format_answer_key_markdown(self, assignments: Iterable[Assignment]) -> str:
+        """Format the answer key for multiple assignments as Markdown."""
+        sections = []
+        for assignment in assignments:
+            lines = [f"# Answer Key: {assignment.title}", ""]
+            lines.extend(
+                f"{i}. {question}  \n   **Answer:** {answer}"
+                for i, (question, answer) in enumerate(assignment.question_answers(), 1)
+            )
+            sections.append("\n".join(lines) + "\n")
+        return "\n---\n\n".join(sections)
+
     def format_to_markdown(self, assignment: Assignment) -> str:
-        """Format assignment as Markdown (useful for debugging/testing)."""
-        md = f"# {assignment.title}\n\n"
-        md += f"**Grade Level:** {assignment.grade_level}  \n"
-        md += f"**Subject:** {assignment.subject}  \n"
-        md += f"**Difficulty:** {assignment.difficulty}  \n"
-        md += f"**Estimated Time:** {assignment.estimated_time}  \n\n"
+        """Format an assignment as Markdown."""
+        lines = [
+            f"# {assignment.title}",
+            "",
+            f"**Grade Level:** {assignment.grade_level}  ",
+            f"**Subject:** {assignment.subject}  ",
+            f"**Difficulty:** {assignment.difficulty}  ",
+            f"**Estimated Time:** {assignment.estimated_time}  ",
+            "",
+        ]
 
         if assignment.learning_objectives:
-            md += "## Learning Objectives\n\n"
-            for objective in assignment.learning_objectives:
-                md += f"- {objective}\n"
-            md += "\n"
+            lines.extend(("## Learning Objectives", ""))
+            lines.extend(
+                f"- {objective}" for objective in assignment.learning_objectives
+            )
+            lines.append("")
 
-        md += "## Instructions\n\n"
-        md += f"{assignment.instructions}\n\n"
+        lines.extend(("## Instructions", "", f"{assignment.instructions}", ""))
 
         if assignment.materials_needed:
-            md += "## Materials Needed\n\n"
-            for material in assignment.materials_needed:
-                md += f"- {material}\n"
-            md += "\n"
+            lines.extend(("## Materials Needed", ""))
+            lines.extend(f"- {material}" for material in assignment.materials_needed)
+            lines.append("")
 
-        md += "## Problems\n\n"
-        for i, problem in enumerate(assignment.questions, 1):  # Use questions field
-            md += f"{i}. {problem}\n"
+        lines.extend(("## Problems", ""))
+        lines.extend(
+            f"{i}. {problem}" for i, problem in enumerate(assignment.questions, 1)
+        )
 
-        return md
+        return "\n".join(lines) + "\n"
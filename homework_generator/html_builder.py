@@ -0,0 +1,48 @@
+"""Linear-time HTML construction with escaping."""
+
+from html import escape
+from typing import Any, Iterable, List
+
+
+class HTMLBuilder:
+    """Accumulates HTML fragments and joins them once.
+
+    Text passed to ``text``, ``element`` and ``list`` is escaped exactly
+    once on the way in; ``raw`` appends trusted markup unchanged. Building
+    is linear in the output size, unlike repeated string concatenation.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+
+    def raw(self, markup: str) -> "HTMLBuilder":
+        """Append trusted markup without escaping."""
+        self._parts.append(markup)
+        return self
+
+    def text(self, value: Any) -> "HTMLBuilder":
+        """Append escaped text."""
+        self._parts.append(escape(str(value)))
+        return self
+
+    def element(self, tag: str, value: Any, attrs: str = "") -> "HTMLBuilder":
+        """Append an element whose content is escaped text."""
+        open_tag = f"<{tag} {attrs}>" if attrs else f"<{tag}>"
+        self._parts.extend((open_tag, escape(str(value)), f"</{tag}>"))
+        return self
+
+    def list(
+        self, tag: str, items: Iterable[Any], item_attrs: str = ""
+    ) -> "HTMLBuilder":
+        """Append an ``ol``/``ul`` element with one escaped ``li`` per item."""
+        li_open = f"<li {item_attrs}>" if item_attrs else "<li>"
+        parts = self._parts
+        parts.append(f"<{tag}>")
+        for item in items:
+            parts.extend((li_open, escape(str(item)), "</li>"))
+        parts.append(f"</{tag}>")
+        return self
+
+    def build(self) -> str:
+        """Return the accumulated HTML as a single string."""
+        return "".join(self._parts)
@@ -0,0 +1,111 @@
+"""Shared Jinja2 environments backed by a persistent bytecode cache."""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import jinja2
+import yaml
+
+from .resources import RESOURCE_PACKAGE, TEMPLATES_PACKAGE_PATH
+
+CACHE_DIR_ENV_VAR = "HOMEWORK_GEN_CACHE_DIR"
+
+FRONT_MATTER_DELIMITER = "---"
+
+
+def split_front_matter(source: str) -> Tuple[Dict[str, Any], str]:
+    """Split optional YAML front-matter from a template source.
+
+    Returns the parsed metadata (empty if there is none) and the template
+    body with the front-matter block removed.
+    """
+    if not source.startswith(FRONT_MATTER_DELIMITER + "\n"):
+        return {}, source
+
+    end = source.find("\n" + FRONT_MATTER_DELIMITER + "\n", 3)
+    if end == -1:
+        return {}, source
+
+    try:
+        metadata = yaml.safe_load(source[4:end]) or {}
+    except yaml.YAMLError:
+        return {}, source
+    if not isinstance(metadata, dict):
+        return {}, source
+
+    return metadata, source[end + len(FRONT_MATTER_DELIMITER) + 2 :]
+
+
+class FrontMatterLoader(jinja2.BaseLoader):
+    """Loader wrapper that strips YAML front-matter before compiling."""
+
+    def __init__(self, loader: jinja2.BaseLoader):
+        self.loader = loader
+
+    def get_source(
+        self, environment: jinja2.Environment, template: str
+    ) -> Tuple[str, Optional[str], Optional[Callable[[], bool]]]:
+        source, filename, uptodate = self.loader.get_source(environment, template)
+        _, body = split_front_matter(source)
+        return body, filename, uptodate
+
+    def list_templates(self) -> List[str]:
+        return self.loader.list_templates()
+
+
+def get_bytecode_cache_dir() -> Path:
+    """Return the directory used for compiled template bytecode."""
+    base = os.getenv(CACHE_DIR_ENV_VAR)
+    if base:
+        return Path(base) / "jinja"
+    return Path.home() / ".cache" / "homework-gen" / "jinja"
+
+
+def _make_bytecode_cache() -> Optional[jinja2.BytecodeCache]:
+    """Create the filesystem bytecode cache, or None if it is not writable."""
+    cache_dir = get_bytecode_cache_dir()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return jinja2.FileSystemBytecodeCache(str(cache_dir))
+
+
+@lru_cache(maxsize=None)
+def _environment_for(kind: str, location: str) -> jinja2.Environment:
+    loader: jinja2.BaseLoader
+    if kind == "package":
+        loader = jinja2.PackageLoader(RESOURCE_PACKAGE, location)
+    else:
+        loader = jinja2.FileSystemLoader(location)
+    return jinja2.Environment(
+        loader=FrontMatterLoader(loader),
+        autoescape=jinja2.select_autoescape(["html", "xml"]),
+        bytecode_cache=_make_bytecode_cache(),
+    )
+
+
+def get_environment(
+    search_path: Optional[Path] = None, package_path: str = TEMPLATES_PACKAGE_PATH
+) -> jinja2.Environment:
+    """Get the shared Jinja2 environment for a template directory.
+
+    Environments are created once per process and directory, so compiled
+    templates are reused across components. Template bytecode is also
+    persisted to disk, letting later processes skip template parsing.
+
+    Args:
+        search_path: Filesystem directory to load from; when omitted,
+            templates are loaded from the package via ``package_path``
+        package_path: Directory inside the package holding the templates
+    """
+    if search_path is None:
+        return _environment_for("package", package_path)
+    return _environment_for("filesystem", str(Path(search_path).resolve()))
+
+
+def clear_environments() -> None:
+    """Drop all cached environments (mainly useful for tests)."""
+    _environment_for.cache_clear()
@@ -1,12 +1,20 @@
 """LLM client abstraction layer."""
 
+import contextvars
 import hashlib
 import json
-from typing import Optional
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
 from pathlib import Path
 
 try:
-    from tenacity import retry, stop_after_attempt, wait_exponential
+    from tenacity import (
+        RetryCallState,
+        Retrying,
+        retry_if_exception,
+    )
     import litellm
     import diskcache
 
@@ -15,36 +23,199 @@ except ImportError:
     # For testing without dependencies installed
     DEPENDENCIES_AVAILABLE = False
 
-    def retry(*args, **kwargs):
-        def decorator(func):
-            return func
+from . import metrics, retries, tracing
+from .cassettes import Cassette, CassetteMiss
+from .config import LLMConfig
+from .endpoints import Endpoint, EndpointPool
+from .single_flight import SingleFlight, file_lock
+
+# Shared by all clients so identical requests from different jobs coalesce
+_single_flight = SingleFlight()
+
+
+# Sent after a response that stopped at max_tokens, with the partial reply
+CONTINUE_PROMPT = (
+    "Your previous reply was cut off. Continue exactly where it stopped, "
+    "without repeating anything and without any preamble."
+)
+
+
+class _Reply(NamedTuple):
+    """One completion: its text, why it stopped and the model that wrote it."""
+
+    content: str
+    finish_reason: Optional[str]
+    model: str
+
+
+class LLMError(RuntimeError):
+    """A failed LLM request.
 
-        return decorator
+    ``category`` is the error class from :func:`retries.classify_error`, or
+    ``unavailable`` when every endpoint is disabled, ``deadline`` when the
+    job ran out of time and ``replay_miss`` when a replayed request was
+    never recorded.
+    """
 
-    stop_after_attempt = wait_exponential = lambda *args, **kwargs: None
+    def __init__(self, message: str, category: str = "unknown"):
+        super().__init__(message)
+        self.category = category
+
+    @property
+    def retryable(self) -> bool:
+        return self.category in retries.RETRYABLE_CATEGORIES
+
+
+class TruncatedResponse(LLMError):
+    """A response still cut off at ``max_tokens`` after every continuation.
+
+    ``content`` holds the partial text, which callers may salvage. Partial
+    responses are never cached.
+    """
+
+    def __init__(self, content: str):
+        super().__init__(
+            "LLM response was cut off at max_tokens after all continuations",
+            "truncated",
+        )
+        self.content = content
+
+
+class _Cancelled(Exception):
+    """Raised inside a hedged attempt that lost the race."""
 
 
 class LLMClient:
-    """Abstraction layer for LLM interactions."""
+    """Abstraction layer for LLM interactions.
+
+    With ``stream=True`` responses are streamed from the provider, which
+    lets the time to first token be measured; the returned text is the
+    same either way.
+
+    Identical concurrent requests (same cache key) are coalesced: one
+    caller queries the provider and the others wait for its result. With
+    the cache enabled, a lock file per key in the cache directory extends
+    this to other processes sharing the cache, which then read the result
+    from the cache instead of repeating the call.
+
+    Requests are spread round-robin over the primary endpoint (``model``,
+    ``api_key``, ``base_url``) and any extra ``endpoints``; endpoints that
+    keep failing are skipped until their cooldown passes. With
+    ``hedge_percentile`` set, a request slower than that percentile of
+    recent requests is duplicated on another endpoint and whichever answer
+    arrives first is used; a request that fails outright is sent to
+    another endpoint at once. Only responses written by ``model`` itself
+    are cached, so a fallback endpoint serving a different model never
+    answers later requests from the cache.
+
+    A response that stops because it hit ``max_tokens`` is continued with
+    up to ``max_continuations`` follow-up requests and the parts are joined,
+    rather than the whole generation being repeated; a response still cut
+    off after that raises :class:`TruncatedResponse`. ``max_tokens`` is
+    capped at the model's output limit when litellm knows it, and is not
+    part of the cache key.
+
+    Failed requests raise :class:`LLMError`. Transient failures (rate
+    limits, timeouts, connection and server errors) are retried up to
+    ``max_attempts`` in total, with full-jitter backoff starting at
+    ``retry_base_delay`` and capped at ``retry_max_delay`` seconds, or
+    longer when the server asks via Retry-After. Other errors fail at once.
+    Inside :func:`retries.deadline`, request timeouts and retries are
+    limited to the time left.
+
+    With a ``cassette``, completions are recorded to it or replayed from
+    it instead of the network (see :mod:`homework_generator.cassettes`).
+    The response cache is bypassed in both modes, so every request is
+    recorded and replays see the same traffic.
+    """
 
     def __init__(
-        self, model: str, cache_enabled: bool = True, api_key: Optional[str] = None, base_url: Optional[str] = None
+        self,
+        model: str,
+        cache_enabled: bool = True,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        stream: bool = False,
+        endpoints: Sequence[Endpoint] = (),
+        hedge_percentile: Optional[float] = None,
+        breaker_failures: int = 3,
+        breaker_cooldown: float = 30.0,
+        max_continuations: int = 2,
+        max_attempts: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 10.0,
+        cassette: Optional[Cassette] = None,
     ):
         self.model = model
         self.api_key = api_key
         self.base_url = base_url
         self.cache_enabled = cache_enabled
+        self.stream = stream
+        self.max_continuations = max_continuations
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.cassette = cassette
+        self._output_limits: Dict[str, Optional[int]] = {}
+        self.pool = EndpointPool(
+            [Endpoint(model, api_key, base_url), *endpoints],
+            failure_threshold=breaker_failures,
+            cooldown=breaker_cooldown,
+            hedge_percentile=hedge_percentile,
+        )
 
-        if cache_enabled and DEPENDENCIES_AVAILABLE:
-            cache_dir = Path("llm_cache")
-            cache_dir.mkdir(exist_ok=True)
-            self.cache = diskcache.Cache(str(cache_dir))
+        self.cache_dir = Path("llm_cache")
+        if cache_enabled and DEPENDENCIES_AVAILABLE and cassette is None:
+            self.cache_dir.mkdir(exist_ok=True)
+            self.cache = diskcache.Cache(str(self.cache_dir))
         else:
             self.cache = None
 
-    @retry(
-        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)
-    )
+    @classmethod
+    def from_config(
+        cls, config: LLMConfig, model: Optional[str] = None, **kwargs: Any
+    ) -> "LLMClient":
+        """Create a client from the ``llm`` section of the app config.
+
+        Args:
+            config: LLM configuration
+            model: Model for this run (defaults to ``config.default_model``)
+            **kwargs: Other ``LLMClient`` arguments, e.g. ``stream``
+        """
+        model = model or config.default_model
+        endpoints = [
+            Endpoint(
+                endpoint.model or model,
+                endpoint.api_key or config.api_key,
+                endpoint.base_url,
+            )
+            for endpoint in config.endpoints
+        ]
+        if config.balance_local_models:
+            endpoints.extend(Endpoint(local) for local in config.local_models)
+        if config.cassette and "cassette" not in kwargs:
+            kwargs["cassette"] = Cassette(
+                config.cassette,
+                mode=config.cassette_mode,
+                latency_scale=config.replay_latency,
+            )
+
+        return cls(
+            model,
+            api_key=config.api_key,
+            base_url=config.base_url,
+            endpoints=endpoints,
+            hedge_percentile=config.hedge_percentile,
+            breaker_failures=config.breaker_failures,
+            breaker_cooldown=config.breaker_cooldown,
+            max_continuations=config.max_continuations,
+            max_attempts=config.max_attempts,
+            retry_base_delay=config.retry_base_delay,
+            retry_max_delay=config.retry_max_delay,
+            **kwargs,
+        )
+
+    @tracing.traced("llm.generate_response")
     def generate_response(self, prompt: str, **kwargs) -> str:
         """Generate a response from the LLM."""
         if not DEPENDENCIES_AVAILABLE:
@@ -53,46 +224,413 @@ class LLMClient:
 
         # Check cache first
         cache_key = self._get_cache_key(prompt, **kwargs)
-        if self.cache and cache_key in self.cache:
-            return self.cache[cache_key]
+        if self.cache is not None:
+            with metrics.stage("cache_lookup") as info:
+                cached = self.cache.get(cache_key)
+                info["hit"] = cached is not None
+            tracing.set_attribute("llm.cache_hit", cached is not None)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        content, shared = _single_flight.do(
+            cache_key, lambda: self._fetch(cache_key, prompt, kwargs)
+        )
+        if shared:
+            # Another caller in this process made the request for us
+            active = metrics.active()
+            if active is not None:
+                active.record("llm_coalesced", time.perf_counter() - start)
+            tracing.set_attribute("llm.coalesced", True)
+
+        return content
+
+    def _fetch(self, cache_key: str, prompt: str, kwargs: Dict[str, Any]) -> str:
+        """Request a completion and cache it, once across processes."""
+        if self.cache is None:
+            return self._complete(prompt, kwargs)
+
+        with file_lock(self.cache_dir / "locks" / f"{cache_key}.lock"):
+            # Another process may have completed this request while we waited
+            cached: Optional[str] = self.cache.get(cache_key)
+            if cached is not None:
+                tracing.set_attribute("llm.coalesced", True)
+                return cached
 
-        # Set up litellm parameters
+            models: List[str] = []
+            content = self._complete(prompt, kwargs, models)
+            if all(model == self.model for model in models):
+                self.cache[cache_key] = content
+            return content
+
+    def _complete(
+        self,
+        prompt: str,
+        kwargs: Dict[str, Any],
+        models: Optional[List[str]] = None,
+    ) -> str:
+        """Send the prompt to the provider and return the response text.
+
+        The model that served each request is appended to ``models``.
+
+        Raises:
+            TruncatedResponse: If the response is still cut off after
+                ``max_continuations`` follow-up requests
+        """
         messages = [{"role": "user", "content": prompt}]
 
-        # Configure API key if provided
-        if self.api_key:
-            if self.model.startswith("gpt"):
-                import os
+        params = dict(kwargs)
+        params.setdefault("temperature", 0.1)
+        params.setdefault("max_tokens", 4000)
 
-                os.environ["OPENAI_API_KEY"] = self.api_key
+        reply = self._request(messages, params)
+        parts = [reply.content]
+        served = [reply.model]
+        finish_reason = reply.finish_reason
+        continuations = 0
+        while finish_reason == "length" and continuations < self.max_continuations:
+            continuations += 1
+            # Resend the conversation with the reply so far and ask for the rest
+            followup = [
+                *messages,
+                {"role": "assistant", "content": "".join(parts)},
+                {"role": "user", "content": CONTINUE_PROMPT},
+            ]
+            reply = self._request(followup, params, continuation=continuations)
+            parts.append(reply.content)
+            served.append(reply.model)
+            finish_reason = reply.finish_reason
 
-        try:
-            response = litellm.completion(
-                model=self.model,
-                messages=messages,
-                temperature=kwargs.get("temperature", 0.1),
-                max_tokens=kwargs.get("max_tokens", 4000),
-                **kwargs,
+        if continuations:
+            tracing.set_attribute("llm.continuations", continuations)
+        if models is not None:
+            models.extend(served)
+        if finish_reason == "length":
+            tracing.set_attribute("llm.truncated", True)
+            raise TruncatedResponse("".join(parts))
+        return "".join(parts)
+
+    def _request(
+        self,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any],
+        continuation: int = 0,
+    ) -> _Reply:
+        """Make one logical request, retrying transient failures."""
+        retrying = Retrying(
+            retry=retry_if_exception(lambda e: isinstance(e, LLMError) and e.retryable),
+            stop=self._stop_retrying,
+            wait=self._retry_wait,
+            before_sleep=self._record_retry,
+            reraise=True,
+        )
+        for attempt in retrying:
+            with attempt:
+                delay = self.pool.hedge_delay()
+                if delay is None:
+                    return self._attempt(
+                        self._acquire(), messages, params, continuation=continuation
+                    )
+                return self._complete_hedged(messages, params, delay, continuation)
+        # Retrying either returns from an attempt or reraises its error
+        raise LLMError("LLM API call failed: no attempt was made")
+
+    def _retry_wait(self, state: "RetryCallState") -> float:
+        """Full-jitter backoff, at least any Retry-After, within the deadline."""
+        delay = retries.full_jitter(
+            state.attempt_number, self.retry_base_delay, self.retry_max_delay
+        )
+        error = state.outcome.exception() if state.outcome else None
+        hint = retries.retry_after(error.__cause__ or error) if error else None
+        if hint is not None:
+            delay = max(delay, hint)
+        left = retries.time_left()
+        if left is not None:
+            delay = max(0.0, min(delay, left))
+        return delay
+
+    def _stop_retrying(self, state: "RetryCallState") -> bool:
+        """Stop after ``max_attempts`` or when the deadline is reached."""
+        return state.attempt_number >= self.max_attempts or self._deadline_reached(
+            state
+        )
+
+    @staticmethod
+    def _deadline_reached(state: "RetryCallState") -> bool:
+        """Stop retrying once the backoff would run past the deadline."""
+        left = retries.time_left()
+        if left is None:
+            return False
+        return left <= (getattr(state, "upcoming_sleep", 0) or 0)
+
+    @staticmethod
+    def _record_retry(state: "RetryCallState") -> None:
+        """Record a retry and the backoff before it."""
+        error = state.outcome.exception() if state.outcome else None
+        sleep = state.next_action.sleep if state.next_action else 0.0
+        active = metrics.active()
+        if active is not None:
+            active.record(
+                "llm_retry",
+                sleep,
+                attempt=state.attempt_number,
+                category=getattr(error, "category", "unknown"),
             )
+        tracing.set_attribute("llm.retries", state.attempt_number)
 
-            content = response.choices[0].message.content
+    def _acquire(self) -> Endpoint:
+        """Pick the next endpoint, failing fast when all are unavailable."""
+        endpoint = self.pool.acquire()
+        if endpoint is None:
+            raise LLMError(
+                "LLM API call failed: all endpoints are temporarily disabled "
+                "after repeated failures",
+                category="unavailable",
+            )
+        return endpoint
 
-            # Cache the response
-            if self.cache:
-                self.cache[cache_key] = content
+    def _complete_hedged(
+        self,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any],
+        delay: float,
+        continuation: int = 0,
+    ) -> _Reply:
+        """Race a duplicate request against one that is slower than usual.
 
-            return content
+        Attempts run on background threads. Once one succeeds the other is
+        cancelled: a streaming attempt stops reading its response, while a
+        non-streaming one cannot be interrupted and its result is dropped.
+        If the first attempt fails before the hedge delay, the duplicate is
+        sent to another endpoint straight away.
+        """
+        cancel = threading.Event()
+        primary = self._acquire()
+        pending = {
+            self._submit(
+                lambda: self._attempt(
+                    primary, messages, params, cancel, continuation=continuation
+                )
+            )
+        }
+
+        done, _ = wait(pending, timeout=delay)
+        failed = any(future.exception() is not None for future in done)
+        if failed or not done:
+            # Prefer another endpoint; when slow rather than failed, a second
+            # try on the same one still helps if the slowness is per-request
+            backup = self.pool.acquire(exclude=(primary,))
+            if backup is None and not failed:
+                backup = self.pool.acquire()
+            if backup is not None:
+                tracing.set_attribute("llm.hedged", True)
+                pending.add(
+                    self._submit(
+                        lambda: self._attempt(
+                            backup,
+                            messages,
+                            params,
+                            cancel,
+                            hedge=True,
+                            continuation=continuation,
+                        )
+                    )
+                )
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result: _Reply = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                cancel.set()
+                return result
+        if error is None:
+            raise LLMError("LLM API call failed: no attempt completed", "unavailable")
+        raise error
+
+    @staticmethod
+    def _submit(func: Callable[[], _Reply]) -> Future:
+        """Run ``func`` on a daemon thread in a copy of the current context.
+
+        A dedicated thread per attempt means an abandoned attempt never
+        holds up a new one, and the copied context keeps metrics and
+        tracing attached to the caller's run.
+        """
+        future: Future = Future()
+        context = contextvars.copy_context()
+
+        def run() -> None:
+            try:
+                future.set_result(context.run(func))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+        return future
+
+    def _attempt(
+        self,
+        endpoint: Endpoint,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any],
+        cancel: Optional[threading.Event] = None,
+        hedge: bool = False,
+        continuation: int = 0,
+    ) -> _Reply:
+        """Make one request to ``endpoint`` and update its health."""
+        try:
+            params = {**params, **endpoint.params()}
+            left = retries.time_left()
+            if left is not None:
+                if left <= 0:
+                    raise LLMError("LLM API call failed: deadline exceeded", "deadline")
+                params["timeout"] = min(params.get("timeout", left), left)
+            limit = self._output_limit(endpoint.model)
+            if limit is not None and params["max_tokens"] > limit:
+                params["max_tokens"] = limit
+            fields: Dict[str, Any] = {"model": endpoint.model}
+            if len(self.pool) > 1:
+                fields["endpoint"] = endpoint.name
+            if hedge:
+                fields["hedge"] = True
+            if continuation:
+                fields["continuation"] = continuation
+
+            start = time.perf_counter()
+            try:
+                with metrics.stage("llm_request", **fields) as info:
+                    if self.cassette is not None and self.cassette.replaying:
+                        content, finish_reason = self.cassette.replay(
+                            endpoint.model, messages, params, info
+                        )
+                    elif self.stream:
+                        content, finish_reason = self._complete_streaming(
+                            endpoint.model, messages, params, info, cancel
+                        )
+                    else:
+                        response = litellm.completion(
+                            model=endpoint.model,
+                            messages=messages,
+                            **params,
+                        )
+                        choice = response.choices[0]
+                        content = choice.message.content
+                        finish_reason = getattr(choice, "finish_reason", None)
+                        self._record_usage(getattr(response, "usage", None), info)
+                    if isinstance(finish_reason, str):
+                        info["finish_reason"] = finish_reason
+                    else:
+                        finish_reason = None
+            except _Cancelled:
+                raise
+            except CassetteMiss as e:
+                raise LLMError(str(e), "replay_miss") from e
+            except Exception as e:
+                category = retries.classify_error(e)
+                # A bad request says nothing about the endpoint's health
+                if category != "client":
+                    self.pool.record_failure(endpoint)
+                raise LLMError(f"LLM API call failed: {e}", category) from e
+
+            latency = time.perf_counter() - start
+            self.pool.record_success(endpoint, latency)
+            if self.cassette is not None and not self.cassette.replaying:
+                self.cassette.record(
+                    endpoint.model,
+                    messages,
+                    params,
+                    content,
+                    finish_reason,
+                    info,
+                    latency,
+                )
+            if tracing.is_enabled():
+                tracing.set_attribute("llm.model", endpoint.model)
+                tracing.set_attribute("llm.endpoint", endpoint.name)
+                for field in ("tokens_in", "tokens_out", "ttft"):
+                    if field in info:
+                        tracing.set_attribute(f"llm.{field}", info[field])
+
+            return _Reply(content, finish_reason, endpoint.model)
+        finally:
+            # Ends a probe that neither success nor failure was recorded for
+            self.pool.release(endpoint)
+
+    def _output_limit(self, model: str) -> Optional[int]:
+        """Return the model's maximum output tokens, if litellm knows it."""
+        if model not in self._output_limits:
+            try:
+                limit = litellm.get_model_info(model).get("max_output_tokens")
+            except Exception:
+                # Unknown to litellm, e.g. a local or custom model
+                limit = None
+            self._output_limits[model] = limit if isinstance(limit, int) else None
+        return self._output_limits[model]
+
+    def _complete_streaming(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any],
+        info: Dict,
+        cancel: Optional[threading.Event] = None,
+    ) -> Tuple[str, Optional[str]]:
+        """Run a streaming completion, recording time to first token."""
+        start = time.perf_counter()
+        response = litellm.completion(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **params,
+        )
+
+        parts: List[str] = []
+        finish_reason = None
+        for chunk in response:
+            if cancel is not None and cancel.is_set():
+                # Another attempt won; stop reading so the connection closes
+                close = getattr(response, "close", None)
+                if close is not None:
+                    close()
+                raise _Cancelled()
+            if chunk.choices:
+                choice = chunk.choices[0]
+                delta = choice.delta.content
+                if delta:
+                    if not parts:
+                        info["ttft"] = time.perf_counter() - start
+                    parts.append(delta)
+                finish_reason = getattr(choice, "finish_reason", None) or finish_reason
+            self._record_usage(getattr(chunk, "usage", None), info)
+
+        return "".join(parts), finish_reason
 
-        except Exception as e:
-            raise RuntimeError(f"LLM API call failed: {e}")
+    @staticmethod
+    def _record_usage(usage: Any, info: Dict) -> None:
+        """Copy token counts from a response usage block into stage fields."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt_tokens, int):
+            info["tokens_in"] = prompt_tokens
+        if isinstance(completion_tokens, int):
+            info["tokens_out"] = completion_tokens
 
-    def _get_cache_key(self, prompt: str, **kwargs) -> str:
+    def _get_cache_key(self, prompt: str, **kwargs: Any) -> str:
         """Generate cache key for the request."""
-        # Create deterministic key from model, prompt, and parameters
+        # Create deterministic key from model, prompt, and parameters. The
+        # output budget only decides whether a reply is cut off, and cut
+        # off replies are never cached, so it stays out of the key
         key_data = {
             "model": self.model,
             "prompt": prompt,
-            "params": sorted(kwargs.items()),
+            "params": sorted(
+                (name, value) for name, value in kwargs.items() if name != "max_tokens"
+            ),
         }
         content = json.dumps(key_data, sort_keys=True)
         return hashlib.md5(content.encode()).hexdigest()
@@ -123,5 +661,5 @@ class LLMClient:
 
     def clear_cache(self) -> None:
         """Clear the LLM response cache."""
-        if self.cache:
+        if self.cache is not None:
             self.cache.clear()
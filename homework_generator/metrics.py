@@ -0,0 +1,131 @@
+"""Per-stage timing and token metrics for a generation run.
+
+Instrumented code calls :func:`stage` (or :func:`timed_iter`) around the
+work it wants measured. Measurements are only kept while a collector is
+active via :func:`collect`; otherwise the helpers do no bookkeeping.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+_current: ContextVar[Optional["RunMetrics"]] = ContextVar(
+    "homework_gen_metrics", default=None
+)
+
+# Fields summed across records of the same stage in summaries
+SUMMED_FIELDS = ("tokens_in", "tokens_out", "bytes")
+
+
+class RunMetrics:
+    """Collects stage timings for one run."""
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Any]] = []
+
+    def record(self, stage: str, seconds: float, **fields: Any) -> None:
+        """Add a measurement for a stage."""
+        self.records.append({"stage": stage, "seconds": seconds, **fields})
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Aggregate records per stage, in first-seen order.
+
+        Each entry has ``stage``, ``calls`` and total ``seconds``, plus summed
+        token and byte counts and the first ``ttft`` (time to first token)
+        seen.
+        """
+        stages: Dict[str, Dict[str, Any]] = {}
+        for record in self.records:
+            entry = stages.setdefault(
+                record["stage"], {"stage": record["stage"], "calls": 0, "seconds": 0.0}
+            )
+            entry["calls"] += 1
+            entry["seconds"] += record["seconds"]
+            for field in SUMMED_FIELDS:
+                if isinstance(record.get(field), int):
+                    entry[field] = entry.get(field, 0) + record[field]
+            if "ttft" in record and "ttft" not in entry:
+                entry["ttft"] = record["ttft"]
+            if "hit" in record:
+                entry["hits"] = entry.get("hits", 0) + bool(record["hit"])
+        return list(stages.values())
+
+    def write_jsonl(self, stream: TextIO, **context: Any) -> None:
+        """Write one JSON object per record, tagged with ``context`` fields."""
+        timestamp = datetime.now().isoformat()
+        for record in self.records:
+            stream.write(
+                json.dumps({"timestamp": timestamp, **context, **record}, default=str)
+            )
+            stream.write("\n")
+
+
+@contextmanager
+def collect(metrics: Optional[RunMetrics] = None) -> Iterator[RunMetrics]:
+    """Activate a collector for the duration of the block."""
+    metrics = metrics or RunMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def active() -> Optional[RunMetrics]:
+    """Return the active collector, if any."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """Time a block as ``name``.
+
+    Yields a dict the block may add fields to (e.g. token counts); they are
+    stored with the timing when a collector is active.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield fields
+        return
+
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        metrics.record(name, time.perf_counter() - start, **fields)
+
+
+def timed_iter(name: str, iterable: Iterable[Any]) -> Iterable[Any]:
+    """Time how long an iterable spends producing items.
+
+    The total is recorded as a single ``name`` measurement once the
+    iterable is exhausted, which suits lazily-rendered output streams.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return iterable
+    return _timed_iter(metrics, name, iterable)
+
+
+def _timed_iter(
+    metrics: RunMetrics, name: str, iterable: Iterable[Any]
+) -> Iterator[Any]:
+    iterator = iter(iterable)
+    elapsed = 0.0
+    items = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            items += 1
+            yield item
+    finally:
+        metrics.record(name, elapsed, fragments=items)
@@ -1,8 +1,11 @@
 """Data models for homework assignments and packets."""
 
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from pydantic import BaseModel, Field
 
+# Shown in answer keys for questions the model gave no answer for
+MISSING_ANSWER = "(no answer provided)"
+
 
 class AssignmentRequest(BaseModel):
     """Request model for generating an assignment."""
@@ -41,6 +44,36 @@ class Assignment(BaseModel):
     learning_objectives: Optional[List[str]] = Field(
         default=None, description="Learning objectives"
     )
+    answers: Optional[List[str]] = Field(
+        default=None, description="Answers to the questions, in the same order"
+    )
+
+    @property
+    def has_answers(self) -> bool:
+        """Return whether the assignment carries an answer key."""
+        return bool(self.answers)
+
+    def question_answers(self) -> List[Tuple[str, str]]:
+        """Pair each question with its answer, marking missing answers."""
+        answers = self.answers or []
+        return [
+            (question, answers[i] if i < len(answers) else MISSING_ANSWER)
+            for i, question in enumerate(self.questions)
+        ]
+
+
+class Student(BaseModel):
+    """A student on a class list, for personalized copies of a packet."""
+
+    name: str = Field(..., min_length=1, description="Student name")
+    student_id: Optional[str] = Field(default=None, description="Student ID")
+
+    @property
+    def label(self) -> str:
+        """Header text stamped on the student's copy."""
+        if self.student_id:
+            return f"Name: {self.name}    ID: {self.student_id}"
+        return f"Name: {self.name}"
 
 
 class HomeworkPacket(BaseModel):
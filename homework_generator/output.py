@@ -0,0 +1,217 @@
+"""Writing homework packets in the supported output formats.
+
+PDF output goes through WeasyPrint; HTML, Markdown and JSON are written
+directly from the assignments. ``pdf_generator`` (and so WeasyPrint) is
+only imported when a PDF is requested, which keeps non-print runs free
+of its import and layout cost.
+"""
+
+import csv
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from . import metrics
+from .config import PDFConfig
+from .formatter import AssignmentFormatter
+from .models import Assignment, HomeworkPacket, Student
+from .versions import PacketVersion, apply_version
+
+# Output format -> default file extension
+OUTPUT_FORMATS = {
+    "pdf": ".pdf",
+    "html": ".html",
+    "md": ".md",
+    "json": ".json",
+}
+
+
+def build_packet(
+    assignments: List[Assignment], topic: str, model: str
+) -> HomeworkPacket:
+    """Wrap generated assignments in a packet stamped with the current time."""
+    return HomeworkPacket(
+        assignments=assignments,
+        topic=topic,
+        generated_at=datetime.now().isoformat(),
+        model_used=model,
+    )
+
+
+def answer_key_path(output_path: Path) -> Path:
+    """Return the answer-key path that accompanies a packet output path."""
+    return output_path.with_name(f"{output_path.stem}_answers{output_path.suffix}")
+
+
+def variant_path(output_path: Path, variant: int) -> Path:
+    """Return the output path for version ``variant`` (1-based) of a packet."""
+    return output_path.with_name(f"{output_path.stem}_v{variant}{output_path.suffix}")
+
+
+def version_path(output_path: Path, label: str) -> Path:
+    """Return the output path of shuffled version ``label``: OUTPUT_<label>.EXT."""
+    return output_path.with_name(f"{output_path.stem}_{label}{output_path.suffix}")
+
+
+def student_path(output_path: Path, index: int, student: Student) -> Path:
+    """Return the path of a student's copy: OUTPUT_<nn>_<name>.EXT."""
+    slug = re.sub(r"[^\w-]+", "_", student.name).strip("_")[:30] or "student"
+    return output_path.with_name(
+        f"{output_path.stem}_{index:02d}_{slug}{output_path.suffix}"
+    )
+
+
+def read_class_list(path: Path) -> List[Student]:
+    """Read students from a CSV file with a name and optional ID per row.
+
+    A first row whose first cell is ``name`` is treated as a header; blank
+    rows are skipped.
+    """
+    students: List[Student] = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.reader(f):
+            cells = [cell.strip() for cell in row]
+            if not cells or not cells[0]:
+                continue
+            if not students and cells[0].lower() == "name":
+                continue
+            student_id = cells[1] if len(cells) > 1 and cells[1] else None
+            students.append(Student(name=cells[0], student_id=student_id))
+    return students
+
+
+def write_class_set(
+    packet: HomeworkPacket,
+    output_path: Path,
+    students: Sequence[Student],
+    formatter: Optional[AssignmentFormatter] = None,
+    pdf_config: Optional[PDFConfig] = None,
+) -> List[Path]:
+    """Write a PDF copy of the packet per student, headed with their name.
+
+    The packet is rendered once; see ``PDFGenerator.generate_class_set``.
+
+    Returns:
+        The path of each student's copy, in class-list order
+    """
+    from .pdf_generator import PDFGenerator
+
+    pdf_config = pdf_config or PDFConfig()
+    formatter = formatter or AssignmentFormatter(theme=pdf_config.theme)
+    paths = [
+        student_path(output_path, i, student) for i, student in enumerate(students, 1)
+    ]
+    PDFGenerator.from_config(pdf_config).generate_class_set(
+        metrics.timed_iter(
+            "html_format", formatter.iter_packet_html(packet.assignments)
+        ),
+        students,
+        paths,
+    )
+    return paths
+
+
+def answer_key_data(packet: HomeworkPacket) -> Dict[str, Any]:
+    """Build the JSON answer key: questions paired with answers."""
+    return {
+        "topic": packet.topic,
+        "generated_at": packet.generated_at,
+        "assignments": [
+            {
+                "title": assignment.title,
+                "answers": [
+                    {"question": question, "answer": answer}
+                    for question, answer in assignment.question_answers()
+                ],
+            }
+            for assignment in packet.assignments
+        ],
+    }
+
+
+def write_packet(
+    packet: HomeworkPacket,
+    output_path: Path,
+    output_format: str = "pdf",
+    formatter: Optional[AssignmentFormatter] = None,
+    pdf_config: Optional[PDFConfig] = None,
+    answer_key: bool = False,
+    version: Optional[PacketVersion] = None,
+) -> None:
+    """Write a packet to ``output_path`` in ``output_format``.
+
+    Args:
+        packet: Packet to write
+        output_path: Destination file
+        output_format: One of ``OUTPUT_FORMATS``
+        formatter: Formatter for HTML, Markdown and PDF output
+        pdf_config: PDF options, used for PDF output only
+        answer_key: Write the packet's answer key instead of the worksheets
+        version: Write this shuffled version of the packet; see ``versions``
+
+    Raises:
+        ValueError: If the output format is unknown
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format '{output_format}'. "
+            f"Available: {', '.join(OUTPUT_FORMATS)}"
+        )
+
+    pdf_config = pdf_config or PDFConfig()
+    formatter = formatter or AssignmentFormatter(theme=pdf_config.theme)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    iter_html: Callable[[List[Assignment]], Iterator[str]]
+    if answer_key:
+        iter_html = formatter.iter_answer_key_html
+        format_markdown = formatter.format_answer_key_markdown
+    else:
+        iter_html = formatter.iter_packet_html
+        format_markdown = formatter.format_packet_markdown
+
+    if version is not None:
+        shuffled = version
+
+        # HTML and PDF reuse the formatter's cached fragments across versions
+        def iter_shuffled_html(assignments: List[Assignment]) -> Iterator[str]:
+            return formatter.iter_version_html(assignments, shuffled, answer_key)
+
+        iter_html = iter_shuffled_html
+
+        if output_format in ("md", "json"):
+            packet = packet.model_copy(
+                update={"assignments": apply_version(packet.assignments, version)}
+            )
+
+    if output_format == "pdf":
+        from .pdf_generator import PDFGenerator
+
+        # Fragments are rendered lazily as the PDF renderer consumes them
+        PDFGenerator.from_config(pdf_config).generate_pdf_from_fragments(
+            metrics.timed_iter("html_format", iter_html(packet.assignments)),
+            output_path,
+        )
+    elif output_format == "html":
+        with metrics.stage("html_format"):
+            with open(output_path, "w", encoding="utf-8") as f:
+                for fragment in iter_html(packet.assignments):
+                    f.write(fragment)
+    elif output_format == "md":
+        with metrics.stage("md_format"):
+            text = format_markdown(packet.assignments)
+            if version is not None:
+                text = f"**Version {version.label}**\n\n{text}"
+            output_path.write_text(text, encoding="utf-8")
+    else:
+        with metrics.stage("json_format"):
+            if answer_key:
+                text = json.dumps(answer_key_data(packet), indent=2)
+            else:
+                # Worksheets never carry the answers
+                text = packet.model_dump_json(
+                    indent=2, exclude={"assignments": {"__all__": {"answers"}}}
+                )
+            output_path.write_text(text, encoding="utf-8")
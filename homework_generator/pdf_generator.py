@@ -1,17 +1,221 @@
 """PDF generation from HTML content."""
 
+import io
+import os
+import re
+import tempfile
+from functools import lru_cache
+from html import escape
 from pathlib import Path
-from typing import List
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    TYPE_CHECKING,
+    Union,
+)
 from weasyprint import HTML, CSS
-from .models import Assignment
+from weasyprint.text.fonts import FontConfiguration
+
+from . import metrics, resources, tracing
+from .config import PDFConfig
+from .html_builder import HTMLBuilder
+from .models import Assignment, Student
+
+if TYPE_CHECKING:
+    from _typeshed import WriteableBuffer
+
+try:
+    import pypdf
+
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+
+# HTML as a complete string or as an iterable of fragments
+HTMLSource = Union[str, Iterable[str]]
+
+
+def _current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Read once: os.umask can only be queried by setting it, which races threads
+_UMASK = _current_umask()
+
+# Page margin box that carries the student header on class-set copies
+STAMP_CSS = """
+@page {{
+    @top-right {{
+        content: {label};
+        font-family: Arial, sans-serif;
+        font-size: 10pt;
+        color: #333;
+    }}
+}}
+"""
+# A single blank page laid out with the packet's page size and margins, so
+# its margin boxes sit exactly where they would on the packet's pages
+_STAMP_HTML = "<!DOCTYPE html><html><body></body></html>"
+
+# @page declarations that place the margin boxes
+_PAGE_BOX_PROPERTY = re.compile(r"(size|margin(-(top|right|bottom|left))?)\s*:")
+
+
+def _page_box_css(css: str) -> str:
+    """Return only the size and margin declarations of the @page rules in ``css``.
+
+    The stamp page is laid out with these alone: any other packet style,
+    such as a page or body background, would make the stamp opaque and hide
+    the packet page it is merged onto.
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    rules = []
+    for match in re.finditer(r"@page\b([^{;]*)\{", css):
+        depth = 1
+        position = match.end()
+        text: List[str] = []
+        declarations: List[str] = []
+        while position < len(css) and depth:
+            char = css[position]
+            position += 1
+            if char == "{":
+                # Margin boxes and other nested rules are dropped
+                depth += 1
+                text = []
+            elif char == "}":
+                depth -= 1
+            elif depth == 1 and char == ";":
+                declarations.append("".join(text).strip())
+                text = []
+            elif depth == 1:
+                text.append(char)
+        declarations.append("".join(text).strip())
+        kept = [d for d in declarations if _PAGE_BOX_PROPERTY.match(d)]
+        if kept:
+            rules.append(f"@page{match.group(1).rstrip()} {{ {'; '.join(kept)}; }}")
+    return "\n".join(rules)
+
+
+def _css_string(text: str) -> str:
+    """Quote ``text`` as a CSS string literal."""
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\A ")
+    return f'"{escaped}"'
+
+
+class _FragmentReader(io.RawIOBase):
+    """Readable UTF-8 byte stream over an iterable of text fragments."""
+
+    def __init__(self, fragments: Iterable[str]):
+        self._fragments = iter(fragments)
+        self._pending = b""
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: "WriteableBuffer") -> int:
+        while self._offset >= len(self._pending):
+            fragment = next(self._fragments, None)
+            if fragment is None:
+                return 0
+            self._pending = fragment.encode("utf-8")
+            self._offset = 0
+
+        view = memoryview(buffer).cast("B")
+        size = min(len(view), len(self._pending) - self._offset)
+        view[:size] = self._pending[self._offset : self._offset + size]
+        self._offset += size
+        return size
+
+
+@lru_cache(maxsize=None)
+def shared_font_config() -> FontConfiguration:
+    """Return the process-wide font configuration.
+
+    Font discovery through fontconfig is done once and reused by every
+    render instead of being repeated per document.
+    """
+    return FontConfiguration()
 
 
 class PDFGenerator:
-    """Generates PDFs from HTML content."""
+    """Generates PDFs from HTML content.
+
+    By default the packaged stylesheet for ``theme`` is used; pass
+    ``styles_path`` to load one from disk instead. The stylesheet is parsed
+    once per generator and fonts are shared across generators.
 
-    def __init__(self, styles_path: Path = Path("templates/styles.css")):
+    Output options:
+        subset_fonts: Embed only the glyphs a document uses; disable to
+            embed whole fonts (larger files that are easier to edit)
+        compress: Compress PDF content streams
+        optimize_images: Losslessly recompress embedded images
+        jpeg_quality: Re-encode JPEG images at this quality (0-95)
+        dpi: Downsample embedded images to at most this resolution
+        pdf_variant: Archival or accessibility variant such as ``pdf/a-3b``
+            or ``pdf/ua-1``
+        atomic_writes: Write path outputs to a temporary file next to the
+            target and rename it into place, so readers never see a
+            partial PDF
+    """
+
+    def __init__(
+        self,
+        styles_path: Optional[Path] = None,
+        theme: str = resources.DEFAULT_THEME,
+        subset_fonts: bool = True,
+        compress: bool = True,
+        optimize_images: bool = False,
+        jpeg_quality: Optional[int] = None,
+        dpi: Optional[int] = None,
+        pdf_variant: Optional[str] = None,
+        atomic_writes: bool = False,
+    ):
         self.styles_path = styles_path
+        self.atomic_writes = atomic_writes
+        self.stylesheet = resources.theme_stylesheet(theme)
+        self.subset_fonts = subset_fonts
+        # WeasyPrint rendering and output options. No image cache is passed,
+        # so WeasyPrint keeps one per render: repeated images in a document
+        # are decoded and optimized once, and freed with the document
+        self.pdf_options: Dict[str, Any] = {
+            "full_fonts": not subset_fonts,
+            "uncompressed_pdf": not compress,
+            "optimize_images": optimize_images,
+            "jpeg_quality": jpeg_quality,
+            "dpi": dpi,
+            "pdf_variant": pdf_variant,
+        }
+        self._css: Optional[List[CSS]] = None
+        self._page_css: Optional[str] = None
+
+    @classmethod
+    def from_config(
+        cls, config: PDFConfig, styles_path: Optional[Path] = None
+    ) -> "PDFGenerator":
+        """Create a generator from the ``pdf`` section of the app config."""
+        return cls(
+            styles_path=styles_path,
+            theme=config.theme,
+            subset_fonts=config.subset_fonts,
+            compress=config.compress,
+            optimize_images=config.optimize_images,
+            jpeg_quality=config.jpeg_quality,
+            dpi=config.dpi,
+            pdf_variant=config.pdf_variant,
+            atomic_writes=config.atomic_writes,
+        )
 
+    @tracing.traced("pdf.generate_pdf")
     def generate_pdf(self, html_content: str, output_path: Path) -> None:
         """Generate PDF from HTML content.
 
@@ -19,21 +223,201 @@ class PDFGenerator:
             html_content: HTML content to convert to PDF
             output_path: Path where PDF should be saved
         """
+        self._write_pdf(self._parse(html_content), output_path)
+
+    @tracing.traced("pdf.generate_pdf_from_fragments")
+    def generate_pdf_from_fragments(
+        self, fragments: Iterable[str], output_path: Path
+    ) -> None:
+        """Generate PDF from a stream of HTML fragments.
+
+        The fragments are fed to the HTML parser incrementally, so the
+        document is never joined into one string first. Pair with
+        ``AssignmentFormatter.iter_packet_html`` for large packets.
+
+        Args:
+            fragments: HTML document as an iterable of text fragments
+            output_path: Path where PDF should be saved
+        """
+        self._write_pdf(self._parse(fragments), output_path)
+
+    @tracing.traced("pdf.render_to_stream")
+    def render_to_stream(self, html: HTMLSource, stream: BinaryIO) -> None:
+        """Render a PDF into a writable binary file object.
+
+        Args:
+            html: HTML content, or an iterable of HTML fragments
+            stream: Binary file object the PDF is written to, e.g. an upload
+                buffer or socket file
+        """
+        document = self._layout(self._parse(html))
+        with metrics.stage("pdf_write") as info:
+            start = stream.tell() if stream.seekable() else None
+            document.write_pdf(stream, **self.pdf_options)
+            if start is not None and (metrics.active() or tracing.is_enabled()):
+                info["bytes"] = stream.tell() - start
+                tracing.set_attribute("pdf.bytes", info["bytes"])
+
+    def render_to_bytes(self, html: HTMLSource) -> bytes:
+        """Render a PDF in memory and return its bytes.
+
+        Args:
+            html: HTML content, or an iterable of HTML fragments
+        """
+        buffer = io.BytesIO()
+        self.render_to_stream(html, buffer)
+        return buffer.getvalue()
+
+    @tracing.traced("pdf.generate_class_set")
+    def generate_class_set(
+        self,
+        html: HTMLSource,
+        students: Sequence[Student],
+        output_paths: Sequence[Path],
+    ) -> None:
+        """Write one copy of a packet per student, headed with their name.
+
+        The packet HTML is parsed once. With pypdf installed it is also laid
+        out and written once, and each copy overlays a one-page stamp with
+        the student's header onto the rendered pages, so a class set costs
+        about one render. Without pypdf each copy is laid out again from the
+        parsed document with the header added.
+
+        Args:
+            html: HTML content, or an iterable of HTML fragments
+            students: Students to make copies for
+            output_paths: PDF path for each student's copy, in order
+        """
+        if len(students) != len(output_paths):
+            raise ValueError("Need one output path per student")
+        for path in output_paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+        html_doc = self._parse(html)
+        if not PYPDF_AVAILABLE:
+            for student, path in zip(students, output_paths):
+                stamp = CSS(
+                    string=self._stamp_css(student), font_config=shared_font_config()
+                )
+                document = self._layout(html_doc, extra_stylesheets=[stamp])
+                with metrics.stage("pdf_write"):
+                    self._save(document, path)
+            return
+
+        document = self._layout(html_doc)
+        with metrics.stage("pdf_write"):
+            packet = pypdf.PdfReader(io.BytesIO(document.write_pdf(**self.pdf_options)))
+        for student, path in zip(students, output_paths):
+            with metrics.stage("pdf_stamp") as info:
+                stamp = pypdf.PdfReader(io.BytesIO(self._render_stamp(student)))
+                stamp_page = stamp.pages[0]
+                copy = pypdf.PdfWriter(clone_from=packet)
+                for page in copy.pages:
+                    page.merge_page(stamp_page)
+                if self.atomic_writes:
+                    self._write_atomic(copy.write, path)
+                else:
+                    copy.write(str(path))
+                if metrics.active() or tracing.is_enabled():
+                    info["bytes"] = path.stat().st_size
+
+    def _stamp_css(self, student: Student) -> str:
+        return STAMP_CSS.format(label=_css_string(student.label))
+
+    def _render_stamp(self, student: Student) -> bytes:
+        """Render a transparent page with only the student's header."""
+        if self._page_css is None:
+            self._page_css = _page_box_css(self._load_styles())
+        stamp = CSS(
+            string=self._page_css + self._stamp_css(student),
+            font_config=shared_font_config(),
+        )
+        document = HTML(string=_STAMP_HTML).render(
+            stylesheets=[stamp],
+            font_config=shared_font_config(),
+            **self.pdf_options,
+        )
+        pdf: bytes = document.write_pdf(**self.pdf_options)
+        return pdf
+
+    def _parse(self, html: HTMLSource) -> HTML:
+        """Parse HTML given as a string or as an iterable of fragments."""
+        with metrics.stage("pdf_parse"):
+            if isinstance(html, str):
+                return HTML(string=html)
+            stream = io.BufferedReader(_FragmentReader(html))
+            return HTML(file_obj=stream, encoding="utf-8")
+
+    def _layout(self, html_doc: HTML, extra_stylesheets: Sequence[CSS] = ()) -> Any:
+        """Lay out a parsed HTML document into pages."""
+        with metrics.stage("pdf_layout") as info:
+            document = html_doc.render(
+                stylesheets=self._stylesheets() + list(extra_stylesheets),
+                font_config=shared_font_config(),
+                **self.pdf_options,
+            )
+            if metrics.active() or tracing.is_enabled():
+                info["pages"] = len(document.pages)
+                tracing.set_attribute("pdf.pages", info["pages"])
+        return document
+
+    def _write_pdf(self, html_doc: HTML, output_path: Path) -> None:
+        """Lay out a parsed HTML document and write it to a PDF file."""
         # Ensure output directory exists
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Load CSS styles
-        css_content = self._load_styles()
+        document = self._layout(html_doc)
 
-        # Create HTML document
-        html_doc = HTML(string=html_content)
+        with metrics.stage("pdf_write") as info:
+            self._save(document, output_path)
+            if metrics.active() or tracing.is_enabled():
+                info["bytes"] = output_path.stat().st_size
+                tracing.set_attribute("pdf.bytes", info["bytes"])
 
-        # Apply CSS if available
-        if css_content:
-            css_doc = CSS(string=css_content)
-            html_doc.write_pdf(str(output_path), stylesheets=[css_doc])
+    def _save(self, document: Any, output_path: Path) -> None:
+        """Write a laid-out document to ``output_path``."""
+        if self.atomic_writes:
+            self._write_atomic(
+                lambda f: document.write_pdf(f, **self.pdf_options), output_path
+            )
         else:
-            html_doc.write_pdf(str(output_path))
+            document.write_pdf(str(output_path), **self.pdf_options)
+
+    def _write_atomic(
+        self, write: Callable[[BinaryIO], Any], output_path: Path
+    ) -> None:
+        """Write to a temporary file in the target directory, then rename.
+
+        The rename is atomic on POSIX and Windows when source and target are
+        on the same filesystem, which keeping the temporary file next to the
+        target guarantees.
+        """
+        fd, temp_name = tempfile.mkstemp(
+            dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            # mkstemp creates files readable by the owner only
+            os.chmod(temp_name, 0o666 & ~_UMASK)
+            os.replace(temp_name, output_path)
+        except BaseException:
+            try:
+                os.unlink(temp_name)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _stylesheets(self) -> List[CSS]:
+        """Parse the stylesheet on first use and reuse it for later renders."""
+        if self._css is None:
+            css_content = self._load_styles()
+            self._css = (
+                [CSS(string=css_content, font_config=shared_font_config())]
+                if css_content
+                else []
+            )
+        return self._css
 
     def generate_packet_pdf(
         self, assignments: List[Assignment], output_path: Path, template_content: str
@@ -46,22 +430,25 @@ class PDFGenerator:
             template_content: HTML template for formatting assignments
         """
         # Combine all assignments into a single HTML document
-        all_assignments_html = ""
+        parts = []
 
         for i, assignment in enumerate(assignments):
             # Add page break before each assignment (except the first)
             if i > 0:
-                all_assignments_html += '<div style="page-break-before: always;"></div>'
+                parts.append('<div style="page-break-before: always;"></div>')
 
             # Format assignment using template
-            assignment_html = template_content.format(
-                title=assignment.title,
-                subject=assignment.subject,
-                difficulty=assignment.difficulty,
-                questions=self._format_questions_html(assignment.questions),
-                instructions=assignment.instructions or "",
+            parts.append(
+                template_content.format(
+                    title=escape(assignment.title),
+                    subject=escape(assignment.subject),
+                    difficulty=escape(assignment.difficulty),
+                    questions=self._format_questions_html(assignment.questions),
+                    instructions=escape(assignment.instructions or ""),
+                )
             )
-            all_assignments_html += assignment_html
+
+        all_assignments_html = "".join(parts)
 
         # Generate PDF from combined HTML
         self.generate_pdf(all_assignments_html, output_path)
@@ -78,12 +465,7 @@ class PDFGenerator:
         if not questions:
             return "<p>No questions available.</p>"
 
-        html_questions = "<ol>"
-        for question in questions:
-            html_questions += f"<li>{question}</li>"
-        html_questions += "</ol>"
-
-        return html_questions
+        return HTMLBuilder().list("ol", questions).build()
 
     def _load_styles(self) -> str:
         """Load CSS styles for PDF generation.
@@ -91,6 +473,13 @@ class PDFGenerator:
         Returns:
             CSS content as string, empty if file doesn't exist
         """
+        if self.styles_path is None:
+            try:
+                return resources.read_text(self.stylesheet)
+            except OSError as e:
+                print(f"Warning: Could not load packaged styles: {e}")
+                return ""
+
         try:
             if self.styles_path.exists():
                 return self.styles_path.read_text(encoding="utf-8")
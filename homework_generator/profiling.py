@@ -0,0 +1,288 @@
+"""Profiling of PDF rendering.
+
+Renders an HTML document or packet JSON through :class:`PDFGenerator` and
+reports where the time goes: HTML parsing, CSS cascade, box tree
+construction, layout and PDF writing, plus per-page layout and paint cost.
+The run is also profiled, either by sampling the Python stack (written as
+folded stacks for flamegraph.pl or speedscope) or with cProfile (written
+as a pstats file for snakeviz or flameprof).
+"""
+
+import cProfile
+import functools
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from . import metrics, resources
+from .formatter import AssignmentFormatter
+from .models import Assignment
+
+PROFILE_MODES = ("sample", "cprofile")
+
+# WeasyPrint internals timed as render phases: (module, attribute, phase)
+WEASYPRINT_PHASES = (
+    ("weasyprint.document", "get_all_computed_styles", "css_cascade"),
+    ("weasyprint.document", "build_formatting_structure", "box_tree"),
+    ("weasyprint.document", "layout_document", "layout"),
+)
+
+
+class ProfileReport:
+    """Timings gathered while profiling a render."""
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self.page_layout: List[float] = []
+        self.page_paint: List[float] = []
+        self.total_seconds = 0.0
+        self.profile_path: Optional[Path] = None
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @property
+    def pages(self) -> int:
+        return max(len(self.page_layout), len(self.page_paint))
+
+    def page_costs(self) -> List[float]:
+        """Layout plus paint time for each page."""
+        return [
+            (self.page_layout[i] if i < len(self.page_layout) else 0.0)
+            + (self.page_paint[i] if i < len(self.page_paint) else 0.0)
+            for i in range(self.pages)
+        ]
+
+
+class StackSampler:
+    """Samples a thread's Python stack at a fixed interval.
+
+    Samples are aggregated as folded stacks (``frame;frame;frame count``),
+    the input format of flamegraph.pl and speedscope. The sampling thread
+    needs the GIL, so the effective interval is bounded below by
+    ``sys.getswitchinterval()``.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._target: Optional[int] = None
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        target = self._target
+        if target is None:
+            return
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_folded(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def load_html_fragments(
+    input_path: Path, theme: str = resources.DEFAULT_THEME
+) -> Iterable[str]:
+    """Load a render input as HTML fragments.
+
+    ``.json`` files are treated as packets: either a serialized
+    ``HomeworkPacket``, an object with an ``assignments`` list, or a bare list
+    of assignments, formatted with ``theme``. Anything else is read as HTML.
+    """
+    if input_path.suffix.lower() != ".json":
+        return [input_path.read_text(encoding="utf-8")]
+
+    data = json.loads(input_path.read_text(encoding="utf-8"))
+    items = data["assignments"] if isinstance(data, dict) else data
+    assignments = [Assignment(**item) for item in items]
+    return AssignmentFormatter(theme=theme).iter_packet_html(assignments)
+
+
+def _timed_call(
+    func: Callable[..., Any], phase: str, report: ProfileReport
+) -> Callable[..., Any]:
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            report.add_phase(phase, time.perf_counter() - start)
+
+    return wrapper
+
+
+def _timed_pages(
+    func: Callable[..., Iterable[Any]], report: ProfileReport
+) -> Callable[..., Iterator[Any]]:
+    # Repagination calls this once per pass; page costs accumulate by index
+    def wrapper(*args: Any, **kwargs: Any) -> Iterator[Any]:
+        start = time.perf_counter()
+        for index, page in enumerate(func(*args, **kwargs)):
+            elapsed = time.perf_counter() - start
+            if index < len(report.page_layout):
+                report.page_layout[index] += elapsed
+            else:
+                report.page_layout.append(elapsed)
+            yield page
+            start = time.perf_counter()
+
+    return wrapper
+
+
+def _timed_paint(func: Callable[..., Any], report: ProfileReport) -> Callable[..., Any]:
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            report.page_paint.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+@contextmanager
+def weasyprint_phase_hooks(report: ProfileReport) -> Iterator[None]:
+    """Temporarily wrap WeasyPrint internals to time render phases.
+
+    Hooks whose targets are missing (e.g. in a different WeasyPrint version)
+    are skipped, so those phases are simply not reported.
+    """
+    import importlib
+
+    patches: List[Any] = []
+
+    def patch(
+        module_name: str,
+        owner_attr: Optional[str],
+        name: str,
+        make: Callable[[Callable[..., Any]], Callable[..., Any]],
+    ) -> None:
+        try:
+            owner: Any = importlib.import_module(module_name)
+        except ImportError:
+            return
+        if owner_attr:
+            owner = getattr(owner, owner_attr, None)
+        original = getattr(owner, name, None)
+        if original is None:
+            return
+        setattr(owner, name, make(original))
+        patches.append((owner, name, original))
+
+    for module_name, name, phase in WEASYPRINT_PHASES:
+        patch(
+            module_name,
+            None,
+            name,
+            functools.partial(_timed_call, phase=phase, report=report),
+        )
+    patch(
+        "weasyprint.layout", None, "make_all_pages", lambda f: _timed_pages(f, report)
+    )
+    patch("weasyprint.document", "Page", "paint", lambda f: _timed_paint(f, report))
+
+    try:
+        yield
+    finally:
+        for owner, name, original in reversed(patches):
+            setattr(owner, name, original)
+
+
+def profile_render(
+    fragments: Iterable[str],
+    pdf_path: Path,
+    profile_path: Path,
+    mode: str = "sample",
+    interval: float = 0.001,
+    styles_path: Optional[Path] = None,
+    theme: str = resources.DEFAULT_THEME,
+) -> ProfileReport:
+    """Render HTML fragments to a PDF while profiling.
+
+    Args:
+        fragments: HTML document as an iterable of text fragments
+        pdf_path: Where to write the rendered PDF
+        profile_path: Where to write the folded stacks or pstats profile
+        mode: ``sample`` for stack sampling, ``cprofile`` for cProfile
+        interval: Sampling interval in seconds (``sample`` mode)
+        styles_path: Stylesheet override, as for ``PDFGenerator``
+        theme: Packaged PDF theme, as for ``PDFGenerator``
+    """
+    from .pdf_generator import PDFGenerator
+
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+
+    report = ProfileReport()
+    generator = PDFGenerator(styles_path=styles_path, theme=theme)
+    sampler = StackSampler(interval) if mode == "sample" else None
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+    run_metrics = metrics.RunMetrics()
+
+    start = time.perf_counter()
+    with metrics.collect(run_metrics), weasyprint_phase_hooks(report):
+        if sampler:
+            sampler.start()
+        if profiler:
+            profiler.enable()
+        try:
+            generator.generate_pdf_from_fragments(
+                metrics.timed_iter("html_format", fragments), pdf_path
+            )
+        finally:
+            if profiler:
+                profiler.disable()
+            if sampler:
+                sampler.stop()
+    report.total_seconds = time.perf_counter() - start
+
+    # The parser pulls fragments as it goes, so formatting happens inside
+    # pdf_parse; report parsing net of it.
+    stage_seconds: Dict[str, float] = {}
+    for record in run_metrics.records:
+        stage_seconds[record["stage"]] = (
+            stage_seconds.get(record["stage"], 0.0) + record["seconds"]
+        )
+    html_format = stage_seconds.get("html_format", 0.0)
+    phases = {
+        "html_format": html_format,
+        "html_parse": stage_seconds.get("pdf_parse", 0.0) - html_format,
+    }
+    phases.update(report.phases)
+    phases["pdf_write"] = stage_seconds.get("pdf_write", 0.0)
+    report.phases = phases
+
+    if sampler:
+        sampler.write_folded(profile_path)
+    if profiler:
+        profiler.dump_stats(str(profile_path))
+    report.profile_path = profile_path
+
+    return report
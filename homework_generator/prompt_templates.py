@@ -1,31 +1,130 @@
 """Template system for LLM prompts."""
 
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 import jinja2
 
+from . import resources
+from .jinja_env import get_environment, split_front_matter
+
+PROMPTS_SUBDIR = "prompts"
+FALLBACK_TEMPLATE = "generic"
+
+
+@dataclass
+class TemplateInfo:
+    """A discovered prompt template and its front-matter metadata."""
+
+    name: str
+    path: Any  # Path, or an importlib.resources Traversable for packaged templates
+    mtime: float
+    template: jinja2.Template
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def subject(self) -> Optional[str]:
+        """Subject area declared in the template front-matter."""
+        return self.metadata.get("subject")
+
+    @property
+    def description(self) -> Optional[str]:
+        """Short description declared in the template front-matter."""
+        return self.metadata.get("description")
+
+    @property
+    def default_count(self) -> Optional[int]:
+        """Number of assignments to generate when none is requested."""
+        count = self.metadata.get("default_count")
+        if isinstance(count, int) and not isinstance(count, bool) and count > 0:
+            return count
+        return None
+
+    @property
+    def engine(self) -> Optional[str]:
+        """Local generator that replaces the LLM for this template, if any."""
+        return self.metadata.get("engine")
+
 
 class PromptTemplateManager:
-    """Manages prompt templates and rendering."""
+    """Manages prompt templates and rendering.
+
+    By default the prompt templates shipped inside the package are used;
+    pass ``templates_dir`` to load them from a directory instead.
+    Templates are discovered and compiled once at construction time, so
+    lookups and renders are served from memory. With ``auto_reload``
+    enabled, each render first checks template mtimes and recompiles any
+    that changed on disk, which suits long-running processes.
+    """
 
-    def __init__(self, templates_dir: Path = Path("templates/prompts")):
+    def __init__(self, templates_dir: Optional[Path] = None, auto_reload: bool = False):
         self.templates_dir = templates_dir
-        self.env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(templates_dir),
-            autoescape=jinja2.select_autoescape(["html", "xml"]),
-        )
+        self.auto_reload = auto_reload
+        if templates_dir is None:
+            self.env = get_environment(
+                package_path=f"{resources.TEMPLATES_PACKAGE_PATH}/{PROMPTS_SUBDIR}"
+            )
+            self._source_dir = resources.get_resource(PROMPTS_SUBDIR)
+        else:
+            self.env = get_environment(templates_dir)
+            self._source_dir = templates_dir
+        self._registry: Dict[str, TemplateInfo] = {}
+        self.reload()
 
     def get_available_templates(self) -> list[str]:
         """Get list of available template names."""
-        if not self.templates_dir.exists():
-            return []
-        return [f.stem for f in self.templates_dir.glob("*.md")]
+        return sorted(self._registry)
+
+    def get_template_info(self, template_name: str) -> Optional[TemplateInfo]:
+        """Get the registry entry for a template, if it exists."""
+        return self._registry.get(template_name)
 
     def render_template(self, template_name: str, **kwargs) -> str:
         """Render a template with given parameters."""
-        try:
-            template = self.env.get_template(f"{template_name}.md")
-            return template.render(**kwargs)
-        except jinja2.TemplateNotFound:
-            # Fall back to generic template
-            template = self.env.get_template("generic.md")
-            return template.render(**kwargs)
+        if self.auto_reload:
+            self.reload()
+
+        info = self._registry.get(template_name) or self._registry.get(
+            FALLBACK_TEMPLATE
+        )
+        if info is None:
+            raise jinja2.TemplateNotFound(template_name)
+        return info.template.render(**kwargs)
+
+    def reload(self) -> List[str]:
+        """Rescan the templates directory, recompiling changed templates.
+
+        Returns:
+            Names of templates that were added, changed or removed
+        """
+        if not self._source_dir.is_dir():
+            changed = list(self._registry)
+            self._registry = {}
+            return changed
+
+        registry = {}
+        changed = []
+        for path in self._source_dir.iterdir():
+            if not path.name.endswith(".md"):
+                continue
+            name = path.name[: -len(".md")]
+            # Zipped resources cannot change, so they have no mtime to track
+            mtime = path.stat().st_mtime if isinstance(path, Path) else 0.0
+            current = self._registry.get(name)
+            if current is not None and current.mtime == mtime:
+                registry[name] = current
+                continue
+
+            metadata, _ = split_front_matter(path.read_text(encoding="utf-8"))
+            registry[name] = TemplateInfo(
+                name=name,
+                path=path,
+                mtime=mtime,
+                template=self.env.get_template(path.name),
+                metadata=metadata,
+            )
+            changed.append(name)
+
+        changed.extend(name for name in self._registry if name not in registry)
+        self._registry = registry
+        return changed
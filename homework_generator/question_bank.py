@@ -0,0 +1,208 @@
+"""Persistent bank of generated assignments.
+
+Every assignment the LLM generates is stored in a SQLite database, indexed
+by topic, grade level, difficulty, template and subject, with a full-text
+index (FTS5) over the topic, title and questions. Packets can then be
+assembled from stored assignments in milliseconds, and only the shortfall
+is generated.
+
+SQLite builds without FTS5 fall back to substring matching on the topic.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Tuple, Union
+
+from .models import Assignment
+
+# Templates that match stored assignments from any template
+ANY_TEMPLATE = "generic"
+
+# bm25 weights for the topic, title, subject and questions columns
+_FTS_WEIGHTS = (10.0, 5.0, 1.0, 1.0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    topic TEXT NOT NULL,
+    grade_level TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    template TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    has_answers INTEGER NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assignments_lookup
+    ON assignments (grade_level, difficulty, template);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS assignments_fts USING fts5(
+    topic, title, subject, questions, tokenize = 'porter unicode61'
+)
+"""
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.lower().split())
+
+
+class QuestionBank:
+    """A SQLite question bank, safe to share between threads and processes.
+
+    Args:
+        path: Database file, created if missing
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, check_same_thread=False
+        )
+        # Readers don't block the writer of another process
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            try:
+                self._conn.execute(_FTS_SCHEMA)
+                self.full_text = True
+            except sqlite3.OperationalError:
+                self.full_text = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            row: Tuple[int] = self._conn.execute(
+                "SELECT COUNT(*) FROM assignments"
+            ).fetchone()
+        return row[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def add(
+        self,
+        assignments: Iterable[Assignment],
+        topic: str,
+        grade_level: str,
+        difficulty: str,
+        template: str = ANY_TEMPLATE,
+    ) -> int:
+        """Store assignments generated for a request.
+
+        They are indexed under the request's topic, grade level, difficulty
+        and template. Assignments already in the bank are skipped.
+
+        Returns:
+            The number of assignments added
+        """
+        now = datetime.now().isoformat()
+        added = 0
+        with self._lock, self._conn:
+            for assignment in assignments:
+                data = assignment.model_dump_json()
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO assignments (digest, topic, "
+                    "grade_level, difficulty, template, subject, has_answers, "
+                    "data, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        hashlib.sha256(data.encode()).hexdigest(),
+                        topic,
+                        _normalize(grade_level),
+                        _normalize(difficulty),
+                        template,
+                        assignment.subject,
+                        assignment.has_answers,
+                        data,
+                        now,
+                    ),
+                )
+                if not cursor.rowcount:
+                    continue
+                added += 1
+                if self.full_text:
+                    self._conn.execute(
+                        "INSERT INTO assignments_fts (rowid, topic, title, "
+                        "subject, questions) VALUES (?, ?, ?, ?, ?)",
+                        (
+                            cursor.lastrowid,
+                            topic,
+                            assignment.title,
+                            assignment.subject,
+                            "\n".join(assignment.questions),
+                        ),
+                    )
+        return added
+
+    def search(
+        self,
+        topic: str,
+        grade_level: str,
+        difficulty: str,
+        template: str = ANY_TEMPLATE,
+        limit: int = 5,
+        include_answers: bool = False,
+    ) -> List[Assignment]:
+        """Find up to ``limit`` stored assignments for a request.
+
+        Grade level and difficulty must match; the template must too unless
+        it is ``generic``. Every word of ``topic`` must appear in the stored
+        topic, title, subject or questions. The least used assignments come
+        first, then the most relevant, so repeated packets rotate through
+        the bank. With ``include_answers`` only assignments that have an
+        answer key are returned.
+        """
+        words = re.findall(r"\w+", topic.lower())
+        if not words or limit <= 0:
+            return []
+
+        conditions = ["a.grade_level = ?", "a.difficulty = ?"]
+        params: list = [_normalize(grade_level), _normalize(difficulty)]
+        if template != ANY_TEMPLATE:
+            conditions.append("a.template = ?")
+            params.append(template)
+        if include_answers:
+            conditions.append("a.has_answers = 1")
+
+        if self.full_text:
+            # Quoted terms, implicitly ANDed, so topic text is never FTS syntax
+            match = " ".join(f'"{word}"' for word in words)
+            weights = ", ".join(str(weight) for weight in _FTS_WEIGHTS)
+            sql = (
+                "SELECT a.id, a.data FROM assignments_fts "
+                "JOIN assignments a ON a.id = assignments_fts.rowid "
+                f"WHERE assignments_fts MATCH ? AND {' AND '.join(conditions)} "
+                f"ORDER BY a.uses, bm25(assignments_fts, {weights}) LIMIT ?"
+            )
+            params = [match, *params, limit]
+        else:
+            conditions.extend("lower(a.topic) LIKE ?" for _ in words)
+            params.extend(f"%{word}%" for word in words)
+            sql = (
+                "SELECT a.id, a.data FROM assignments a "
+                f"WHERE {' AND '.join(conditions)} ORDER BY a.uses, a.id LIMIT ?"
+            )
+            params.append(limit)
+
+        with self._lock, self._conn:
+            rows = self._conn.execute(sql, params).fetchall()
+            self._conn.executemany(
+                "UPDATE assignments SET uses = uses + 1 WHERE id = ?",
+                [(row_id,) for row_id, _ in rows],
+            )
+
+        assignments = [Assignment.model_validate_json(data) for _, data in rows]
+        if not include_answers:
+            for assignment in assignments:
+                assignment.answers = None
+        return assignments
@@ -0,0 +1,306 @@
+"""Parameterized question templates, instantiated locally.
+
+Instead of writing every concrete question, the LLM can write a question
+once as a template: text and answer with ``{expression}`` placeholders,
+the variables the expressions use with their ranges, and constraints the
+values must satisfy. Any number of distinct variants is then produced
+locally from a seed, so per-student or per-class versions of a packet cost
+one LLM call instead of one per version.
+
+Expressions come from the model, so they are evaluated by a small
+arithmetic interpreter over the variables, never with ``eval``.
+"""
+
+import ast
+import math
+import operator
+import random
+import string
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+from .models import Assignment
+
+# Samples drawn per question before its constraints are considered unsatisfiable
+MAX_SAMPLES = 200
+# Variants a question must instantiate to be kept from the LLM's templates
+VALIDATION_VARIANTS = 20
+# Largest exponent allowed in ``**``, so a template cannot stall generation
+MAX_EXPONENT = 64
+
+Value = Union[int, float, str]
+
+
+class TemplateError(ValueError):
+    """A question template is malformed or cannot be instantiated."""
+
+
+class Variable(BaseModel):
+    """A value drawn for each variant of a question.
+
+    Either a number in ``[min, max]`` (in multiples of ``step`` from
+    ``min``, rounded to ``decimals`` places) or one of ``choices``.
+    """
+
+    name: str = Field(..., description="Identifier used in expressions")
+    min: Optional[float] = Field(default=None, description="Smallest value")
+    max: Optional[float] = Field(default=None, description="Largest value")
+    step: float = Field(default=1, gt=0, description="Spacing between values")
+    decimals: int = Field(default=0, ge=0, le=6, description="Decimal places")
+    choices: Optional[List[Value]] = Field(
+        default=None, description="Values to pick from instead of a range"
+    )
+
+    @model_validator(mode="after")
+    def _check_domain(self) -> "Variable":
+        if not self.name.isidentifier():
+            raise ValueError(f"Invalid variable name '{self.name}'")
+        if self.choices is not None:
+            if not self.choices:
+                raise ValueError(f"Variable '{self.name}' has no choices")
+        elif self.min is None or self.max is None or self.min > self.max:
+            raise ValueError(
+                f"Variable '{self.name}' needs choices or a min <= max range"
+            )
+        return self
+
+    def sample(self, rng: random.Random) -> Value:
+        """Draw a value for this variable."""
+        if self.choices is not None:
+            return rng.choice(self.choices)
+        # Both set when there are no choices; see _check_domain
+        assert self.min is not None and self.max is not None
+        steps = int((self.max - self.min) // self.step)
+        value = round(self.min + rng.randint(0, steps) * self.step, self.decimals)
+        return int(value) if self.decimals == 0 else value
+
+
+class QuestionTemplate(BaseModel):
+    """A question whose text and answer depend on sampled variables."""
+
+    text: str = Field(..., description="Question text with {expression} fields")
+    answer: str = Field(..., description="Answer text with {expression} fields")
+    variables: List[Variable] = Field(default_factory=list)
+    constraints: List[str] = Field(
+        default_factory=list,
+        description="Expressions that must all be true for a variant",
+    )
+
+    def instantiate(self, rng: random.Random) -> Tuple[str, str]:
+        """Return a question and its answer for freshly sampled values.
+
+        Samples that fail the constraints or can't be evaluated (say, a
+        division by a variable that came out as zero) are drawn again.
+
+        Raises:
+            TemplateError: If no sample within ``MAX_SAMPLES`` satisfies the
+                constraints and evaluates, e.g. because an expression is
+                invalid
+        """
+        error: Optional[TemplateError] = None
+        for _ in range(MAX_SAMPLES):
+            values = {
+                variable.name: variable.sample(rng) for variable in self.variables
+            }
+            try:
+                if all(evaluate(constraint, values) for constraint in self.constraints):
+                    return render(self.text, values), render(self.answer, values)
+            except TemplateError as e:
+                error = e
+        reason = f": {error}" if error is not None else ""
+        raise TemplateError(
+            f"No values satisfy the constraints of '{self.text}' "
+            f"after {MAX_SAMPLES} samples{reason}"
+        )
+
+
+class AssignmentTemplate(BaseModel):
+    """An assignment made of question templates."""
+
+    title: str
+    subject: str
+    difficulty: str
+    grade_level: Optional[str] = None
+    estimated_time: Optional[str] = None
+    instructions: Optional[str] = None
+    materials_needed: Optional[List[str]] = None
+    learning_objectives: Optional[List[str]] = None
+    questions: List[QuestionTemplate] = Field(..., min_length=1)
+
+    def instantiate(self, seed: Any, include_answers: bool = False) -> Assignment:
+        """Build the assignment variant for ``seed``.
+
+        The same seed always gives the same questions.
+        """
+        rng = random.Random(f"{seed}:{self.title}")
+        pairs = [question.instantiate(rng) for question in self.questions]
+        return Assignment(
+            title=self.title,
+            subject=self.subject,
+            difficulty=self.difficulty,
+            grade_level=self.grade_level,
+            estimated_time=self.estimated_time,
+            instructions=self.instructions,
+            materials_needed=self.materials_needed,
+            learning_objectives=self.learning_objectives,
+            questions=[question for question, _ in pairs],
+            answers=[answer for _, answer in pairs] if include_answers else None,
+        )
+
+    def valid_questions(self) -> "AssignmentTemplate":
+        """Return a copy without the questions that cannot be instantiated.
+
+        Each question is instantiated ``VALIDATION_VARIANTS`` times, so one
+        that only fails for some values is caught here rather than while
+        building a later variant.
+        """
+        rng = random.Random(0)
+        questions = []
+        for question in self.questions:
+            try:
+                for _ in range(VALIDATION_VARIANTS):
+                    question.instantiate(rng)
+            except TemplateError:
+                continue
+            questions.append(question)
+        return self.model_copy(update={"questions": questions})
+
+
+_BINARY: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY: Dict[type, Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+    ast.Not: operator.not_,
+}
+_COMPARE: Dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "gcd": math.gcd,
+    "lcm": math.lcm,
+    "sqrt": math.sqrt,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+CONSTANTS = {"pi": math.pi}
+
+
+def evaluate(expression: str, values: Dict[str, Value]) -> Any:
+    """Evaluate an arithmetic expression over ``values``.
+
+    Supports numbers, strings, the variables, arithmetic, comparisons,
+    ``and``/``or``/``not``, ``x if c else y`` and the functions in
+    ``FUNCTIONS``.
+
+    Raises:
+        TemplateError: For syntax outside that subset or a failed evaluation
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+        return _eval(tree.body, values)
+    except TemplateError:
+        raise
+    except (SyntaxError, ArithmeticError, TypeError, ValueError) as e:
+        raise TemplateError(f"Cannot evaluate '{expression}': {e}") from e
+
+
+def _eval(node: ast.AST, values: Dict[str, Value]) -> Any:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id in values:
+            return values[node.id]
+        if node.id in CONSTANTS:
+            return CONSTANTS[node.id]
+        raise TemplateError(f"Unknown variable '{node.id}'")
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        left, right = _eval(node.left, values), _eval(node.right, values)
+        if isinstance(node.op, ast.Pow) and abs(right) > MAX_EXPONENT:
+            raise TemplateError(f"Exponent {right} is too large")
+        if isinstance(node.op, ast.Mult) and (
+            isinstance(left, str) or isinstance(right, str)
+        ):
+            raise TemplateError("Strings cannot be repeated")
+        return _BINARY[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        return _UNARY[type(node.op)](_eval(node.operand, values))
+    if isinstance(node, ast.BoolOp):
+        results = (_eval(value, values) for value in node.values)
+        return all(results) if isinstance(node.op, ast.And) else any(results)
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+        left = _eval(node.left, values)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _eval(comparator, values)
+            if not _COMPARE[type(op)](left, right):
+                return False
+            left = right
+        return True
+    if isinstance(node, ast.IfExp):
+        branch = node.body if _eval(node.test, values) else node.orelse
+        return _eval(branch, values)
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in FUNCTIONS
+        and not node.keywords
+    ):
+        args = [_eval(arg, values) for arg in node.args]
+        return FUNCTIONS[node.func.id](*args)
+    raise TemplateError(f"Unsupported expression: {ast.dump(node)}")
+
+
+def render(text: str, values: Dict[str, Value]) -> str:
+    """Replace each ``{expression}`` or ``{expression:spec}`` in ``text``.
+
+    ``{{`` and ``}}`` produce literal braces; comparisons belong in
+    constraints, since ``!`` and ``:`` end the expression. Without a format spec,
+    numbers are shown without float noise: integral results as integers,
+    others with at most six decimal places.
+    """
+    parts = []
+    try:
+        fields = list(string.Formatter().parse(text))
+    except ValueError as e:
+        raise TemplateError(f"Invalid template '{text}': {e}") from e
+    for literal, expression, spec, conversion in fields:
+        parts.append(literal)
+        if expression is None:
+            continue
+        if conversion:
+            raise TemplateError(f"Conversions like '!{conversion}' are not supported")
+        value = evaluate(expression, values)
+        try:
+            parts.append(format(value, spec) if spec else _format_value(value))
+        except (TypeError, ValueError) as e:
+            raise TemplateError(f"Cannot format '{expression}' as '{spec}': {e}") from e
+    return "".join(parts)
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        # Values that round to zero show as 0, not "0." or "-0."
+        text = f"{value:.6f}".rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+    return str(value)
@@ -0,0 +1,78 @@
+"""Access to packaged templates and stylesheets.
+
+Resources ship inside the ``homework_generator`` package and are located
+with ``importlib.resources``, so they resolve the same way from a source
+checkout, an installed wheel or a zipapp, regardless of the working
+directory. File contents are read once per process and shared between
+components.
+"""
+
+from functools import lru_cache
+from importlib import resources
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from importlib.abc import Traversable
+
+RESOURCE_PACKAGE = "homework_generator"
+TEMPLATES_PACKAGE_PATH = "templates"
+
+# PDF themes and the stylesheet each one renders with
+DEFAULT_THEME = "classroom"
+THEME_STYLESHEETS = {
+    "classroom": "styles.css",
+    # Same look without flexbox, rounded corners or positioned badges
+    "fast": "styles-fast.css",
+}
+
+
+def templates_root() -> "Traversable":
+    """Return the packaged templates directory as a Traversable."""
+    return resources.files(RESOURCE_PACKAGE).joinpath(TEMPLATES_PACKAGE_PATH)
+
+
+def get_resource(name: str) -> "Traversable":
+    """Return a Traversable for a resource relative to the templates root."""
+    resource = templates_root()
+    for part in name.split("/"):
+        resource = resource.joinpath(part)
+    return resource
+
+
+@lru_cache(maxsize=None)
+def read_text(name: str) -> str:
+    """Read a packaged resource, caching its contents for the process.
+
+    Args:
+        name: Resource path relative to the templates root, e.g. ``styles.css``
+
+    Raises:
+        FileNotFoundError: If the resource does not exist
+    """
+    return get_resource(name).read_text(encoding="utf-8")
+
+
+def list_resources(subdir: str, suffix: str) -> List[str]:
+    """List resource file names in a templates subdirectory by suffix."""
+    directory = get_resource(subdir)
+    if not directory.is_dir():
+        return []
+    return sorted(
+        entry.name
+        for entry in directory.iterdir()
+        if entry.is_file() and entry.name.endswith(suffix)
+    )
+
+
+def theme_stylesheet(theme: str) -> str:
+    """Return the stylesheet file name for a PDF theme.
+
+    Raises:
+        ValueError: If the theme is unknown
+    """
+    try:
+        return THEME_STYLESHEETS[theme]
+    except KeyError:
+        raise ValueError(
+            f"Unknown theme '{theme}'. Available: {', '.join(THEME_STYLESHEETS)}"
+        ) from None
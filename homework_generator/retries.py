@@ -0,0 +1,110 @@
+"""Retry policy for LLM requests.
+
+Errors are classified by type. Rate limits, timeouts, connection problems
+and server (5xx) errors are transient and worth retrying after a
+full-jitter exponential backoff; authentication and other client (4xx)
+errors are not, so a misconfigured job fails on its first attempt.
+
+A :func:`deadline` bounds every request made inside it, retries included:
+each request's timeout is cut to the time left and no retry is scheduled
+past it.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+# Error categories worth retrying
+RETRYABLE_CATEGORIES = frozenset({"rate_limit", "timeout", "connection", "server"})
+
+_deadline: ContextVar[Optional[float]] = ContextVar(
+    "homework_gen_deadline", default=None
+)
+
+
+def classify_error(error: BaseException) -> str:
+    """Return the category of an LLM request error.
+
+    One of ``rate_limit``, ``timeout``, ``connection``, ``server``,
+    ``auth``, ``client`` or ``unknown``. litellm exceptions carry the HTTP
+    status code; transport errors are recognized by type.
+    """
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return "rate_limit"
+        if status == 408:
+            return "timeout"
+        if status in (401, 403):
+            return "auth"
+        if status >= 500:
+            return "server"
+        if status >= 400:
+            return "client"
+
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if isinstance(error, ConnectionError):
+        return "connection"
+    # HTTP client errors (e.g. httpx.ReadTimeout) don't subclass the builtins
+    name = type(error).__name__
+    if "Timeout" in name:
+        return "timeout"
+    if "Connect" in name:
+        return "connection"
+    return "unknown"
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Return the server's Retry-After delay in seconds, if it sent one."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        # Absent, or an HTTP date, which providers don't use for rate limits
+        return None
+    return value if value >= 0 else None
+
+
+def full_jitter(
+    attempt: int,
+    base: float,
+    cap: float,
+    rng: Callable[[], float] = random.random,
+) -> float:
+    """Backoff before retry number ``attempt`` (1-based).
+
+    A uniformly random delay up to the exponential backoff, which spreads
+    out clients that failed together instead of retrying them in lockstep.
+    """
+    return rng() * min(cap, base * 2.0 ** (attempt - 1))
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Require the requests in the block to finish within ``seconds``.
+
+    Nested deadlines can only tighten the enclosing one. ``None`` leaves the
+    current deadline, if any, in place.
+    """
+    if seconds is None:
+        yield
+        return
+
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the active deadline, or None without one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
@@ -0,0 +1,96 @@
+"""De-duplication of identical concurrent work.
+
+:class:`SingleFlight` lets one caller per key do the work while concurrent
+callers with the same key wait for it and share its result. :func:`file_lock`
+extends this across processes with an exclusive lock on a file, so callers
+that share a cache directory can serialize work on the same key.
+"""
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+try:
+    import fcntl
+
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Not available on Windows; cross-process locking is skipped there
+    FCNTL_AVAILABLE = False
+
+T = TypeVar("T")
+
+
+class _Call:
+    """An in-flight call whose outcome is shared with waiting callers."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time within the process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, func: Callable[[], T]) -> Tuple[T, bool]:
+        """Run ``func`` unless a call for ``key`` is already in flight.
+
+        Returns:
+            ``(result, shared)``, where ``shared`` is True when the result
+            came from another caller's call. Errors are shared the same way.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            result = func()
+            call.result = result
+            return result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently being worked on."""
+        with self._lock:
+            return len(self._calls)
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``path`` for the duration of the block.
+
+    The lock file is created if needed and left in place afterwards. The
+    operating system releases the lock if the holder dies, so a crashed
+    process cannot leave a key locked.
+    """
+    if not FCNTL_AVAILABLE:
+        yield
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
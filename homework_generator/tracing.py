@@ -0,0 +1,190 @@
+"""Optional span tracing for the generation pipeline.
+
+Functions decorated with :func:`traced` run inside a span when tracing is
+enabled and are called directly otherwise, so disabled tracing costs a
+single global lookup per call. Spans can be written to a JSON-lines file
+with :class:`FileSpanExporter` or forwarded to OpenTelemetry when it is
+installed.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+try:
+    from opentelemetry import trace as otel_trace  # type: ignore[import-not-found]
+
+    OPENTELEMETRY_AVAILABLE = True
+except ImportError:
+    OPENTELEMETRY_AVAILABLE = False
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_tracer: Optional["Tracer"] = None
+_current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "homework_gen_span", default=None
+)
+
+
+class Span:
+    """A timed operation with attributes, nested under an optional parent."""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None):
+        self.name = name
+        self.trace_id: str = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id: str = os.urandom(8).hex()
+        self.parent_id: Optional[str] = parent.span_id if parent else None
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.status = "OK"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+
+    def end(self) -> None:
+        self.end_time_ns = time.time_ns()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize using OpenTelemetry-style field names."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_time_ns,
+            "end_time_unix_nano": self.end_time_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+            "pid": os.getpid(),
+        }
+
+
+class FileSpanExporter:
+    """Appends finished spans to a file as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class InMemorySpanExporter:
+    """Keeps finished spans in a list (useful for tests)."""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+class Tracer:
+    """Creates spans and hands finished ones to an exporter."""
+
+    def __init__(self, exporter: Any):
+        self.exporter = exporter
+
+    @contextmanager
+    def start_span(self, name: str) -> Iterator[None]:
+        span = Span(name, parent=_current_span.get())
+        token = _current_span.set(span)
+        try:
+            yield
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self.exporter.export(span)
+
+    def run(
+        self, name: str, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        with self.start_span(name):
+            return func(*args, **kwargs)
+
+
+class OpenTelemetryTracer(Tracer):
+    """Forwards spans to the globally configured OpenTelemetry tracer."""
+
+    def __init__(self) -> None:
+        if not OPENTELEMETRY_AVAILABLE:
+            raise RuntimeError("opentelemetry-api is not installed")
+        self._otel = otel_trace.get_tracer("homework_generator")
+
+    @contextmanager
+    def start_span(self, name: str) -> Iterator[None]:
+        with self._otel.start_as_current_span(name):
+            yield
+
+
+def enable(exporter: Any = None) -> Tracer:
+    """Enable tracing with a span exporter, or OpenTelemetry if omitted."""
+    global _tracer
+    _tracer = Tracer(exporter) if exporter is not None else OpenTelemetryTracer()
+    return _tracer
+
+
+def disable() -> None:
+    """Disable tracing; traced functions are called directly again."""
+    global _tracer
+    _tracer = None
+
+
+def is_enabled() -> bool:
+    return _tracer is not None
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Set an attribute on the current span, if tracing is enabled."""
+    if _tracer is None:
+        return
+    if isinstance(_tracer, OpenTelemetryTracer):
+        otel_trace.get_current_span().set_attribute(key, value)
+        return
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Run a block inside a span named ``name`` when tracing is enabled."""
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    with tracer.start_span(name):
+        yield
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorate a function to run inside a span named ``name``."""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            return tracer.run(name, func, *args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
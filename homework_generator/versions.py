@@ -0,0 +1,108 @@
+"""Shuffled versions of a packet, to discourage copying.
+
+Versions are derived locally from one generated packet: version A keeps the
+original order and each later version reorders the assignments and the
+questions within them (answers move with their questions) from a seed, so
+a version set costs no LLM calls and the same seed always gives the same
+versions.
+"""
+
+import random
+import string
+from typing import List, Sequence
+
+from pydantic import BaseModel, Field
+
+from .models import Assignment
+
+# Reshuffles tried before accepting a version identical to version A
+_MAX_RESHUFFLES = 10
+
+
+class PacketVersion(BaseModel):
+    """The ordering of one version of a packet."""
+
+    label: str = Field(..., description="Version label: A, B, C, ...")
+    assignment_order: List[int] = Field(
+        ..., description="Indices of the original assignments, in version order"
+    )
+    question_orders: List[List[int]] = Field(
+        ..., description="Question order for each original assignment"
+    )
+
+
+def version_label(index: int) -> str:
+    """Return the label of version ``index`` (0-based): A ... Z, AA, AB, ..."""
+    letters = string.ascii_uppercase
+    label = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, len(letters))
+        label = letters[remainder] + label
+    return label
+
+
+def plan_versions(
+    assignments: Sequence[Assignment],
+    count: int,
+    seed: int = 0,
+    shuffle_assignments: bool = True,
+) -> List[PacketVersion]:
+    """Plan ``count`` versions of a packet.
+
+    Version A is the packet as generated. Later versions are reshuffled
+    until they differ from it, when the packet has anything to reorder.
+    """
+    original = PacketVersion(
+        label=version_label(0),
+        assignment_order=list(range(len(assignments))),
+        question_orders=[list(range(len(a.questions))) for a in assignments],
+    )
+    versions = [original]
+    for index in range(1, count):
+        label = version_label(index)
+        rng = random.Random(f"{seed}:{label}")
+        for _ in range(_MAX_RESHUFFLES):
+            version = PacketVersion(
+                label=label,
+                assignment_order=_permutation(
+                    len(assignments), rng, shuffle_assignments
+                ),
+                question_orders=[
+                    _permutation(len(a.questions), rng) for a in assignments
+                ],
+            )
+            if (
+                version.assignment_order != original.assignment_order
+                or version.question_orders != original.question_orders
+            ):
+                break
+        versions.append(version)
+    return versions
+
+
+def _permutation(size: int, rng: random.Random, shuffle: bool = True) -> List[int]:
+    order = list(range(size))
+    if shuffle:
+        rng.shuffle(order)
+    return order
+
+
+def apply_version(
+    assignments: Sequence[Assignment], version: PacketVersion
+) -> List[Assignment]:
+    """Return the assignments reordered as in ``version``."""
+    return [
+        reorder_questions(assignments[index], version.question_orders[index])
+        for index in version.assignment_order
+    ]
+
+
+def reorder_questions(assignment: Assignment, order: Sequence[int]) -> Assignment:
+    """Return a copy of ``assignment`` with its questions in ``order``."""
+    update = {"questions": [assignment.questions[i] for i in order]}
+    if assignment.answers:
+        # Pad so a short answer list stays aligned with its questions
+        answers = [answer for _, answer in assignment.question_answers()]
+        update["answers"] = [answers[i] for i in order]
+    return assignment.model_copy(update=update)
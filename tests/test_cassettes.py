@@ -0,0 +1,93 @@
+"""Tests for LLM traffic record and replay."""
+
+from unittest.mock import patch
+
+import pytest
+
+from homework_generator.cassettes import Cassette, CassetteMiss, request_key
+
+MESSAGES = [{"role": "user", "content": "Make homework"}]
+PARAMS = {"temperature": 0.1, "max_tokens": 1000}
+
+
+def record(cassette, content, **kwargs):
+    info = {"tokens_in": 10, "tokens_out": 20, "ttft": 0.5}
+    cassette.record("gpt-4", MESSAGES, PARAMS, content, "stop", info, 2.0, **kwargs)
+
+
+class TestRequestKey:
+    """Tests for request identification."""
+
+    def test_ignores_connection_params(self):
+        """Test the endpoint, key and timeout don't change the key."""
+        connection = {"api_base": "http://x", "api_key": "k", "timeout": 5}
+        assert request_key("m", MESSAGES, PARAMS) == request_key(
+            "m", MESSAGES, {**PARAMS, **connection}
+        )
+
+    def test_depends_on_request(self):
+        """Test model, messages and generation params change the key."""
+        key = request_key("m", MESSAGES, PARAMS)
+        assert request_key("other", MESSAGES, PARAMS) != key
+        assert request_key("m", MESSAGES, {**PARAMS, "temperature": 1}) != key
+        assert request_key("m", [{"role": "user", "content": "x"}], PARAMS) != key
+
+
+class TestCassette:
+    """Tests for recording and replaying cassettes."""
+
+    def test_unknown_mode(self, tmp_path):
+        """Test only record and replay modes are accepted."""
+        with pytest.raises(ValueError, match="Unknown cassette mode"):
+            Cassette(tmp_path / "c.jsonl", mode="rewind")
+
+    def test_replay_requires_file(self, tmp_path):
+        """Test replaying a missing cassette fails up front."""
+        with pytest.raises(FileNotFoundError):
+            Cassette(tmp_path / "missing.jsonl")
+
+    def test_record_then_replay(self, tmp_path):
+        """Test a recorded response and its usage are replayed."""
+        path = tmp_path / "cassettes" / "run.jsonl"
+        record(Cassette(path, mode="record"), '{"assignments": []}')
+
+        replay = Cassette(path)
+        info = {}
+        content, finish_reason = replay.replay("gpt-4", MESSAGES, PARAMS, info)
+
+        assert content == '{"assignments": []}'
+        assert finish_reason == "stop"
+        assert info == {"tokens_in": 10, "tokens_out": 20, "ttft": 0.0}
+
+    def test_repeated_requests_cycle(self, tmp_path):
+        """Test responses recorded for the same request are served in order."""
+        path = tmp_path / "run.jsonl"
+        recorder = Cassette(path, mode="record")
+        record(recorder, "first")
+        record(recorder, "second")
+
+        replay = Cassette(path)
+        served = [replay.replay("gpt-4", MESSAGES, PARAMS, {})[0] for _ in range(3)]
+        assert served == ["first", "second", "first"]
+        assert len(replay) == 2
+
+    def test_miss(self, tmp_path):
+        """Test an unrecorded request raises CassetteMiss."""
+        path = tmp_path / "run.jsonl"
+        record(Cassette(path, mode="record"), "recorded")
+
+        with pytest.raises(CassetteMiss):
+            Cassette(path).replay("gpt-4", [{"role": "user", "content": "?"}], {}, {})
+
+    def test_simulated_latency(self, tmp_path):
+        """Test replay waits the scaled recorded latency."""
+        path = tmp_path / "run.jsonl"
+        record(Cassette(path, mode="record"), "recorded")
+
+        replay = Cassette(path, latency_scale=0.5)
+        info = {}
+        with patch("homework_generator.cassettes.time.sleep") as sleep:
+            replay.replay("gpt-4", MESSAGES, PARAMS, info)
+
+        sleep.assert_called_once_with(1.0)
+        assert info["ttft"] == 0.25
@@ -26,6 +26,18 @@ class TestLLMConfig:
         assert config.api_key == "test-key"
         assert len(config.local_models) == 1
 
+    def test_llm_config_endpoints(self):
+        """Test extra endpoints and hedging settings are validated."""
+        config = LLMConfig(
+            endpoints=[{"base_url": "http://x/v1"}], hedge_percentile=95
+        )
+        assert config.endpoints[0].base_url == "http://x/v1"
+        assert config.endpoints[0].model is None
+        assert config.breaker_failures == 3
+
+        with pytest.raises(ValueError):
+            LLMConfig(hedge_percentile=100)
+
 
 class TestPDFConfig:
     """Tests for PDF configuration."""
@@ -46,6 +58,7 @@ class TestGenerationConfig:
         config = GenerationConfig()
         assert config.default_count == 5
         assert config.default_difficulty == "medium"
+        assert config.question_bank is None
 
 
 class TestAppConfig:
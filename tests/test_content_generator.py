@@ -3,9 +3,16 @@
 import pytest
 import json
 from unittest.mock import Mock, patch
-from homework_generator.content_generator import ContentGenerator, ASSIGNMENT_SCHEMA
-from homework_generator.llm_client import LLMClient
+from homework_generator.content_generator import (
+    ANSWERS_INSTRUCTION,
+    ASSIGNMENT_SCHEMA,
+    ContentGenerator,
+    MIN_MAX_TOKENS,
+    estimate_max_tokens,
+)
+from homework_generator.llm_client import LLMClient, TruncatedResponse
 from homework_generator.models import Assignment, HomeworkPacket
+from homework_generator.question_templates import AssignmentTemplate
 
 
 class TestContentGenerator:
@@ -88,7 +95,115 @@ class TestContentGenerator:
         assert "Easy" in prompt
         assert "OUTPUT FORMAT:" in prompt
         assert "JSON" in prompt
+        assert ANSWERS_INSTRUCTION not in prompt
+
+    def test_build_prompt_with_answers(self):
+        """Test answer keys are requested in the same prompt."""
+        prompt = self.generator._build_prompt(
+            template="generic",
+            topic="Test Topic",
+            count=2,
+            difficulty="Easy",
+            grade_level="3rd Grade",
+            include_answers=True,
+        )
+
+        assert ANSWERS_INSTRUCTION in prompt
+        assert prompt.index(ANSWERS_INSTRUCTION) < prompt.index("OUTPUT FORMAT:")
+
+    def test_generate_assignments_with_answers(self):
+        """Test answers from the response are kept on the assignments."""
+        data = json.loads(self.mock_llm_response)
+        data["assignments"][0]["answers"] = ["8", "6"]
+        self.llm_client.generate_response.return_value = json.dumps(data)
+
+        (assignment,) = self.generator.generate_assignments(
+            topic="Basic Addition",
+            count=1,
+            difficulty="Easy",
+            grade_level="2nd Grade",
+            include_answers=True,
+        )
+
+        assert assignment.answers == ["8", "6"]
+        self.llm_client.generate_response.assert_called_once()
+        (prompt,), _ = self.llm_client.generate_response.call_args
+        assert ANSWERS_INSTRUCTION in prompt
     
+    def test_generate_assignments_sizes_max_tokens(self):
+        """Test max_tokens grows with the number of assignments."""
+        self.generator.generate_assignments(
+            topic="Fractions", count=20, difficulty="Hard", grade_level="5th Grade"
+        )
+
+        _, kwargs = self.llm_client.generate_response.call_args
+        assert kwargs["max_tokens"] == estimate_max_tokens(20, "Hard")
+
+    def test_estimate_max_tokens(self):
+        """Test the estimate scales with count, difficulty and answers."""
+        assert estimate_max_tokens(1, "easy") == MIN_MAX_TOKENS
+        assert estimate_max_tokens(20, "medium") > estimate_max_tokens(10, "medium")
+        assert estimate_max_tokens(10, "Hard") > estimate_max_tokens(10, "Easy")
+        assert estimate_max_tokens(10, "medium", include_answers=True) > (
+            estimate_max_tokens(10, "medium")
+        )
+        # Unknown difficulties fall back to medium
+        assert estimate_max_tokens(10, "extreme") == estimate_max_tokens(10, "medium")
+
+    def test_truncated_response_is_salvaged_and_topped_up(self):
+        """Test complete assignments are kept and only the rest re-requested."""
+        assignment = json.loads(self.mock_llm_response)["assignments"][0]
+        truncated = json.dumps({"assignments": [assignment, assignment]})
+        # Cut the response off in the middle of a third assignment
+        truncated = truncated[:-2] + ', {"title": "Cut o'
+        self.llm_client.generate_response.side_effect = [
+            TruncatedResponse(truncated),
+            self.mock_llm_response,
+        ]
+
+        assignments = self.generator.generate_assignments(
+            topic="Fractions", count=3, difficulty="Medium", grade_level="5th Grade"
+        )
+
+        assert len(assignments) == 3
+        assert self.llm_client.generate_response.call_count == 2
+        first, second = self.llm_client.generate_response.call_args_list
+        assert first[1]["max_tokens"] == estimate_max_tokens(3, "Medium")
+        assert second[1]["max_tokens"] == estimate_max_tokens(1, "Medium")
+
+    def test_unsalvageable_response_raises(self):
+        """Test a response without any complete assignment still fails."""
+        self.llm_client.generate_response.side_effect = TruncatedResponse(
+            '{"assignments": [{"tit'
+        )
+
+        with pytest.raises(ValueError, match="Invalid JSON response"):
+            self.generator.generate_assignments(
+                topic="Fractions", count=2, difficulty="Easy", grade_level="5th Grade"
+            )
+
+    def test_invalid_complete_response_is_not_salvaged(self):
+        """Test a response that wasn't cut off fails instead of being salvaged."""
+        assignment = json.loads(self.mock_llm_response)["assignments"][0]
+        self.llm_client.generate_response.return_value = json.dumps(
+            {"assignments": [assignment, {"title": "missing fields"}]}
+        )
+
+        with pytest.raises(ValueError):
+            self.generator.generate_assignments(
+                topic="Fractions", count=2, difficulty="Easy", grade_level="5th Grade"
+            )
+        assert self.llm_client.generate_response.call_count == 1
+
+    def test_salvage_assignments_skips_invalid_items(self):
+        """Test salvaged objects must match the assignment schema."""
+        assignment = json.loads(self.mock_llm_response)["assignments"][0]
+        response = json.dumps({"assignments": [{"title": "partial"}, assignment]})
+
+        # Truncated right after the last complete object
+        assert self.generator._salvage_assignments(response[:-2]) == [assignment]
+        assert self.generator._salvage_assignments("no json here") == []
+
     def test_validate_response_valid(self):
         """Test validation of valid response."""
         valid_response = json.dumps({
@@ -178,3 +293,229 @@ class TestContentGenerator:
         )
         
         assert packet.generated_at == "2024-01-01T12:00:00"
+
+
+class TestDrillTemplate:
+    """Tests for the locally generated math_drills template."""
+
+    def setup_method(self):
+        """Set up a generator whose LLM must not be called for drills."""
+        self.llm_client = Mock(spec=LLMClient)
+        self.llm_client.model = "test-model"
+        self.generator = ContentGenerator(self.llm_client)
+
+    def test_drill_topic_skips_llm(self):
+        """Drill topics are generated without an LLM request."""
+        assignments = self.generator.generate_assignments(
+            topic="multiplication facts",
+            count=3,
+            difficulty="medium",
+            grade_level="4th Grade",
+            template="math_drills",
+        )
+
+        assert len(assignments) == 3
+        assert all(a.title.startswith("Multiplication Drill") for a in assignments)
+        self.llm_client.generate_response.assert_not_called()
+
+    def test_other_topic_uses_llm(self):
+        """Topics that aren't drills fall back to the LLM prompt."""
+        self.llm_client.generate_response.return_value = json.dumps(
+            {
+                "assignments": [
+                    {
+                        "title": "Word Problems",
+                        "grade_level": "4th Grade",
+                        "subject": "Mathematics",
+                        "difficulty": "Medium",
+                        "estimated_time": "20 minutes",
+                        "instructions": "Solve.",
+                        "questions": ["A train leaves at noon..."],
+                    }
+                ]
+            }
+        )
+
+        assignments = self.generator.generate_assignments(
+            topic="word problems",
+            count=1,
+            difficulty="medium",
+            grade_level="4th Grade",
+            template="math_drills",
+        )
+
+        assert assignments[0].title == "Word Problems"
+        self.llm_client.generate_response.assert_called_once()
+
+
+class TestQuestionTemplates:
+    """Tests for variants generated from parameterized question templates."""
+
+    def setup_method(self):
+        """Set up a generator returning one templated assignment."""
+        self.llm_client = Mock(spec=LLMClient)
+        self.llm_client.model = "test-model"
+        self.generator = ContentGenerator(self.llm_client)
+        self.llm_client.generate_response.return_value = json.dumps(
+            {
+                "assignments": [
+                    {
+                        "title": "Multiplication",
+                        "grade_level": "4th Grade",
+                        "subject": "Mathematics",
+                        "difficulty": "Medium",
+                        "instructions": "Solve.",
+                        "questions": [
+                            {
+                                "text": "What is {a} × {b}?",
+                                "answer": "{a * b}",
+                                "variables": [
+                                    {"name": "a", "min": 2, "max": 12},
+                                    {"name": "b", "min": 2, "max": 12},
+                                ],
+                            },
+                            {
+                                "text": "Broken {c}",
+                                "answer": "{c}",
+                                "variables": [],
+                            },
+                        ],
+                    }
+                ]
+            }
+        )
+
+    def _variants(self, **kwargs):
+        params = dict(
+            topic="multiplication",
+            count=1,
+            difficulty="medium",
+            grade_level="4th Grade",
+            variants=5,
+            template="math",
+            include_answers=True,
+        )
+        params.update(kwargs)
+        return self.generator.generate_variants(**params)
+
+    def test_one_llm_call_for_all_variants(self):
+        """Every version comes from a single request, also when repeated."""
+        versions = self._variants()
+        self._variants(variants=10)
+
+        assert len(versions) == 5
+        self.llm_client.generate_response.assert_called_once()
+        prompt = self.llm_client.generate_response.call_args[0][0]
+        assert "QUESTION TEMPLATES" in prompt
+
+    def test_variants_differ_and_answers_match(self):
+        """Versions have different values and correct answers."""
+        versions = self._variants(variants=20)
+
+        questions = [version[0].questions[0] for version in versions]
+        assert len(set(questions)) > 1
+        for version in versions:
+            (assignment,) = version
+            a, b = assignment.questions[0][len("What is ") : -1].split(" × ")
+            assert assignment.answers == [str(int(a) * int(b))]
+
+    def test_broken_templates_dropped(self):
+        """Questions that can't be instantiated are left out."""
+        (assignment,) = self._variants(variants=1)[0]
+        assert len(assignment.questions) == 1
+
+    def test_seed_reproducible(self):
+        """The same seed gives the same versions."""
+        assert self._variants(seed=3) == self._variants(seed=3)
+        assert self._variants(seed=3) != self._variants(seed=4)
+
+    def test_no_usable_templates(self):
+        """A response without usable templates raises ValueError."""
+        self.llm_client.generate_response.return_value = json.dumps(
+            {"assignments": []}
+        )
+        with pytest.raises(ValueError, match="no usable question templates"):
+            self._variants()
+
+    def test_failing_validation_drops_assignment(self):
+        """Errors while checking templates drop the assignment, not the run."""
+        with patch.object(
+            AssignmentTemplate, "valid_questions", side_effect=TypeError("boom")
+        ):
+            with pytest.raises(ValueError, match="no usable question templates"):
+                self._variants()
+
+
+class TestQuestionBankAssembly:
+    """Tests for assembling packets from the question bank."""
+
+    def setup_method(self):
+        """Set up a generator with an in-memory question bank."""
+        from homework_generator.question_bank import QuestionBank
+
+        self.llm_client = Mock(spec=LLMClient)
+        self.llm_client.model = "test-model"
+        self.bank = QuestionBank(":memory:")
+        self.generator = ContentGenerator(self.llm_client, question_bank=self.bank)
+        self.llm_client.generate_response.side_effect = self._respond
+        self.generated = 0
+
+    def teardown_method(self):
+        """Close the bank."""
+        self.bank.close()
+
+    def _respond(self, prompt, **kwargs):
+        self.generated += 1
+        return json.dumps(
+            {
+                "assignments": [
+                    {
+                        "title": f"Fractions {self.generated}",
+                        "grade_level": "5th Grade",
+                        "subject": "Mathematics",
+                        "difficulty": "Medium",
+                        "instructions": "Solve.",
+                        "questions": [f"What is {self.generated}/2 + 1/4?"],
+                    }
+                ]
+            }
+        )
+
+    def _request(self, method, count=1):
+        return method(
+            topic="adding fractions",
+            count=count,
+            difficulty="medium",
+            grade_level="5th Grade",
+            template="math",
+        )
+
+    def test_generated_assignments_are_stored(self):
+        """Every LLM-generated assignment goes into the bank."""
+        self._request(self.generator.generate_assignments)
+        assert len(self.bank) == 1
+
+    def test_bank_hit_skips_llm(self):
+        """Stored assignments are reused without an LLM call."""
+        self._request(self.generator.generate_assignments)
+
+        (assignment,) = self._request(self.generator.assemble_from_bank)
+
+        assert assignment.title == "Fractions 1"
+        assert self.llm_client.generate_response.call_count == 1
+
+    def test_gap_is_generated(self):
+        """Only the assignments the bank lacks are generated."""
+        self._request(self.generator.generate_assignments)
+
+        assignments = self._request(self.generator.assemble_from_bank, count=2)
+
+        assert [a.title for a in assignments] == ["Fractions 1", "Fractions 2"]
+        assert self.llm_client.generate_response.call_count == 2
+        assert len(self.bank) == 2
+
+    def test_requires_bank(self):
+        """Assembling without a bank is an error."""
+        generator = ContentGenerator(self.llm_client)
+        with pytest.raises(ValueError, match="No question bank"):
+            self._request(generator.assemble_from_bank)
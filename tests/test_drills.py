@@ -0,0 +1,122 @@
+"""Tests for procedural math drills."""
+
+from fractions import Fraction
+
+import pytest
+
+from homework_generator import drills
+from homework_generator.drills import (
+    DrillGenerator,
+    drill_kinds,
+    drill_level,
+    parse_grade,
+)
+
+
+def _evaluate(question: str) -> Fraction:
+    """Evaluate a drill question like ``3/4 + 1/2 = ____``."""
+    left, symbol, right = question.replace(" = ____", "").split(" ")
+    a, b = Fraction(left), Fraction(right)
+    return {"+": a + b, "−": a - b, "×": a * b, "÷": a / b}[symbol]
+
+
+def _parse_answer(answer: str) -> Fraction:
+    """Parse an answer, including mixed numbers like ``1 1/2``."""
+    parts = answer.split(" ")
+    return sum((Fraction(part) for part in parts), Fraction(0))
+
+
+class TestDrillKinds:
+    """Tests for choosing drill kinds from the topic and grade."""
+
+    def test_parse_grade(self):
+        """Grade descriptions map to numbers, kindergarten to 0."""
+        assert parse_grade("5th Grade") == 5
+        assert parse_grade("Kindergarten") == 0
+        assert parse_grade("High School") == 9
+        assert parse_grade("Grade 14") == 12
+
+    def test_drill_level_shifts_by_difficulty(self):
+        """Easy and hard move the level one step, within bounds."""
+        assert drill_level("4th Grade", "easy") == 3
+        assert drill_level("4th Grade", "hard") == 5
+        assert drill_level("Kindergarten", "easy") == 0
+
+    def test_topic_keywords_select_kinds(self):
+        """Named operations select their kinds."""
+        assert drill_kinds("adding fractions", "5th Grade") == ["fractions"]
+        assert drill_kinds("multiplication and division", "4th Grade") == [
+            "multiplication",
+            "division",
+        ]
+
+    def test_general_topic_selects_kinds_for_grade(self):
+        """A general arithmetic topic gets every kind suitable for the grade."""
+        assert drill_kinds("arithmetic", "2nd Grade") == ["addition", "subtraction"]
+        assert "fractions" in drill_kinds("arithmetic", "6th Grade")
+
+    def test_non_drill_topic(self):
+        """Topics that aren't drills select nothing."""
+        assert drill_kinds("quadratic equations", "9th Grade") == []
+
+
+class TestDrillGenerator:
+    """Tests for generating drill worksheets."""
+
+    @pytest.mark.parametrize("kind", drills.DRILL_KINDS)
+    @pytest.mark.parametrize("grade", ["3rd Grade", "5th Grade", "8th Grade"])
+    def test_answers_are_correct(self, kind, grade):
+        """Every answer matches its question, in simplest form."""
+        (sheet,) = DrillGenerator(seed=1, questions_per_assignment=50).generate(
+            "drills", 1, "hard", grade, kinds=[kind]
+        )
+        assert len(sheet.questions) == len(sheet.answers) == 50
+        for question, answer in zip(sheet.questions, sheet.answers):
+            assert _parse_answer(answer) == _evaluate(question), question
+            assert not answer.startswith("-")
+
+    def test_cycles_through_kinds(self):
+        """Worksheets alternate kinds and are numbered per kind."""
+        sheets = DrillGenerator(seed=0).generate(
+            "addition and subtraction", 3, "medium", "2nd Grade"
+        )
+        assert [s.title for s in sheets] == [
+            "Addition Drill 1",
+            "Subtraction Drill 1",
+            "Addition Drill 2",
+        ]
+        assert all(s.subject == "Mathematics" for s in sheets)
+
+    def test_seed_is_reproducible(self):
+        """The same seed generates the same worksheets."""
+        first = DrillGenerator(seed=7).generate("arithmetic", 4, "medium", "6th Grade")
+        second = DrillGenerator(seed=7).generate("arithmetic", 4, "medium", "6th Grade")
+        assert [s.questions for s in first] == [s.questions for s in second]
+
+    def test_without_answers(self):
+        """Answers are left out when not requested."""
+        (sheet,) = DrillGenerator().generate(
+            "addition", 1, "easy", "1st Grade", include_answers=False
+        )
+        assert sheet.answers is None
+
+    def test_unknown_kind(self):
+        """Unknown kinds are rejected."""
+        with pytest.raises(ValueError, match="Unknown drill kind"):
+            DrillGenerator().generate("x", 1, "easy", "1st Grade", kinds=["calculus"])
+
+    def test_without_numpy(self, monkeypatch):
+        """The standard-library backend generates correct problems too."""
+        monkeypatch.setattr(drills, "NUMPY_AVAILABLE", False)
+        monkeypatch.setattr(drills, "_maximum", max)
+        monkeypatch.setattr(drills, "_minimum", min)
+        monkeypatch.setattr(drills, "_gcd", __import__("math").gcd)
+        monkeypatch.setattr(drills, "_where", lambda c, x, y: x if c else y)
+
+        sheets = DrillGenerator(seed=3, questions_per_assignment=30).generate(
+            "arithmetic", 6, "hard", "7th Grade"
+        )
+        assert len(sheets) == 6
+        for sheet in sheets:
+            for question, answer in zip(sheet.questions, sheet.answers):
+                assert _parse_answer(answer) == _evaluate(question), question
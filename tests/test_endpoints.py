@@ -0,0 +1,125 @@
+"""Tests for endpoint load balancing and health tracking."""
+
+import pytest
+
+from homework_generator.endpoints import Endpoint, EndpointPool
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_pool(count=3, **kwargs):
+    endpoints = [Endpoint(f"model-{i}") for i in range(count)]
+    return endpoints, EndpointPool(endpoints, **kwargs)
+
+
+class TestEndpoint:
+    """Tests for endpoint connection details."""
+
+    def test_params_only_include_set_values(self):
+        """Test unset base URL and key are not passed to litellm."""
+        assert Endpoint("gpt-4").params() == {}
+        assert Endpoint("m", api_key="k", base_url="http://x").params() == {
+            "api_key": "k",
+            "api_base": "http://x",
+        }
+
+    def test_name_includes_base_url(self):
+        """Test endpoints serving the same model are distinguishable."""
+        assert Endpoint("m").name == "m"
+        assert Endpoint("m", base_url="http://x").name == "m@http://x"
+
+
+class TestEndpointPool:
+    """Tests for round-robin selection and circuit breaking."""
+
+    def test_requires_an_endpoint(self):
+        """Test an empty pool is rejected."""
+        with pytest.raises(ValueError):
+            EndpointPool([])
+
+    def test_round_robin(self):
+        """Test endpoints are handed out in rotation."""
+        endpoints, pool = make_pool()
+        picked = [pool.acquire() for _ in range(4)]
+        assert picked == [*endpoints, endpoints[0]]
+
+    def test_exclude(self):
+        """Test excluded endpoints are skipped."""
+        endpoints, pool = make_pool(2)
+        assert pool.acquire(exclude=(endpoints[0],)) is endpoints[1]
+        assert pool.acquire(exclude=endpoints) is None
+
+    def test_breaker_opens_after_threshold(self):
+        """Test consecutive failures take an endpoint out of rotation."""
+        endpoints, pool = make_pool(2, failure_threshold=2)
+        pool.record_failure(endpoints[0])
+        assert not endpoints[0].is_open
+        pool.record_failure(endpoints[0])
+        assert endpoints[0].is_open
+        assert [pool.acquire() for _ in range(3)] == [endpoints[1]] * 3
+
+    def test_success_resets_failures(self):
+        """Test only consecutive failures count toward the threshold."""
+        endpoints, pool = make_pool(1, failure_threshold=2)
+        pool.record_failure(endpoints[0])
+        pool.record_success(endpoints[0], 1.0)
+        pool.record_failure(endpoints[0])
+        assert not endpoints[0].is_open
+
+    def test_half_open_probe(self):
+        """Test one probe is allowed after the cooldown."""
+        clock = FakeClock()
+        (endpoint,), pool = make_pool(1, failure_threshold=1, cooldown=10, clock=clock)
+        pool.record_failure(endpoint)
+        assert pool.acquire() is None
+
+        clock.now = 10
+        assert pool.acquire() is endpoint
+        # Only one probe at a time
+        assert pool.acquire() is None
+
+        pool.record_failure(endpoint)
+        assert pool.acquire() is None
+        clock.now = 20
+        assert pool.acquire() is endpoint
+        pool.record_success(endpoint, 1.0)
+        assert not endpoint.is_open
+        assert pool.acquire() is endpoint
+
+    def test_release_ends_probe(self):
+        """Test a released probe lets the next one through."""
+        clock = FakeClock()
+        (endpoint,), pool = make_pool(1, failure_threshold=1, cooldown=10, clock=clock)
+        pool.record_failure(endpoint)
+        clock.now = 10
+        assert pool.acquire() is endpoint
+
+        pool.release(endpoint)
+        assert endpoint.is_open
+        assert pool.acquire() is endpoint
+
+    def test_hedge_delay(self):
+        """Test the hedge delay is the configured latency percentile."""
+        _, pool = make_pool(1, hedge_percentile=90)
+        for seconds in range(1, EndpointPool.MIN_HEDGE_SAMPLES):
+            pool.record_success(pool.endpoints[0], float(seconds))
+        # Too few samples to trust yet
+        assert pool.hedge_delay() is None
+
+        pool.record_success(pool.endpoints[0], 10.0)
+        assert pool.hedge_delay() == 9.0
+
+    def test_hedging_disabled_by_default(self):
+        """Test no hedge delay is given without a percentile."""
+        _, pool = make_pool(1)
+        for _ in range(20):
+            pool.record_success(pool.endpoints[0], 1.0)
+        assert pool.hedge_delay() is None
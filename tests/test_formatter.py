@@ -1,9 +1,12 @@
 """Tests for assignment formatter."""
 
+import gc
+
 import pytest
 from pathlib import Path
-from homework_generator.formatter import AssignmentFormatter
+from homework_generator.formatter import VERSION_BANNER, AssignmentFormatter
 from homework_generator.models import Assignment
+from homework_generator.versions import PacketVersion, apply_version
 
 
 class TestAssignmentFormatter:
@@ -11,7 +14,7 @@ class TestAssignmentFormatter:
     
     def setup_method(self):
         """Set up test fixtures."""
-        self.formatter = AssignmentFormatter("templates")
+        self.formatter = AssignmentFormatter()
         
         # Create a sample assignment
         self.sample_assignment = Assignment(
@@ -35,7 +38,63 @@ class TestAssignmentFormatter:
     
     def test_formatter_initialization(self):
         """Test formatter initialization."""
-        assert self.formatter.template_dir == Path("templates")
+        assert self.formatter.template_dir is None
+        assert AssignmentFormatter("custom").template_dir == Path("custom")
+
+    def test_packaged_template_used_from_any_directory(self, tmp_path, monkeypatch):
+        """Test the packaged template and styles load regardless of CWD."""
+        monkeypatch.chdir(tmp_path)
+        formatter = AssignmentFormatter()
+
+        assert formatter.html_template is not None
+        html = formatter.format_assignment(self.sample_assignment)
+        assert '<li class="problem">What is 5 + 3?</li>' in html
+        assert "border-radius" in formatter._load_styles()
+
+    def test_fast_theme_styles(self):
+        """Test the fast theme avoids layout-expensive CSS."""
+        formatter = AssignmentFormatter(theme="fast")
+        html = formatter.format_packet([self.sample_assignment])
+
+        styles = formatter._load_styles()
+        for expensive in ("display: flex", "border-radius", "position: absolute"):
+            assert expensive not in styles
+        assert styles in html
+
+    def test_answer_key_html(self):
+        """Test answer keys list each question with its escaped answer."""
+        assignment = self.sample_assignment.model_copy(
+            update={"answers": ["8", "x < 3"]}
+        )
+        html = self.formatter.format_packet([assignment])
+        key = "".join(self.formatter.iter_answer_key_html([assignment]))
+
+        assert "Answer Key: " + assignment.title in key
+        assert "<strong>Answer:</strong> x &lt; 3" in key
+        assert key.count('<li class="answer">') == len(assignment.questions)
+        # Worksheets never show the answers
+        assert "x &lt; 3" not in html
+
+    def test_answer_key_basic_fallback(self, tmp_path):
+        """Test answer keys render without the packaged template."""
+        formatter = AssignmentFormatter(template_dir=str(tmp_path))
+        key = "".join(formatter.iter_answer_key_html([self.sample_assignment]))
+
+        assert '<p class="question">' in key
+        assert "(no answer provided)" in key
+
+    def test_answer_key_markdown(self):
+        """Test Markdown answer keys."""
+        assignment = self.sample_assignment.model_copy(update={"answers": ["8"]})
+        text = self.formatter.format_answer_key_markdown([assignment, assignment])
+
+        assert text.count("# Answer Key: ") == 2
+        assert "**Answer:** 8" in text
+
+    def test_unknown_theme(self):
+        """Test an unknown theme is rejected."""
+        with pytest.raises(ValueError):
+            AssignmentFormatter(theme="missing")
     
     def test_format_assignment_basic(self):
         """Test basic assignment formatting."""
@@ -177,3 +236,132 @@ class TestAssignmentFormatter:
         assert "Test 1" in html
         assert "Test 2" in html
         assert "<style>" in html
+
+    def test_format_assignment_basic_escapes_content(self):
+        """Test basic formatting escapes user content."""
+        assignment = self.sample_assignment.model_copy(
+            update={"title": "A <b>bold</b> title", "questions": ["Is 3 < 5?"]}
+        )
+
+        html = self.formatter._format_assignment_basic(assignment)
+
+        assert "<h1>A &lt;b&gt;bold&lt;/b&gt; title</h1>" in html
+        assert "<li>Is 3 &lt; 5?</li>" in html
+
+    def test_iter_packet_html_streams_fragments(self):
+        """Test packet HTML is produced as multiple fragments."""
+        fragments = list(self.formatter.iter_packet_html([self.sample_assignment] * 3))
+
+        assert len(fragments) > 3
+        assert fragments[0].startswith("<!DOCTYPE html>")
+        assert fragments[-1].rstrip().endswith("</html>")
+        assert "".join(fragments) == self.formatter.format_packet(
+            [self.sample_assignment] * 3
+        )
+
+    def test_iter_packet_html_styles_emitted_once(self):
+        """Test the stylesheet is included once regardless of packet size."""
+        html = self.formatter.format_packet([self.sample_assignment] * 5)
+
+        assert html.count("<style>") == 1
+        assert html.count("<!DOCTYPE html>") == 1
+        assert html.count('<div class="assignment">') == 5
+
+    def test_iter_packet_html_accepts_generator(self):
+        """Test assignments may be supplied lazily."""
+        assignments = (self.sample_assignment for _ in range(2))
+
+        html = "".join(self.formatter.iter_packet_html(assignments))
+
+        assert html.count("Basic Math Problems") == 2
+
+    def test_iter_packet_html_empty(self):
+        """Test an empty stream yields the empty-packet document."""
+        assert "No assignments to display" in "".join(
+            self.formatter.iter_packet_html(iter([]))
+        )
+
+    def test_write_packet_html(self):
+        """Test streaming a packet into a text file object."""
+        import io
+
+        stream = io.StringIO()
+        self.formatter.write_packet_html([self.sample_assignment], stream)
+
+        assert stream.getvalue() == self.formatter.format_packet(
+            [self.sample_assignment]
+        )
+
+    def test_iter_packet_html_without_body_template(self, tmp_path):
+        """Test custom template directories without a body template still work."""
+        formatter = AssignmentFormatter(str(tmp_path))
+
+        html = formatter.format_packet([self.sample_assignment])
+
+        assert "<h1>Basic Math Problems</h1>" in html
+
+    @pytest.mark.parametrize("answer_key", [False, True])
+    def test_iter_version_html(self, answer_key):
+        """Test versions render like the reordered packet, from cached pieces."""
+        other = self.sample_assignment.model_copy(
+            update={
+                "title": "More <Math> & Co",
+                "questions": ["Is 3 < 4?", "What is 7 & 8?"],
+                "answers": ["Yes", "No answer"],
+            }
+        )
+        assignments = [self.sample_assignment, other]
+        version = PacketVersion(
+            label="B", assignment_order=[1, 0], question_orders=[[2, 0, 1], [1, 0]]
+        )
+        iter_direct = (
+            self.formatter.iter_answer_key_html
+            if answer_key
+            else self.formatter.iter_packet_html
+        )
+
+        html = "".join(
+            self.formatter.iter_version_html(assignments, version, answer_key)
+        )
+
+        assert "Version B" in html
+        direct = "".join(iter_direct(apply_version(assignments, version)))
+        assert html.replace(VERSION_BANNER.format(label="B"), "") == direct
+        # Later versions join the cached pieces instead of rendering
+        layouts = {key: dict(value) for key, value in self.formatter._layouts.items()}
+        "".join(self.formatter.iter_version_html(assignments, version, answer_key))
+        assert self.formatter._layouts == layouts
+        assert all(layouts[id(assignment)][answer_key] for assignment in assignments)
+
+    def test_version_layouts_are_freed_with_assignments(self):
+        """Test cached layouts don't outlive their assignments."""
+        assignment = self.sample_assignment.model_copy()
+        version = PacketVersion(
+            label="B", assignment_order=[0], question_orders=[[2, 1, 0]]
+        )
+        "".join(self.formatter.iter_version_html([assignment], version))
+        assert id(assignment) in self.formatter._layouts
+
+        del assignment
+        gc.collect()
+        assert self.formatter._layouts == {}
+
+    def test_iter_version_html_custom_template(self, tmp_path):
+        """Test templates that reorder questions are rendered per version instead."""
+        (tmp_path / "assignment_body.html").write_text(
+            "<h1>{{ title }}</h1><p>{{ problems | length }} questions: "
+            "{{ problems | sort(reverse=true) | join(', ') }}</p>",
+            encoding="utf-8",
+        )
+        formatter = AssignmentFormatter(str(tmp_path))
+        version = PacketVersion(
+            label="B", assignment_order=[0], question_orders=[[2, 1, 0]]
+        )
+
+        html = "".join(formatter.iter_version_html([self.sample_assignment], version))
+
+        assert (
+            "3 questions: What is 5 + 3?, Find the result of 2 × 6, Calculate 10 - 4"
+            in html
+        )
+        assert formatter._layouts[id(self.sample_assignment)][False] is None
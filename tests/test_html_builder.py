@@ -0,0 +1,39 @@
+"""Tests for the HTML builder."""
+
+from homework_generator.html_builder import HTMLBuilder
+
+
+class TestHTMLBuilder:
+    """Tests for HTMLBuilder."""
+
+    def test_raw_is_not_escaped(self):
+        """Test raw markup is appended unchanged."""
+        assert HTMLBuilder().raw("<p>").raw("</p>").build() == "<p></p>"
+
+    def test_text_is_escaped(self):
+        """Test text content is escaped."""
+        assert HTMLBuilder().text("a < b & c").build() == "a &lt; b &amp; c"
+
+    def test_element(self):
+        """Test element wraps escaped content."""
+        html = HTMLBuilder().element("h1", "<Title>").build()
+        assert html == "<h1>&lt;Title&gt;</h1>"
+
+    def test_element_with_attributes(self):
+        """Test element attributes are emitted verbatim."""
+        html = HTMLBuilder().element("p", "x", 'class="note"').build()
+        assert html == '<p class="note">x</p>'
+
+    def test_list(self):
+        """Test list renders one escaped item per entry."""
+        html = HTMLBuilder().list("ol", ["1 < 2", "b"]).build()
+        assert html == "<ol><li>1 &lt; 2</li><li>b</li></ol>"
+
+    def test_list_item_attributes(self):
+        """Test list item attributes."""
+        html = HTMLBuilder().list("ul", ["a"], 'class="problem"').build()
+        assert html == '<ul><li class="problem">a</li></ul>'
+
+    def test_text_escapes_once(self):
+        """Test already-escaped entities are escaped exactly once."""
+        assert HTMLBuilder().text("&amp;").build() == "&amp;amp;"
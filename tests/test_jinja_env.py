@@ -0,0 +1,76 @@
+"""Tests for shared Jinja2 environments."""
+
+import pytest
+from pathlib import Path
+from homework_generator import jinja_env
+from homework_generator.jinja_env import (
+    clear_environments,
+    get_bytecode_cache_dir,
+    get_environment,
+)
+
+
+class TestJinjaEnvironment:
+    """Tests for environment sharing and bytecode caching."""
+
+    @pytest.fixture(autouse=True)
+    def isolated_cache(self, tmp_path, monkeypatch):
+        """Point the bytecode cache at a temporary directory."""
+        monkeypatch.setenv(jinja_env.CACHE_DIR_ENV_VAR, str(tmp_path / "cache"))
+        clear_environments()
+        yield
+        clear_environments()
+
+    def test_cache_dir_from_environment(self, tmp_path):
+        """Test the cache directory honours the environment override."""
+        assert get_bytecode_cache_dir() == tmp_path / "cache" / "jinja"
+
+    def test_environment_shared_per_directory(self):
+        """Test the same directory yields the same environment."""
+        env1 = get_environment(Path("templates"))
+        env2 = get_environment(Path("templates").absolute())
+
+        assert env1 is env2
+
+    def test_environment_differs_between_directories(self):
+        """Test distinct directories get distinct environments."""
+        assert get_environment(Path("templates")) is not get_environment(
+            Path("templates/prompts")
+        )
+
+    def test_bytecode_written_to_cache(self, tmp_path):
+        """Test compiled templates are persisted to the bytecode cache."""
+        template_dir = tmp_path / "tpl"
+        template_dir.mkdir()
+        (template_dir / "hello.html").write_text("Hello {{ name }}")
+
+        env = get_environment(template_dir)
+        assert env.get_template("hello.html").render(name="<b>") == "Hello &lt;b&gt;"
+
+        cache_files = list((tmp_path / "cache" / "jinja").iterdir())
+        assert len(cache_files) == 1
+
+    def test_bytecode_reused_by_fresh_environment(self, tmp_path):
+        """Test a new process-level environment loads cached bytecode."""
+        template_dir = tmp_path / "tpl"
+        template_dir.mkdir()
+        (template_dir / "hello.md").write_text("Hi {{ name }}")
+
+        get_environment(template_dir).get_template("hello.md")
+        clear_environments()
+
+        env = get_environment(template_dir)
+        calls = []
+        original = env._parse
+        env._parse = lambda *args: calls.append(args) or original(*args)
+
+        assert env.get_template("hello.md").render(name="x") == "Hi x"
+        assert calls == []
+
+    def test_package_environment(self):
+        """Test the packaged environment loads templates from the package."""
+        env = get_environment()
+
+        assert env is get_environment()
+        assert env.get_template("assignment.html") is not None
+        assert get_environment(package_path="templates/prompts") is not env
@@ -1,9 +1,23 @@
 """Tests for LLM client."""
 
 import pytest
+import contextvars
 import json
+import os
+import threading
+import time
 from unittest.mock import Mock, patch, MagicMock
-from homework_generator.llm_client import LLMClient
+from homework_generator import metrics, retries
+from homework_generator.cassettes import Cassette
+from homework_generator.config import LLMConfig
+from homework_generator.endpoints import Endpoint, EndpointPool
+from homework_generator.llm_client import (
+    CONTINUE_PROMPT,
+    LLMClient,
+    LLMError,
+    TruncatedResponse,
+    _Cancelled,
+)
 
 
 class TestLLMClient:
@@ -121,3 +135,512 @@ class TestLLMClient:
         """Test API key is properly stored."""
         client = LLMClient("gpt-3.5-turbo", api_key="test-key-123")
         assert client.api_key == "test-key-123"
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_generate_response_uses_base_url(self, mock_completion):
+        """Test the custom endpoint and key are passed to litellm."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = '{"assignments": []}'
+        mock_completion.return_value = mock_response
+
+        client = LLMClient(
+            "openai/local", cache_enabled=False, api_key="k", base_url="http://x/v1"
+        )
+        client.generate_response("prompt", temperature=0.7)
+
+        kwargs = mock_completion.call_args[1]
+        assert kwargs["api_base"] == "http://x/v1"
+        assert kwargs["api_key"] == "k"
+        assert kwargs["temperature"] == 0.7
+        assert kwargs["max_tokens"] == 4000
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_generate_response_streaming_records_metrics(self, mock_completion):
+        """Test streamed responses are joined and timed."""
+        def chunk(content, usage=None):
+            c = Mock()
+            c.choices = [Mock()]
+            c.choices[0].delta.content = content
+            c.usage = usage
+            return c
+
+        usage = Mock(prompt_tokens=12, completion_tokens=3)
+        mock_completion.return_value = iter(
+            [chunk('{"a"'), chunk(': 1}'), chunk(None, usage)]
+        )
+
+        client = LLMClient("gpt-4", cache_enabled=False, stream=True)
+        with metrics.collect() as run:
+            response = client.generate_response("prompt")
+
+        assert response == '{"a": 1}'
+        assert mock_completion.call_args[1]["stream"] is True
+        (record,) = run.records
+        assert record["stage"] == "llm_request"
+        assert record["tokens_in"] == 12
+        assert record["tokens_out"] == 3
+        assert "ttft" in record
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_concurrent_identical_requests_are_coalesced(self, mock_completion):
+        """Test identical in-flight requests share one provider call."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def complete(**kwargs):
+            started.set()
+            release.wait(5)
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = "shared"
+            return response
+
+        mock_completion.side_effect = complete
+        client = LLMClient("gpt-4", cache_enabled=False)
+
+        results = []
+
+        def request():
+            results.append(client.generate_response("same"))
+
+        with metrics.collect() as run:
+            # Threads start with an empty context; carry the collector over
+            leader = threading.Thread(
+                target=contextvars.copy_context().run, args=(request,)
+            )
+            leader.start()
+            started.wait(5)
+            follower = threading.Thread(
+                target=contextvars.copy_context().run, args=(request,)
+            )
+            follower.start()
+            # Let the follower reach the wait before the call completes
+            follower.join(0.2)
+            release.set()
+            leader.join(5)
+            follower.join(5)
+
+        assert results == ["shared", "shared"]
+        assert mock_completion.call_count == 1
+        assert [r["stage"] for r in run.records].count("llm_coalesced") == 1
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_cache_is_rechecked_under_lock(self, mock_completion, tmp_path):
+        """Test a result cached by another process while waiting is reused."""
+        client = LLMClient("gpt-4", cache_enabled=False)
+        client.cache = {}
+        client.cache_dir = tmp_path
+        key = client._get_cache_key("prompt")
+
+        # Simulate another process filling the cache between our lookup
+        # and acquiring the key's lock
+        with patch.object(client, "cache", wraps=client.cache) as cache:
+            cache.get.side_effect = [None, "from other process"]
+            assert client.generate_response("prompt") == "from other process"
+
+        mock_completion.assert_not_called()
+        assert (tmp_path / "locks" / f"{key}.lock").exists()
+
+    def test_from_config_builds_endpoints(self):
+        """Test configured endpoints and local models join the pool."""
+        config = LLMConfig(
+            api_key="main",
+            endpoints=[
+                {"api_key": "second"},
+                {"model": "openai/local", "base_url": "http://x/v1"},
+            ],
+            local_models=["ollama/llama2"],
+            balance_local_models=True,
+            breaker_failures=5,
+        )
+        client = LLMClient.from_config(config, model="gpt-4", cache_enabled=False)
+
+        assert [(e.model, e.api_key, e.base_url) for e in client.pool.endpoints] == [
+            ("gpt-4", "main", None),
+            ("gpt-4", "second", None),
+            ("openai/local", "main", "http://x/v1"),
+            ("ollama/llama2", None, None),
+        ]
+        assert client.pool.failure_threshold == 5
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_requests_rotate_across_endpoints(self, mock_completion):
+        """Test consecutive requests go to different endpoints."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "ok"
+        mock_completion.return_value = mock_response
+
+        client = LLMClient(
+            "gpt-4",
+            cache_enabled=False,
+            endpoints=[Endpoint("gpt-4", base_url="http://backup/v1")],
+        )
+        client.generate_response("one")
+        client.generate_response("two")
+
+        bases = [c[1].get("api_base") for c in mock_completion.call_args_list]
+        assert bases == [None, "http://backup/v1"]
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_failing_endpoint_is_skipped(self, mock_completion):
+        """Test an endpoint with an open breaker gets no requests."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "ok"
+        mock_completion.return_value = mock_response
+
+        client = LLMClient(
+            "gpt-4",
+            cache_enabled=False,
+            endpoints=[Endpoint("gpt-4", base_url="http://backup/v1")],
+            breaker_failures=1,
+        )
+        client.pool.record_failure(client.pool.endpoints[0])
+        client.generate_response("one")
+        client.generate_response("two")
+
+        bases = [c[1].get("api_base") for c in mock_completion.call_args_list]
+        assert bases == ["http://backup/v1", "http://backup/v1"]
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_slow_request_is_hedged(self, mock_completion):
+        """Test a duplicate on another endpoint wins over a slow request."""
+        release = threading.Event()
+
+        def complete(model, messages, **kwargs):
+            if kwargs.get("api_base") is None:
+                # The primary endpoint stalls
+                release.wait(5)
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = kwargs.get("api_base") or "primary"
+            return response
+
+        mock_completion.side_effect = complete
+        client = LLMClient(
+            "gpt-4",
+            cache_enabled=False,
+            endpoints=[Endpoint("gpt-4", base_url="http://backup/v1")],
+            hedge_percentile=50,
+        )
+        for _ in range(EndpointPool.MIN_HEDGE_SAMPLES):
+            client.pool.record_success(client.pool.endpoints[0], 0.01)
+
+        with metrics.collect() as run:
+            assert client.generate_response("prompt") == "http://backup/v1"
+        release.set()
+
+        hedges = [r for r in run.records if r.get("hedge")]
+        assert len(hedges) == 1
+        assert hedges[0]["endpoint"] == "gpt-4@http://backup/v1"
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_early_failure_is_hedged_at_once(self, mock_completion):
+        """Test a failed request goes to another endpoint without waiting."""
+        def complete(model, messages, **kwargs):
+            if kwargs.get("api_base") is None:
+                raise RuntimeError("primary is down")
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = "from backup"
+            return response
+
+        mock_completion.side_effect = complete
+        client = LLMClient(
+            "gpt-4",
+            cache_enabled=False,
+            endpoints=[Endpoint("gpt-4", base_url="http://backup/v1")],
+            hedge_percentile=50,
+            max_attempts=1,
+        )
+        for _ in range(EndpointPool.MIN_HEDGE_SAMPLES):
+            # A hedge delay far longer than the test
+            client.pool.record_success(client.pool.endpoints[0], 30.0)
+
+        start = time.perf_counter()
+        assert client.generate_response("prompt") == "from backup"
+        assert time.perf_counter() - start < 5
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_other_model_responses_are_not_cached(self, mock_completion, tmp_path):
+        """Test a fallback endpoint's model never fills the primary's cache."""
+        def complete(model, messages, **kwargs):
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = model
+            return response
+
+        mock_completion.side_effect = complete
+        client = LLMClient(
+            "gpt-4",
+            cache_enabled=False,
+            endpoints=[Endpoint("ollama/llama2", base_url="http://local:11434")],
+            breaker_failures=1,
+        )
+        client.cache = {}
+        client.cache_dir = tmp_path
+        client.pool.record_failure(client.pool.endpoints[0])
+
+        assert client.generate_response("prompt") == "ollama/llama2"
+        assert client.cache == {}
+
+        client.pool.record_success(client.pool.endpoints[0], 0.1)
+        client.pool.endpoints[1].opened_at = 0.0
+        assert client.generate_response("prompt") == "gpt-4"
+        assert list(client.cache.values()) == ["gpt-4"]
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_client_error_ends_probe(self, mock_completion):
+        """Test a probe rejected as a bad request can be retried."""
+        error = RuntimeError("bad request")
+        error.status_code = 400
+        mock_completion.side_effect = error
+        client = LLMClient(
+            "gpt-4",
+            cache_enabled=False,
+            breaker_failures=1,
+            breaker_cooldown=0,
+            max_attempts=1,
+        )
+        (endpoint,) = client.pool.endpoints
+        client.pool.record_failure(endpoint)
+
+        with pytest.raises(LLMError):
+            client.generate_response("prompt")
+
+        assert not endpoint.probing
+        assert client.pool.acquire() is endpoint
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_cancelled_probe_is_released(self, mock_completion):
+        """Test a probe that lost a hedge race doesn't block the endpoint."""
+        chunk = Mock()
+        chunk.choices = [Mock()]
+        chunk.choices[0].delta.content = "late"
+        mock_completion.return_value = iter([chunk])
+        client = LLMClient(
+            "gpt-4",
+            cache_enabled=False,
+            stream=True,
+            breaker_failures=1,
+            breaker_cooldown=0,
+        )
+        (endpoint,) = client.pool.endpoints
+        client.pool.record_failure(endpoint)
+        assert client.pool.acquire() is endpoint
+        cancel = threading.Event()
+        cancel.set()
+
+        with pytest.raises(_Cancelled):
+            client._attempt(endpoint, [], {"max_tokens": 100}, cancel=cancel)
+
+        assert not endpoint.probing
+        assert client.pool.acquire() is endpoint
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_api_key_is_not_exported(self, mock_completion, monkeypatch):
+        """Test endpoint keys are passed per call, not via the environment."""
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        mock_completion.return_value.choices = [Mock()]
+        mock_completion.return_value.choices[0].message.content = "ok"
+        client = LLMClient("gpt-4", api_key="secret", cache_enabled=False)
+
+        client.generate_response("prompt")
+
+        assert mock_completion.call_args[1]["api_key"] == "secret"
+        assert "OPENAI_API_KEY" not in os.environ
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_truncated_response_is_continued(self, mock_completion):
+        """Test a reply cut off at max_tokens is continued and joined."""
+        def reply(content, finish_reason):
+            response = Mock()
+            response.choices = [Mock(finish_reason=finish_reason)]
+            response.choices[0].message.content = content
+            return response
+
+        mock_completion.side_effect = [
+            reply('{"assignments": [', "length"),
+            reply("1, 2", "length"),
+            reply("]}", "stop"),
+        ]
+        client = LLMClient("openai/local", cache_enabled=False)
+
+        with metrics.collect() as run:
+            assert client.generate_response("prompt") == '{"assignments": [1, 2]}'
+
+        last_messages = mock_completion.call_args[1]["messages"]
+        assert last_messages[1] == {
+            "role": "assistant",
+            "content": '{"assignments": [1, 2',
+        }
+        assert last_messages[2]["content"] == CONTINUE_PROMPT
+        assert [r.get("continuation") for r in run.records] == [None, 1, 2]
+        assert [r["finish_reason"] for r in run.records] == ["length"] * 2 + ["stop"]
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_continuations_are_capped(self, mock_completion, tmp_path):
+        """Test the partial reply is raised, uncached, once continuations run out."""
+        response = Mock()
+        response.choices = [Mock(finish_reason="length")]
+        response.choices[0].message.content = "part"
+        mock_completion.return_value = response
+
+        client = LLMClient("openai/local", cache_enabled=False, max_continuations=1)
+        client.cache = {}
+        client.cache_dir = tmp_path
+
+        with pytest.raises(TruncatedResponse) as excinfo:
+            client.generate_response("prompt")
+        assert excinfo.value.content == "partpart"
+        assert not excinfo.value.retryable
+        assert mock_completion.call_count == 2
+        assert client.cache == {}
+
+    def test_cache_key_ignores_max_tokens(self):
+        """Test the output budget doesn't change which cache entry is used."""
+        client = LLMClient("gpt-4", cache_enabled=False)
+
+        assert client._get_cache_key("prompt", max_tokens=1024) == (
+            client._get_cache_key("prompt")
+        )
+        assert client._get_cache_key("prompt", temperature=0.5) != (
+            client._get_cache_key("prompt")
+        )
+
+    @patch('homework_generator.llm_client.litellm.get_model_info')
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_max_tokens_capped_at_model_limit(self, mock_completion, mock_info):
+        """Test max_tokens never exceeds what the model can produce."""
+        mock_info.return_value = {"max_output_tokens": 4096}
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "ok"
+        mock_completion.return_value = mock_response
+
+        client = LLMClient("gpt-4", cache_enabled=False)
+        client.generate_response("prompt", max_tokens=10000)
+
+        assert mock_completion.call_args[1]["max_tokens"] == 4096
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_transient_errors_are_retried(self, mock_completion):
+        """Test a rate limit is retried and recorded."""
+        rate_limited = Exception("slow down")
+        rate_limited.status_code = 429
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "ok"
+        mock_completion.side_effect = [rate_limited, mock_response]
+
+        client = LLMClient("openai/local", cache_enabled=False, retry_base_delay=0)
+        with metrics.collect() as run:
+            assert client.generate_response("prompt") == "ok"
+
+        (retry,) = [r for r in run.records if r["stage"] == "llm_retry"]
+        assert retry["category"] == "rate_limit"
+        assert retry["attempt"] == 1
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_client_errors_fail_fast(self, mock_completion):
+        """Test authentication errors are not retried."""
+        unauthorized = Exception("bad key")
+        unauthorized.status_code = 401
+        mock_completion.side_effect = unauthorized
+
+        client = LLMClient("openai/local", cache_enabled=False, retry_base_delay=0)
+        with pytest.raises(LLMError) as excinfo:
+            client.generate_response("prompt")
+
+        assert excinfo.value.category == "auth"
+        assert not excinfo.value.retryable
+        assert mock_completion.call_count == 1
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_retries_stop_after_max_attempts(self, mock_completion):
+        """Test persistent server errors give up after max_attempts."""
+        server_error = Exception("unavailable")
+        server_error.status_code = 503
+        mock_completion.side_effect = server_error
+
+        client = LLMClient(
+            "openai/local", cache_enabled=False, max_attempts=2, retry_base_delay=0
+        )
+        with pytest.raises(LLMError, match="unavailable"):
+            client.generate_response("prompt")
+
+        assert mock_completion.call_count == 2
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_deadline_limits_request_timeout(self, mock_completion):
+        """Test the time left in the job becomes the request timeout."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "ok"
+        mock_completion.return_value = mock_response
+
+        client = LLMClient("openai/local", cache_enabled=False)
+        with retries.deadline(30):
+            client.generate_response("prompt")
+
+        assert 0 < mock_completion.call_args[1]["timeout"] <= 30
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_expired_deadline_fails_without_request(self, mock_completion):
+        """Test no request is made once the deadline has passed."""
+        client = LLMClient("openai/local", cache_enabled=False)
+        with retries.deadline(0.001):
+            time.sleep(0.01)
+            with pytest.raises(LLMError) as excinfo:
+                client.generate_response("prompt")
+
+        assert excinfo.value.category == "deadline"
+        mock_completion.assert_not_called()
+
+    @patch('homework_generator.llm_client.litellm.completion')
+    def test_record_and_replay(self, mock_completion, tmp_path):
+        """Test recorded traffic is replayed without calling the provider."""
+        mock_response = Mock()
+        mock_response.choices = [Mock(finish_reason="stop")]
+        mock_response.choices[0].message.content = "recorded"
+        mock_response.usage = Mock(prompt_tokens=5, completion_tokens=7)
+        mock_completion.return_value = mock_response
+        path = tmp_path / "llm.jsonl"
+
+        recorder = LLMClient("gpt-4", cassette=Cassette(path, mode="record"))
+        assert recorder.cache is None
+        recorder.generate_response("prompt", max_tokens=100)
+        mock_completion.reset_mock()
+
+        player = LLMClient(
+            "gpt-4", cassette=Cassette(path), base_url="http://elsewhere/v1"
+        )
+        with metrics.collect() as run:
+            assert player.generate_response("prompt", max_tokens=100) == "recorded"
+
+        mock_completion.assert_not_called()
+        (request,) = run.records
+        assert request["tokens_in"] == 5
+        assert request["tokens_out"] == 7
+
+    def test_replay_miss_is_not_retried(self, tmp_path):
+        """Test a request missing from the cassette fails at once."""
+        path = tmp_path / "llm.jsonl"
+        path.write_text("")
+        client = LLMClient("gpt-4", cassette=Cassette(path), retry_base_delay=0)
+
+        with pytest.raises(LLMError) as excinfo:
+            client.generate_response("prompt")
+        assert excinfo.value.category == "replay_miss"
+
+    def test_from_config_opens_cassette(self, tmp_path):
+        """Test the configured cassette is opened in its mode."""
+        config = LLMConfig(
+            cassette=str(tmp_path / "llm.jsonl"), cassette_mode="record"
+        )
+        client = LLMClient.from_config(config, model="gpt-4")
+
+        assert client.cassette.mode == "record"
+        assert client.cache is None
@@ -0,0 +1,93 @@
+"""Tests for run metrics collection."""
+
+import io
+import json
+from homework_generator import metrics
+
+
+class TestMetrics:
+    """Tests for stage timing collection."""
+
+    def test_stage_without_collector_records_nothing(self):
+        """Test stages are no-ops when no collector is active."""
+        with metrics.stage("idle") as info:
+            info["tokens_in"] = 1
+
+        assert metrics.active() is None
+
+    def test_stage_records_timing_and_fields(self):
+        """Test a stage records its duration and added fields."""
+        with metrics.collect() as run:
+            with metrics.stage("llm_request", model="m") as info:
+                info["tokens_out"] = 42
+
+        (record,) = run.records
+        assert record["stage"] == "llm_request"
+        assert record["model"] == "m"
+        assert record["tokens_out"] == 42
+        assert record["seconds"] >= 0
+
+    def test_stage_records_on_exception(self):
+        """Test failed stages are still recorded."""
+        with metrics.collect() as run:
+            try:
+                with metrics.stage("failing"):
+                    raise ValueError("boom")
+            except ValueError:
+                pass
+
+        assert [r["stage"] for r in run.records] == ["failing"]
+
+    def test_collect_restores_previous(self):
+        """Test nested collectors restore the outer one."""
+        with metrics.collect() as outer:
+            with metrics.collect() as inner:
+                assert metrics.active() is inner
+            assert metrics.active() is outer
+        assert metrics.active() is None
+
+    def test_timed_iter(self):
+        """Test iterables are timed once exhausted."""
+        with metrics.collect() as run:
+            assert list(metrics.timed_iter("html_format", ["a", "b"])) == ["a", "b"]
+
+        (record,) = run.records
+        assert record["stage"] == "html_format"
+        assert record["fragments"] == 2
+
+    def test_timed_iter_without_collector(self):
+        """Test timed_iter returns the iterable untouched when disabled."""
+        items = ["a"]
+        assert metrics.timed_iter("html_format", items) is items
+
+    def test_summary_aggregates_stages(self):
+        """Test summary totals calls, time and tokens per stage."""
+        run = metrics.RunMetrics()
+        run.record("llm_request", 1.0, tokens_in=10, tokens_out=5, ttft=0.2)
+        run.record("llm_request", 2.0, tokens_in=20, tokens_out=7, ttft=0.4)
+        run.record("cache_lookup", 0.1, hit=False)
+
+        llm, cache = run.summary()
+        assert llm == {
+            "stage": "llm_request",
+            "calls": 2,
+            "seconds": 3.0,
+            "tokens_in": 30,
+            "tokens_out": 12,
+            "ttft": 0.2,
+        }
+        assert cache["hits"] == 0
+
+    def test_write_jsonl(self):
+        """Test records are written as JSON lines with context."""
+        run = metrics.RunMetrics()
+        run.record("prompt_build", 0.5)
+        run.record("parse_validate", 0.25)
+        stream = io.StringIO()
+
+        run.write_jsonl(stream, topic="fractions")
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line["stage"] for line in lines] == ["prompt_build", "parse_validate"]
+        assert all(line["topic"] == "fractions" for line in lines)
+        assert "timestamp" in lines[0]
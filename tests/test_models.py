@@ -2,7 +2,12 @@
 
 import pytest
 from pydantic import ValidationError
-from homework_generator.models import Assignment, HomeworkPacket, AssignmentRequest
+from homework_generator.models import (
+    MISSING_ANSWER,
+    Assignment,
+    AssignmentRequest,
+    HomeworkPacket,
+)
 
 
 class TestAssignmentRequest:
@@ -100,6 +105,31 @@ class TestAssignment:
                 questions=[]  # Empty list should fail validation
             )
 
+    def test_question_answers(self):
+        """Test questions pair with answers, marking missing ones."""
+        assignment = Assignment(
+            title="Test",
+            subject="Math",
+            difficulty="Easy",
+            questions=["1+1?", "2+2?"],
+            answers=["2"],
+        )
+
+        assert assignment.has_answers
+        assert assignment.question_answers() == [
+            ("1+1?", "2"),
+            ("2+2?", MISSING_ANSWER),
+        ]
+
+    def test_assignment_without_answers(self):
+        """Test answers are optional."""
+        assignment = Assignment(
+            title="Test", subject="Math", difficulty="Easy", questions=["1+1?"]
+        )
+
+        assert assignment.answers is None
+        assert not assignment.has_answers
+
 
 class TestHomeworkPacket:
     """Tests for HomeworkPacket model."""
@@ -0,0 +1,226 @@
+"""Tests for packet output formats."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from homework_generator import metrics
+from homework_generator.models import Assignment, HomeworkPacket, Student
+from homework_generator.versions import plan_versions
+from homework_generator.output import (
+    answer_key_path,
+    build_packet,
+    read_class_list,
+    student_path,
+    variant_path,
+    version_path,
+    write_class_set,
+    write_packet,
+)
+
+
+class TestWritePacket:
+    """Tests for writing packets without and with PDF rendering."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.assignments = [
+            Assignment(
+                title=f"Fractions {i}",
+                subject="Mathematics",
+                difficulty="Easy",
+                questions=["What is 1/2 + 1/4?", "Simplify 2/4"],
+                instructions="Show your work.",
+            )
+            for i in range(2)
+        ]
+        self.packet = build_packet(self.assignments, "fractions", "gpt-4o-mini")
+
+    def test_build_packet(self):
+        """Test packets carry topic, model and a timestamp."""
+        assert self.packet.topic == "fractions"
+        assert self.packet.model_used == "gpt-4o-mini"
+        assert self.packet.assignment_count == 2
+        assert self.packet.generated_at
+
+    def test_json(self, tmp_path):
+        """Test JSON output round-trips to a HomeworkPacket."""
+        path = tmp_path / "packet.json"
+        write_packet(self.packet, path, "json")
+
+        loaded = HomeworkPacket(**json.loads(path.read_text()))
+        assert loaded == self.packet
+
+    def test_json_worksheet_omits_answers(self, tmp_path):
+        """Test worksheet JSON leaves out the answers the answer key carries."""
+        for assignment in self.assignments:
+            assignment.answers = ["3/4", "1/2"]
+        path = tmp_path / "packet.json"
+        write_packet(self.packet, path, "json")
+
+        data = json.loads(path.read_text())
+        assert all("answers" not in a for a in data["assignments"])
+        assert "3/4" not in path.read_text()
+
+    def test_html(self, tmp_path):
+        """Test HTML output contains every assignment."""
+        path = tmp_path / "out" / "packet.html"
+        write_packet(self.packet, path, "html")
+
+        html = path.read_text()
+        assert html.startswith("<!DOCTYPE html>")
+        assert "Fractions 0" in html and "Fractions 1" in html
+
+    def test_markdown(self, tmp_path):
+        """Test Markdown output separates assignments with rules."""
+        path = tmp_path / "packet.md"
+        with metrics.collect() as run:
+            write_packet(self.packet, path, "md")
+
+        text = path.read_text()
+        assert "# Fractions 0" in text
+        assert "\n---\n" in text
+        assert "1. What is 1/2 + 1/4?" in text
+        assert [r["stage"] for r in run.records] == ["md_format"]
+
+    def test_pdf_uses_generator(self, tmp_path):
+        """Test PDF output streams packet HTML to the PDF generator."""
+        path = tmp_path / "packet.pdf"
+        with patch(
+            "homework_generator.pdf_generator.PDFGenerator.generate_pdf_from_fragments"
+        ) as generate:
+            write_packet(self.packet, path, "pdf")
+
+        fragments, output_path = generate.call_args[0]
+        assert "Fractions 1" in "".join(fragments)
+        assert output_path == path
+
+    def test_class_set_renders_once(self, tmp_path):
+        """Test class sets hand the packet HTML to one class-set render."""
+        students = [Student(name="Ana"), Student(name="Ben")]
+        with patch(
+            "homework_generator.pdf_generator.PDFGenerator.generate_class_set"
+        ) as generate:
+            paths = write_class_set(self.packet, tmp_path / "packet.pdf", students)
+
+        fragments, passed_students, output_paths = generate.call_args[0]
+        assert "Fractions 1" in "".join(fragments)
+        assert passed_students == students
+        assert (
+            output_paths
+            == paths
+            == [
+                tmp_path / "packet_01_Ana.pdf",
+                tmp_path / "packet_02_Ben.pdf",
+            ]
+        )
+
+    def test_answer_key_path(self):
+        """Test answer keys sit next to the packet with an _answers suffix."""
+        assert answer_key_path(Path("out/packet.pdf")) == Path("out/packet_answers.pdf")
+
+    def test_variant_path(self):
+        """Test packet versions are numbered from 1 with a _v suffix."""
+        assert variant_path(Path("out/packet.pdf"), 2) == Path("out/packet_v2.pdf")
+
+    def test_version_path(self):
+        """Test shuffled versions are suffixed with their label."""
+        assert version_path(Path("out/packet.pdf"), "B") == Path("out/packet_B.pdf")
+
+    @pytest.mark.parametrize("output_format", ["html", "md", "json"])
+    def test_version(self, tmp_path, output_format):
+        """Test a shuffled version is written in its own order and labeled."""
+        packet = build_packet(
+            [
+                a.model_copy(update={"title": f"Part {i}"})
+                for i, a in enumerate(self.assignments)
+            ],
+            "fractions",
+            "gpt-4o-mini",
+        )
+        version = next(
+            v
+            for v in plan_versions(packet.assignments, 5)
+            if v.assignment_order == [1, 0]
+        )
+        path = tmp_path / f"packet.{output_format}"
+        write_packet(packet, path, output_format, version=version)
+
+        text = path.read_text(encoding="utf-8")
+        assert text.index("Part 1") < text.index("Part 0")
+        if output_format != "json":
+            assert f"Version {version.label}" in text
+
+    def test_student_path(self):
+        """Test student copies are numbered and named after the student."""
+        student = Student(name="Zoë O'Neil")
+        assert student_path(Path("out/packet.pdf"), 3, student) == Path(
+            "out/packet_03_Zoë_O_Neil.pdf"
+        )
+
+    def test_read_class_list(self, tmp_path):
+        """Test class lists take a name and optional ID, skipping headers."""
+        path = tmp_path / "class.csv"
+        path.write_text("Name,ID\nAna Lopez,1001\n\nBen Okafor\n", encoding="utf-8")
+
+        assert read_class_list(path) == [
+            Student(name="Ana Lopez", student_id="1001"),
+            Student(name="Ben Okafor"),
+        ]
+
+    def test_answer_key_json(self, tmp_path):
+        """Test JSON answer keys pair questions with answers."""
+        self.packet.assignments[0].answers = ["3/4", "1/2"]
+        path = tmp_path / "key.json"
+        write_packet(self.packet, path, "json", answer_key=True)
+
+        data = json.loads(path.read_text())
+        assert data["topic"] == "fractions"
+        first, second = data["assignments"]
+        assert first["answers"][0] == {
+            "question": "What is 1/2 + 1/4?",
+            "answer": "3/4",
+        }
+        assert second["answers"][0]["answer"] == "(no answer provided)"
+
+    def test_answer_key_html(self, tmp_path):
+        """Test HTML answer keys use the answer-key layout."""
+        self.packet.assignments[0].answers = ["3/4", "1/2"]
+        path = tmp_path / "key.html"
+        write_packet(self.packet, path, "html", answer_key=True)
+
+        assert "Answer Key: Fractions 0" in path.read_text()
+
+    def test_unknown_format(self, tmp_path):
+        """Test unknown formats are rejected."""
+        with pytest.raises(ValueError, match="Unknown output format"):
+            write_packet(self.packet, tmp_path / "packet.txt", "txt")
+
+    def test_non_pdf_formats_skip_weasyprint(self, tmp_path):
+        """Test the CLI and non-PDF outputs never import WeasyPrint."""
+        code = (
+            "import sys\n"
+            "from pathlib import Path\n"
+            "import homework_generator.cli\n"
+            "from homework_generator.models import Assignment\n"
+            "from homework_generator.output import build_packet, write_packet\n"
+            "a = Assignment(title='T', subject='S', difficulty='E', questions=['Q'])\n"
+            "for fmt in ('html', 'md', 'json'):\n"
+            "    write_packet(build_packet([a], 't', 'm'), Path(sys.argv[1], fmt), fmt)\n"
+            "assert 'weasyprint' not in sys.modules\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code, str(tmp_path)],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).resolve().parents[1],
+            env={**os.environ, "LITELLM_LOCAL_MODEL_COST_MAP": "True"},
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["html", "json", "md"]
@@ -1,10 +1,13 @@
 """Tests for PDF generator module."""
 
+import io
+import os
 import pytest
 from pathlib import Path
 from unittest.mock import Mock, patch, mock_open
-from homework_generator.pdf_generator import PDFGenerator
-from homework_generator.models import Assignment
+from homework_generator import metrics, pdf_generator
+from homework_generator.pdf_generator import PDFGenerator, shared_font_config
+from homework_generator.models import Assignment, Student
 
 
 class TestPDFGenerator:
@@ -50,12 +53,18 @@ class TestPDFGenerator:
             
             # Verify HTML and CSS were created
             mock_html.assert_called_once_with(string=html_content)
-            mock_css.assert_called_once_with(string=css_content)
+            mock_css.assert_called_once_with(
+                string=css_content, font_config=shared_font_config()
+            )
             
-            # Verify PDF was generated with styles
-            mock_html_instance.write_pdf.assert_called_once_with(
-                str(output_path), 
-                stylesheets=[mock_css_instance]
+            # Verify PDF was laid out with styles and written
+            mock_html_instance.render.assert_called_once_with(
+                stylesheets=[mock_css_instance],
+                font_config=shared_font_config(),
+                **self.generator.pdf_options,
+            )
+            mock_html_instance.render.return_value.write_pdf.assert_called_once_with(
+                str(output_path), **self.generator.pdf_options
             )
     
     @patch('homework_generator.pdf_generator.HTML')
@@ -77,7 +86,14 @@ class TestPDFGenerator:
             mock_html.assert_called_once_with(string=html_content)
             
             # Verify PDF was generated without styles
-            mock_html_instance.write_pdf.assert_called_once_with(str(output_path))
+            mock_html_instance.render.assert_called_once_with(
+                stylesheets=[],
+                font_config=shared_font_config(),
+                **self.generator.pdf_options,
+            )
+            mock_html_instance.render.return_value.write_pdf.assert_called_once_with(
+                str(output_path), **self.generator.pdf_options
+            )
     
     @patch('homework_generator.pdf_generator.HTML')
     @patch('homework_generator.pdf_generator.CSS')
@@ -113,7 +129,7 @@ class TestPDFGenerator:
             
             # Verify PDF generation was called
             mock_html.assert_called_once()
-            mock_html_instance.write_pdf.assert_called_once()
+            mock_html_instance.render.return_value.write_pdf.assert_called_once()
             
             # Get the HTML content that was passed
             call_args = mock_html.call_args[1]  # keyword args
@@ -209,11 +225,302 @@ class TestPDFGenerator:
     
     def test_pdf_generator_initialization(self):
         """Test PDFGenerator initialization."""
-        # Test with default styles path
+        # Test with default (packaged) styles
         generator = PDFGenerator()
-        assert generator.styles_path == Path("templates/styles.css")
+        assert generator.styles_path is None
         
         # Test with custom styles path
         custom_path = Path("custom/styles.css")
         generator = PDFGenerator(styles_path=custom_path)
         assert generator.styles_path == custom_path
+
+    def test_load_packaged_styles(self, tmp_path, monkeypatch):
+        """Test packaged styles load regardless of the working directory."""
+        monkeypatch.chdir(tmp_path)
+        generator = PDFGenerator()
+
+        styles = generator._load_styles()
+        assert ".assignment" in styles
+        assert styles is PDFGenerator()._load_styles()
+
+    def test_load_theme_styles(self):
+        """Test the theme selects the packaged stylesheet."""
+        fast = PDFGenerator(theme="fast")._load_styles()
+
+        assert fast != PDFGenerator()._load_styles()
+        assert "display: flex" not in fast
+
+    def test_format_questions_html_escapes(self):
+        """Test questions are HTML-escaped."""
+        result = self.generator._format_questions_html(["x < y & z"])
+
+        assert result == "<ol><li>x &lt; y &amp; z</li></ol>"
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_generate_pdf_from_fragments(self, mock_html):
+        """Test fragments are streamed to WeasyPrint as a byte stream."""
+        mock_html_instance = Mock()
+        mock_html.return_value = mock_html_instance
+
+        with patch('pathlib.Path.exists', return_value=False):
+            self.generator.generate_pdf_from_fragments(
+                iter(["<html><body>", "<p>café</p>", "</body></html>"]),
+                Path("/tmp/test_fragments.pdf"),
+            )
+
+        kwargs = mock_html.call_args[1]
+        assert kwargs["encoding"] == "utf-8"
+        assert kwargs["file_obj"].read() == (
+            "<html><body><p>café</p></body></html>".encode("utf-8")
+        )
+        mock_html_instance.render.return_value.write_pdf.assert_called_once_with(
+            "/tmp/test_fragments.pdf", **self.generator.pdf_options
+        )
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_generate_pdf_records_stage_metrics(self, mock_html, tmp_path):
+        """Test parse, layout and write stages are timed when collecting."""
+        document = mock_html.return_value.render.return_value
+        document.pages = [Mock(), Mock()]
+        document.write_pdf.side_effect = (
+            lambda target, **options: Path(target).write_bytes(b"%PDF-1.7")
+        )
+
+        with patch('pathlib.Path.exists', return_value=False), \
+             metrics.collect() as run:
+            self.generator.generate_pdf("<p>x</p>", tmp_path / "metrics.pdf")
+
+        stages = [record["stage"] for record in run.records]
+        assert stages == ["pdf_parse", "pdf_layout", "pdf_write"]
+        assert run.records[1]["pages"] == 2
+        assert run.records[2]["bytes"] == 8
+
+    @patch('homework_generator.pdf_generator.HTML')
+    @patch('homework_generator.pdf_generator.CSS')
+    def test_stylesheet_parsed_once(self, mock_css, mock_html):
+        """Test the stylesheet is parsed once and reused across renders."""
+        with patch('pathlib.Path.exists', return_value=True), \
+             patch('pathlib.Path.read_text', return_value="body {}"):
+            self.generator.generate_pdf("<p>1</p>", Path("/tmp/test_1.pdf"))
+            self.generator.generate_pdf("<p>2</p>", Path("/tmp/test_2.pdf"))
+
+        mock_css.assert_called_once()
+        assert shared_font_config() is shared_font_config()
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_render_to_bytes(self, mock_html):
+        """Test PDFs can be rendered in memory from a string or fragments."""
+        document = mock_html.return_value.render.return_value
+        document.write_pdf.side_effect = (
+            lambda target, **options: target.write(b"%PDF-1.7")
+        )
+
+        with patch('pathlib.Path.exists', return_value=False), \
+             metrics.collect() as run:
+            assert self.generator.render_to_bytes("<p>x</p>") == b"%PDF-1.7"
+            assert self.generator.render_to_bytes(iter(["<p>", "x</p>"])) == b"%PDF-1.7"
+
+        assert mock_html.call_args_list[0][1] == {"string": "<p>x</p>"}
+        assert mock_html.call_args_list[1][1]["file_obj"].read() == b"<p>x</p>"
+        writes = [r for r in run.records if r["stage"] == "pdf_write"]
+        assert [r["bytes"] for r in writes] == [8, 8]
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_render_to_stream_unseekable(self, mock_html):
+        """Test rendering into a stream that cannot report its position."""
+        stream = Mock()
+        stream.seekable.return_value = False
+
+        with patch('pathlib.Path.exists', return_value=False), metrics.collect():
+            self.generator.render_to_stream("<p>x</p>", stream)
+
+        mock_html.return_value.render.return_value.write_pdf.assert_called_once_with(
+            stream, **self.generator.pdf_options
+        )
+        stream.tell.assert_not_called()
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_atomic_write(self, mock_html, tmp_path):
+        """Test atomic writes rename a complete file into place."""
+        generator = PDFGenerator(styles_path=self.styles_path, atomic_writes=True)
+        output_path = tmp_path / "out" / "packet.pdf"
+
+        def write_pdf(target, **options):
+            # The target is hidden until the write completes
+            assert not os.path.exists(output_path)
+            target.write(b"%PDF-1.7")
+
+        mock_html.return_value.render.return_value.write_pdf.side_effect = write_pdf
+
+        with patch('pathlib.Path.exists', return_value=False):
+            generator.generate_pdf("<p>x</p>", output_path)
+
+        assert output_path.read_bytes() == b"%PDF-1.7"
+        assert list(output_path.parent.iterdir()) == [output_path]
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_atomic_write_failure_cleans_up(self, mock_html, tmp_path):
+        """Test failed atomic writes leave neither target nor temp file."""
+        generator = PDFGenerator(styles_path=self.styles_path, atomic_writes=True)
+        mock_html.return_value.render.return_value.write_pdf.side_effect = (
+            RuntimeError("boom")
+        )
+
+        with patch('pathlib.Path.exists', return_value=False), \
+             pytest.raises(RuntimeError):
+            generator.generate_pdf("<p>x</p>", tmp_path / "packet.pdf")
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_default_pdf_options(self):
+        """Test defaults subset fonts, compress and leave images untouched."""
+        options = self.generator.pdf_options
+
+        assert options["full_fonts"] is False
+        assert options["uncompressed_pdf"] is False
+        assert options["optimize_images"] is False
+        assert options["pdf_variant"] is None
+        # Image caches are per render, not kept alive by the generator
+        assert "cache" not in options
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_output_options_passed_to_weasyprint(self, mock_html):
+        """Test output options reach both layout and PDF writing."""
+        generator = PDFGenerator(
+            styles_path=self.styles_path,
+            subset_fonts=False,
+            compress=False,
+            optimize_images=True,
+            jpeg_quality=70,
+            dpi=150,
+            pdf_variant="pdf/a-3b",
+        )
+
+        with patch('pathlib.Path.exists', return_value=False):
+            generator.generate_pdf("<p>x</p>", Path("/tmp/test_options.pdf"))
+
+        render_kwargs = mock_html.return_value.render.call_args[1]
+        write_kwargs = mock_html.return_value.render.return_value.write_pdf.call_args[1]
+        for kwargs in (render_kwargs, write_kwargs):
+            assert kwargs["full_fonts"] is True
+            assert kwargs["uncompressed_pdf"] is True
+            assert kwargs["optimize_images"] is True
+            assert kwargs["jpeg_quality"] == 70
+            assert kwargs["dpi"] == 150
+            assert kwargs["pdf_variant"] == "pdf/a-3b"
+
+    def test_from_config(self):
+        """Test generators can be built from the pdf config section."""
+        from homework_generator.config import PDFConfig
+
+        generator = PDFGenerator.from_config(
+            PDFConfig(theme="fast", compress=False, pdf_variant="pdf/ua-1")
+        )
+
+        assert generator.stylesheet == "styles-fast.css"
+        assert generator.pdf_options["uncompressed_pdf"] is True
+        assert generator.pdf_options["pdf_variant"] == "pdf/ua-1"
+
+
+def _pdf_bytes(pages, operator=None):
+    """Build a real PDF of blank letter pages, optionally drawing ``operator``."""
+    pypdf = pytest.importorskip("pypdf")
+    from pypdf.generic import DecodedStreamObject, NameObject
+
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        page = writer.add_blank_page(612, 792)
+        if operator:
+            stream = DecodedStreamObject()
+            stream.set_data(f"{operator}\n0 0 m 1 1 l S".encode())
+            page[NameObject("/Contents")] = writer._add_object(stream)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+class TestClassSet:
+    """Tests for per-student copies rendered from one layout."""
+
+    def setup_method(self):
+        """Set up students and a generator."""
+        self.generator = PDFGenerator()
+        self.students = [
+            Student(name="Ana Lopez", student_id="1001"),
+            Student(name='Ben "B" Okafor'),
+        ]
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_stamps_every_page_from_one_layout(self, mock_html, tmp_path):
+        """The packet is laid out once and each copy carries a stamp."""
+        import pypdf
+
+        packet = Mock()
+        packet.pages = [Mock()] * 3
+        packet.write_pdf.return_value = _pdf_bytes(3)
+        stamp = Mock()
+        stamp.render.return_value.write_pdf.return_value = _pdf_bytes(1, "0.123 w")
+        mock_html.side_effect = lambda **kwargs: (
+            stamp if "string" in kwargs else Mock(render=Mock(return_value=packet))
+        )
+        paths = [tmp_path / "a.pdf", tmp_path / "b.pdf"]
+
+        with metrics.collect() as run:
+            self.generator.generate_class_set(iter(["<p>x</p>"]), self.students, paths)
+
+        stages = [record["stage"] for record in run.records]
+        assert stages.count("pdf_layout") == 1
+        assert stages.count("pdf_stamp") == 2
+        for path in paths:
+            pages = pypdf.PdfReader(path).pages
+            assert len(pages) == 3
+            assert all(b"0.123 w" in page.get_contents().get_data() for page in pages)
+
+    @patch('homework_generator.pdf_generator.CSS')
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_stamp_keeps_only_page_geometry(self, mock_html, mock_css, tmp_path):
+        """The stamp uses the packet's page size and margins but no backgrounds."""
+        styles = tmp_path / "styles.css"
+        styles.write_text(
+            "body { background: #fde; }\n"
+            "@page { size: A5; margin: 2cm; background: yellow;\n"
+            "  @bottom-center { content: counter(page); } }"
+        )
+        mock_html.return_value.render.return_value.write_pdf.return_value = b"%PDF"
+        generator = PDFGenerator(styles_path=styles)
+
+        generator._render_stamp(self.students[0])
+
+        (css,) = [call[1]["string"] for call in mock_css.call_args_list]
+        assert "size: A5" in css and "margin: 2cm" in css
+        assert "background" not in css and "counter(page)" not in css
+        assert mock_html.return_value.render.call_args[1]["stylesheets"] == [
+            mock_css.return_value
+        ]
+
+    def test_stamp_css_quotes_names(self):
+        """Names are quoted safely in the stamp stylesheet."""
+        css = self.generator._stamp_css(self.students[1])
+        assert 'content: "Name: Ben \\"B\\" Okafor";' in css
+        assert "ID" in self.generator._stamp_css(self.students[0])
+
+    @patch('homework_generator.pdf_generator.HTML')
+    def test_without_pypdf_lays_out_each_copy(self, mock_html, tmp_path, monkeypatch):
+        """Without pypdf each copy is laid out with the stamp stylesheet."""
+        monkeypatch.setattr(pdf_generator, "PYPDF_AVAILABLE", False)
+        html_doc = mock_html.return_value
+        paths = [tmp_path / "a.pdf", tmp_path / "b.pdf"]
+
+        self.generator.generate_class_set("<p>x</p>", self.students, paths)
+
+        mock_html.assert_called_once()
+        assert html_doc.render.call_count == 2
+        written = [
+            call[0][0] for call in html_doc.render.return_value.write_pdf.call_args_list
+        ]
+        assert written == [str(path) for path in paths]
+
+    def test_one_path_per_student(self, tmp_path):
+        """Students and output paths must pair up."""
+        with pytest.raises(ValueError, match="one output path per student"):
+            self.generator.generate_class_set("<p>x</p>", self.students, [tmp_path])
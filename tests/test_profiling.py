@@ -0,0 +1,160 @@
+"""Tests for PDF render profiling."""
+
+import json
+import sys
+import time
+import types
+from unittest.mock import patch
+
+import pytest
+
+from homework_generator import metrics, profiling
+
+
+def _fake_weasyprint(monkeypatch):
+    """Install minimal weasyprint.document/layout modules to hook."""
+    document = types.ModuleType("weasyprint.document")
+    layout = types.ModuleType("weasyprint.layout")
+
+    def get_all_computed_styles(html):
+        return "styles"
+
+    def make_all_pages(context):
+        for page in ("p1", "p2"):
+            time.sleep(0.001)
+            yield page
+
+    class Page:
+        def paint(self, stream, scale=1):
+            return "painted"
+
+    document.get_all_computed_styles = get_all_computed_styles
+    document.Page = Page
+    layout.make_all_pages = make_all_pages
+    monkeypatch.setitem(sys.modules, "weasyprint.document", document)
+    monkeypatch.setitem(sys.modules, "weasyprint.layout", layout)
+    return document, layout
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+class TestStackSampler:
+    """Tests for the stack sampler."""
+
+    def test_writes_folded_stacks(self, tmp_path):
+        """Test samples are written as 'frame;frame count' lines."""
+        sampler = profiling.StackSampler(interval=0.0005)
+        sampler.start()
+        _busy(0.05)
+        sampler.stop()
+        path = tmp_path / "out.folded"
+        sampler.write_folded(path)
+
+        lines = path.read_text().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) >= 1
+        assert any("_busy" in line for line in lines)
+
+
+class TestLoadHtmlFragments:
+    """Tests for render input loading."""
+
+    def test_html_file(self, tmp_path):
+        """Test HTML files are returned as a single fragment."""
+        path = tmp_path / "packet.html"
+        path.write_text("<html></html>")
+
+        assert list(profiling.load_html_fragments(path)) == ["<html></html>"]
+
+    @pytest.mark.parametrize("wrap", [True, False])
+    def test_packet_json(self, tmp_path, wrap):
+        """Test packet JSON (object or bare list) is formatted to HTML."""
+        items = [
+            {
+                "title": "Fractions Practice",
+                "subject": "Mathematics",
+                "difficulty": "Easy",
+                "questions": ["What is 1/2 + 1/4?"],
+            }
+        ]
+        path = tmp_path / "packet.json"
+        path.write_text(json.dumps({"assignments": items} if wrap else items))
+
+        html = "".join(profiling.load_html_fragments(path))
+        assert "Fractions Practice" in html
+        assert "1/2 + 1/4" in html
+
+
+class TestPhaseHooks:
+    """Tests for WeasyPrint phase hooks."""
+
+    def test_times_phases_and_pages(self, monkeypatch):
+        """Test hooked functions record phase and per-page timings."""
+        document, layout = _fake_weasyprint(monkeypatch)
+        original_styles = document.get_all_computed_styles
+        report = profiling.ProfileReport()
+
+        with profiling.weasyprint_phase_hooks(report):
+            assert document.get_all_computed_styles(None) == "styles"
+            assert list(layout.make_all_pages(None)) == ["p1", "p2"]
+            assert document.Page().paint(None) == "painted"
+
+        assert "css_cascade" in report.phases
+        assert len(report.page_layout) == 2
+        assert report.page_layout[0] > 0
+        assert len(report.page_paint) == 1
+        assert report.pages == 2
+        assert len(report.page_costs()) == 2
+        # Originals are restored on exit
+        assert document.get_all_computed_styles is original_styles
+
+    def test_repagination_accumulates_per_page(self, monkeypatch):
+        """Test repeated layout passes add to the same page's cost."""
+        _, layout = _fake_weasyprint(monkeypatch)
+        report = profiling.ProfileReport()
+
+        with profiling.weasyprint_phase_hooks(report):
+            list(layout.make_all_pages(None))
+            first = list(report.page_layout)
+            list(layout.make_all_pages(None))
+
+        assert len(report.page_layout) == 2
+        assert report.page_layout[0] > first[0]
+
+
+class TestProfileRender:
+    """Tests for profile_render."""
+
+    def _fake_render(self, fragments, output_path):
+        with metrics.stage("pdf_parse"):
+            "".join(fragments)
+        with metrics.stage("pdf_write"):
+            output_path.write_bytes(b"%PDF")
+
+    @pytest.mark.parametrize("mode", ["sample", "cprofile"])
+    def test_reports_phases_and_writes_profile(self, tmp_path, mode):
+        """Test phases come from render stages and a profile is written."""
+        profile_path = tmp_path / "render.out"
+        with patch(
+            "homework_generator.pdf_generator.PDFGenerator.generate_pdf_from_fragments",
+            side_effect=self._fake_render,
+        ):
+            report = profiling.profile_render(
+                ["<html>", "</html>"], tmp_path / "out.pdf", profile_path, mode=mode
+            )
+
+        assert list(report.phases)[:2] == ["html_format", "html_parse"]
+        assert "pdf_write" in report.phases
+        assert report.total_seconds >= report.phases["pdf_write"]
+        assert report.profile_path == profile_path
+        assert profile_path.exists()
+
+    def test_unknown_mode(self, tmp_path):
+        """Test an unknown profile mode is rejected."""
+        with pytest.raises(ValueError):
+            profiling.profile_render([], tmp_path / "a.pdf", tmp_path / "a", mode="x")
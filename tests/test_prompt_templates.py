@@ -1,5 +1,7 @@
 """Tests for prompt template management."""
 
+import os
+import jinja2
 import pytest
 from pathlib import Path
 from homework_generator.prompt_templates import PromptTemplateManager
@@ -10,12 +12,15 @@ class TestPromptTemplateManager:
     
     def test_template_manager_initialization(self):
         """Test template manager initialization."""
-        manager = PromptTemplateManager(Path("templates/prompts"))
-        assert manager.templates_dir == Path("templates/prompts")
+        manager = PromptTemplateManager(Path("custom/prompts"))
+        assert manager.templates_dir == Path("custom/prompts")
+
+        manager = PromptTemplateManager()
+        assert manager.templates_dir is None
     
     def test_get_available_templates(self):
         """Test getting list of available templates."""
-        manager = PromptTemplateManager(Path("templates/prompts"))
+        manager = PromptTemplateManager()
         templates = manager.get_available_templates()
         
         # Should include the templates we created
@@ -26,7 +31,7 @@ class TestPromptTemplateManager:
     
     def test_render_existing_template(self):
         """Test rendering an existing template."""
-        manager = PromptTemplateManager(Path("templates/prompts"))
+        manager = PromptTemplateManager()
         
         try:
             result = manager.render_template(
@@ -45,7 +50,7 @@ class TestPromptTemplateManager:
     
     def test_render_nonexistent_template_fallback(self):
         """Test fallback to generic template for nonexistent templates."""
-        manager = PromptTemplateManager(Path("templates/prompts"))
+        manager = PromptTemplateManager()
         
         try:
             result = manager.render_template(
@@ -60,3 +65,92 @@ class TestPromptTemplateManager:
         except Exception:
             # Templates might not exist in test environment
             pytest.skip("Template files not available in test environment")
+
+
+class TestTemplateRegistry:
+    """Tests for the startup-built template registry."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.manager = PromptTemplateManager()
+
+    def test_packaged_templates_independent_of_cwd(self, tmp_path, monkeypatch):
+        """Test packaged templates are found from any working directory."""
+        monkeypatch.chdir(tmp_path)
+        manager = PromptTemplateManager()
+
+        assert "generic" in manager.get_available_templates()
+        assert "math" in manager.get_available_templates()
+
+    def test_front_matter_metadata(self):
+        """Test metadata is read from template front-matter."""
+        info = self.manager.get_template_info("math")
+
+        assert info is not None
+        assert info.subject == "Mathematics"
+        assert info.description
+
+    def test_default_count(self, tmp_path):
+        """Test default_count is read from front-matter and must be positive."""
+        (tmp_path / "generic.md").write_text("---\ndefault_count: 8\n---\nHi")
+        (tmp_path / "bad.md").write_text("---\ndefault_count: zero\n---\nHi")
+        manager = PromptTemplateManager(tmp_path)
+
+        assert manager.get_template_info("generic").default_count == 8
+        assert manager.get_template_info("bad").default_count is None
+        assert self.manager.get_template_info("math").default_count is None
+
+    def test_front_matter_not_rendered(self):
+        """Test front-matter is stripped from rendered output."""
+        result = self.manager.render_template(
+            "math", count=2, grade_level="4th Grade", topic="Fractions", difficulty="Easy"
+        )
+
+        assert not result.startswith("---")
+        assert "subject:" not in result
+        assert result.startswith("# Mathematics Assignment Generation")
+
+    def test_unknown_template_info(self):
+        """Test looking up an unknown template returns None."""
+        assert self.manager.get_template_info("nonexistent") is None
+
+    def test_render_does_not_touch_filesystem(self, tmp_path):
+        """Test renders are served from the registry once built."""
+        (tmp_path / "generic.md").write_text("Hello {{ topic }}")
+        manager = PromptTemplateManager(tmp_path)
+        (tmp_path / "generic.md").unlink()
+
+        assert manager.render_template("generic", topic="x") == "Hello x"
+
+    def test_missing_fallback_raises(self, tmp_path):
+        """Test rendering without a generic fallback raises TemplateNotFound."""
+        manager = PromptTemplateManager(tmp_path)
+
+        with pytest.raises(jinja2.TemplateNotFound):
+            manager.render_template("anything")
+
+    def test_reload_picks_up_changes(self, tmp_path):
+        """Test reload recompiles changed templates and tracks additions."""
+        template_path = tmp_path / "generic.md"
+        template_path.write_text("v1 {{ topic }}")
+        manager = PromptTemplateManager(tmp_path, auto_reload=True)
+        assert manager.render_template("generic", topic="t") == "v1 t"
+
+        template_path.write_text("---\nsubject: General\n---\nv2 {{ topic }}")
+        os.utime(template_path, (1, 1))
+        (tmp_path / "extra.md").write_text("extra")
+
+        assert manager.render_template("generic", topic="t") == "v2 t"
+        assert manager.get_template_info("generic").subject == "General"
+        assert manager.get_available_templates() == ["extra", "generic"]
+
+    def test_reload_drops_removed_templates(self, tmp_path):
+        """Test reload forgets templates deleted from disk."""
+        (tmp_path / "generic.md").write_text("generic")
+        (tmp_path / "old.md").write_text("old")
+        manager = PromptTemplateManager(tmp_path)
+
+        (tmp_path / "old.md").unlink()
+
+        assert manager.reload() == ["old"]
+        assert manager.get_available_templates() == ["generic"]
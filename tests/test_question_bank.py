@@ -0,0 +1,120 @@
+"""Tests for the question bank."""
+
+import pytest
+
+from homework_generator.models import Assignment
+from homework_generator.question_bank import QuestionBank
+
+
+def _assignment(title, questions, answers=None, subject="Mathematics"):
+    return Assignment(
+        title=title,
+        subject=subject,
+        difficulty="Medium",
+        questions=questions,
+        answers=answers,
+    )
+
+
+@pytest.fixture(params=[True, False], ids=["fts5", "like"])
+def bank(request, tmp_path):
+    bank = QuestionBank(tmp_path / "bank.db")
+    # Exercise the fallback used by SQLite builds without FTS5
+    bank.full_text = request.param
+    yield bank
+    bank.close()
+
+
+class TestQuestionBank:
+    """Tests for storing and retrieving assignments."""
+
+    def test_add_skips_duplicates(self, bank):
+        """The same assignment is stored once."""
+        assignment = _assignment("Fractions 1", ["What is 1/2 + 1/4?"])
+        assert bank.add([assignment], "adding fractions", "5th Grade", "medium") == 1
+        assert bank.add([assignment], "adding fractions", "5th Grade", "medium") == 0
+        assert len(bank) == 1
+
+    def test_search_matches_request(self, bank):
+        """Topic words, grade level and difficulty must all match."""
+        bank.add(
+            [_assignment("Fractions 1", ["What is 1/2 + 1/4?"])],
+            "adding fractions",
+            "5th Grade",
+            "medium",
+        )
+        bank.add(
+            [_assignment("Decimals 1", ["What is 0.5 + 0.25?"])],
+            "adding decimals",
+            "5th Grade",
+            "medium",
+        )
+
+        (found,) = bank.search("adding fractions", " 5th grade", "Medium")
+        assert found.title == "Fractions 1"
+        assert bank.search("fractions", "6th Grade", "medium") == []
+        assert bank.search("fractions", "5th Grade", "hard") == []
+        assert bank.search("photosynthesis", "5th Grade", "medium") == []
+
+    def test_template_filter(self, bank):
+        """Specific templates must match; generic matches any template."""
+        bank.add([_assignment("A", ["Q"])], "fractions", "5th", "easy", "math")
+
+        assert bank.search("fractions", "5th", "easy", template="science") == []
+        assert len(bank.search("fractions", "5th", "easy", template="math")) == 1
+        assert len(bank.search("fractions", "5th", "easy")) == 1
+
+    def test_answers(self, bank):
+        """Answer keys are returned only when requested and required then."""
+        bank.add(
+            [
+                _assignment("With key", ["Q1"], answers=["A1"]),
+                _assignment("Without key", ["Q2"]),
+            ],
+            "fractions",
+            "5th",
+            "easy",
+        )
+
+        (keyed,) = bank.search("fractions", "5th", "easy", include_answers=True)
+        assert keyed.answers == ["A1"]
+        assert all(a.answers is None for a in bank.search("fractions", "5th", "easy"))
+
+    def test_least_used_first(self, bank):
+        """Repeated searches rotate through the stored assignments."""
+        bank.add(
+            [_assignment(f"Sheet {i}", [f"Q{i}"]) for i in range(4)],
+            "fractions",
+            "5th",
+            "easy",
+        )
+
+        first = {a.title for a in bank.search("fractions", "5th", "easy", limit=2)}
+        second = {a.title for a in bank.search("fractions", "5th", "easy", limit=2)}
+        assert len(first) == len(second) == 2
+        assert not first & second
+
+    def test_topic_text_is_not_query_syntax(self, bank):
+        """Quotes and FTS operators in the topic are treated as words."""
+        bank.add([_assignment("A", ["Q"])], "fractions", "5th", "easy")
+        assert bank.search('fractions" OR "x', "5th", "easy") == []
+        assert bank.search("NOT fractions", "5th", "easy") == []
+
+    def test_persists(self, tmp_path):
+        """Stored assignments survive reopening the bank."""
+        path = tmp_path / "bank.db"
+        bank = QuestionBank(path)
+        bank.add([_assignment("A", ["Q"])], "fractions", "5th", "easy")
+        bank.close()
+
+        reopened = QuestionBank(path)
+        assert len(reopened.search("fractions", "5th", "easy")) == 1
+        reopened.close()
+
+    def test_expands_home(self, tmp_path, monkeypatch):
+        """A path under ~ is created in the home directory."""
+        monkeypatch.setenv("HOME", str(tmp_path))
+        bank = QuestionBank("~/.cache/homework-gen/question_bank.db")
+        assert bank.path == tmp_path / ".cache" / "homework-gen" / "question_bank.db"
+        assert bank.path.exists()
+        bank.close()
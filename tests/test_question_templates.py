@@ -0,0 +1,188 @@
+"""Tests for parameterized question templates."""
+
+import random
+
+import pytest
+
+from homework_generator.question_templates import (
+    AssignmentTemplate,
+    QuestionTemplate,
+    TemplateError,
+    Variable,
+    evaluate,
+    render,
+)
+
+
+def _sticker_question():
+    return QuestionTemplate(
+        text="{name} buys {packs} packs of {size} stickers. How many?",
+        answer="{packs * size} stickers",
+        variables=[
+            Variable(name="name", choices=["Maya", "Leo"]),
+            Variable(name="packs", min=2, max=9),
+            Variable(name="size", min=4, max=12),
+        ],
+    )
+
+
+class TestExpressions:
+    """Tests for evaluating and rendering template expressions."""
+
+    def test_arithmetic_and_functions(self):
+        """Arithmetic, comparisons and whitelisted functions evaluate."""
+        values = {"a": 12, "b": 8}
+        assert evaluate("a * b - 1", values) == 95
+        assert evaluate("gcd(a, b)", values) == 4
+        assert evaluate("a > b and a % b == 4", values) is True
+        assert evaluate("'big' if a > 10 else 'small'", values) == "big"
+
+    @pytest.mark.parametrize(
+        "expression",
+        [
+            "__import__('os')",
+            "a.__class__",
+            "[x for x in range(3)]",
+            "open('f')",
+            "2 ** 100000",
+            "'x' * 1000000",
+            "missing + 1",
+            "a / 0",
+        ],
+    )
+    def test_rejects_unsafe_or_invalid(self, expression):
+        """Anything outside the arithmetic subset raises TemplateError."""
+        with pytest.raises(TemplateError):
+            evaluate(expression, {"a": 1})
+
+    def test_render_formats_numbers(self):
+        """Integral floats print as integers, specs and braces are honored."""
+        values = {"price": 2.5, "qty": 4}
+        assert render("{price * qty}", values) == "10"
+        assert render("{price / 3}", values) == "0.833333"
+        assert render("${price:.2f} {{each}}", values) == "$2.50 {each}"
+
+    def test_render_tiny_values_as_zero(self):
+        """Values that round to zero print as 0, without a dot or sign."""
+        assert render("{a}", {"a": 1e-9}) == "0"
+        assert render("{a}", {"a": -1e-9}) == "0"
+        assert render("{a}", {"a": -0.25}) == "-0.25"
+
+    def test_render_rejects_bad_format_spec(self):
+        """A spec that doesn't fit the value raises TemplateError."""
+        with pytest.raises(TemplateError, match="Cannot format 'name'"):
+            render("{name:.2f}", {"name": "Maya"})
+
+
+class TestQuestionTemplate:
+    """Tests for instantiating question and assignment templates."""
+
+    def test_answers_follow_variables(self):
+        """The answer is computed from the values in the question."""
+        rng = random.Random(1)
+        for _ in range(20):
+            question, answer = _sticker_question().instantiate(rng)
+            words = question.split()
+            assert answer == f"{int(words[2]) * int(words[5])} stickers"
+
+    def test_constraints(self):
+        """Only values satisfying every constraint are used."""
+        template = QuestionTemplate(
+            text="{a} - {b}",
+            answer="{a - b}",
+            variables=[
+                Variable(name="a", min=0, max=9),
+                Variable(name="b", min=0, max=9),
+            ],
+            constraints=["a > b"],
+        )
+        rng = random.Random(0)
+        assert all(int(template.instantiate(rng)[1]) > 0 for _ in range(50))
+
+    def test_unsatisfiable_constraints(self):
+        """Constraints no sample meets raise TemplateError."""
+        template = QuestionTemplate(
+            text="{a}",
+            answer="{a}",
+            variables=[Variable(name="a", min=1, max=3)],
+            constraints=["a > 5"],
+        )
+        with pytest.raises(TemplateError, match="No values satisfy"):
+            template.instantiate(random.Random(0))
+
+    def test_zero_divisor_is_resampled(self):
+        """Samples that can't be evaluated are drawn again, not fatal."""
+        template = QuestionTemplate(
+            text="{a} / {b}",
+            answer="{a / b}",
+            variables=[
+                Variable(name="a", min=0, max=12),
+                Variable(name="b", min=0, max=3),
+            ],
+            constraints=["a % b == 0"],
+        )
+        assignment = AssignmentTemplate(
+            title="Division",
+            subject="Mathematics",
+            difficulty="Easy",
+            # Failing in a constraint and failing while rendering the answer
+            questions=[template, template.model_copy(update={"constraints": []})] * 2,
+        )
+
+        assert len(assignment.valid_questions().questions) == 4
+        for seed in range(50):
+            for question in assignment.instantiate(f"0:{seed}").questions:
+                assert not question.endswith("/ 0")
+
+    def test_bad_format_spec_is_dropped(self):
+        """A question whose format spec never fits is left out."""
+        assignment = AssignmentTemplate(
+            title="Stickers",
+            subject="Mathematics",
+            difficulty="Easy",
+            questions=[
+                _sticker_question(),
+                _sticker_question().model_copy(update={"text": "{name:.2f}"}),
+            ],
+        )
+
+        assert assignment.valid_questions().questions == [_sticker_question()]
+
+    def test_decimal_variables(self):
+        """Decimal ranges respect step and decimal places."""
+        variable = Variable(name="p", min=0.5, max=2, step=0.25, decimals=2)
+        rng = random.Random(0)
+        values = {variable.sample(rng) for _ in range(200)}
+        assert values <= {0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0}
+
+    def test_invalid_variable(self):
+        """Variables need a range or choices."""
+        with pytest.raises(ValueError):
+            Variable(name="a", min=5)
+
+    def test_seeded_variants(self):
+        """Seeds are reproducible and different seeds give different versions."""
+        assignment = AssignmentTemplate(
+            title="Stickers",
+            subject="Mathematics",
+            difficulty="Easy",
+            questions=[_sticker_question()] * 5,
+        )
+        first = assignment.instantiate("0:0", include_answers=True)
+        assert first == assignment.instantiate("0:0", include_answers=True)
+        assert first.questions != assignment.instantiate("0:1").questions
+        assert len(first.answers) == 5
+        assert assignment.instantiate("0:0").answers is None
+
+    def test_valid_questions_drops_broken_templates(self):
+        """Questions whose expressions fail are removed."""
+        assignment = AssignmentTemplate(
+            title="Mixed",
+            subject="Mathematics",
+            difficulty="Easy",
+            questions=[
+                _sticker_question(),
+                QuestionTemplate(text="{undefined}", answer="1", variables=[]),
+            ],
+        )
+        assert len(assignment.valid_questions().questions) == 1
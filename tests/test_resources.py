@@ -0,0 +1,77 @@
+"""Tests for packaged resource loading."""
+
+import subprocess
+import sys
+import zipfile
+import pytest
+from pathlib import Path
+from homework_generator import resources
+
+
+class TestResources:
+    """Tests for the importlib.resources-based resource layer."""
+
+    def test_read_text_styles(self):
+        """Test reading the packaged stylesheet."""
+        assert ".assignment" in resources.read_text("styles.css")
+
+    def test_read_text_nested(self):
+        """Test reading a resource in a subdirectory."""
+        assert "{{ topic }}" in resources.read_text("prompts/generic.md")
+
+    def test_read_text_cached(self):
+        """Test resources are read once and shared."""
+        assert resources.read_text("styles.css") is resources.read_text("styles.css")
+
+    def test_read_text_missing(self):
+        """Test missing resources raise FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            resources.read_text("missing.css")
+
+    def test_list_resources(self):
+        """Test listing resources by suffix."""
+        prompts = resources.list_resources("prompts", ".md")
+
+        assert "generic.md" in prompts
+        assert prompts == sorted(prompts)
+        assert resources.list_resources("missing", ".md") == []
+
+    def test_theme_stylesheet(self):
+        """Test every theme maps to a packaged stylesheet."""
+        for theme in resources.THEME_STYLESHEETS:
+            assert ".assignment" in resources.read_text(
+                resources.theme_stylesheet(theme)
+            )
+
+        with pytest.raises(ValueError, match="Unknown theme"):
+            resources.theme_stylesheet("missing")
+
+    def test_templates_load_from_zip(self, tmp_path):
+        """Test templates resolve when the package is imported from a zip."""
+        package_dir = Path(resources.__file__).parent
+        archive = tmp_path / "app.zip"
+        with zipfile.ZipFile(archive, "w") as zf:
+            for path in package_dir.rglob("*"):
+                if path.is_file() and "__pycache__" not in path.parts:
+                    zf.write(path, path.relative_to(package_dir.parent))
+
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1]);"
+            "from homework_generator.prompt_templates import PromptTemplateManager;"
+            "m = PromptTemplateManager();"
+            "print(m.get_template_info('math').subject);"
+            "print(m.render_template('math', count=1, topic='t',"
+            " grade_level='g', difficulty='d').splitlines()[0])"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script, str(archive)],
+            capture_output=True,
+            text=True,
+            cwd=tmp_path,
+        )
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.splitlines() == [
+            "Mathematics",
+            "# Mathematics Assignment Generation",
+        ]
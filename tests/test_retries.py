@@ -0,0 +1,98 @@
+"""Tests for the LLM retry policy helpers."""
+
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from homework_generator import retries
+
+
+def http_error(status, headers=None):
+    """Exception shaped like a litellm error for an HTTP status."""
+    error = Exception(f"HTTP {status}")
+    error.status_code = status
+    error.response = Mock(headers=headers or {})
+    return error
+
+
+class TestClassifyError:
+    """Tests for error classification."""
+
+    @pytest.mark.parametrize(
+        "status,category",
+        [
+            (429, "rate_limit"),
+            (408, "timeout"),
+            (401, "auth"),
+            (403, "auth"),
+            (400, "client"),
+            (404, "client"),
+            (500, "server"),
+            (503, "server"),
+        ],
+    )
+    def test_http_status(self, status, category):
+        """Test errors are classified by their HTTP status code."""
+        assert retries.classify_error(http_error(status)) == category
+
+    def test_transport_errors(self):
+        """Test timeouts and connection errors without a status code."""
+        assert retries.classify_error(TimeoutError()) == "timeout"
+        assert retries.classify_error(ConnectionResetError()) == "connection"
+
+        class ReadTimeout(Exception):
+            pass
+
+        assert retries.classify_error(ReadTimeout()) == "timeout"
+        assert retries.classify_error(ValueError("bad")) == "unknown"
+
+    def test_retryable_categories(self):
+        """Test only transient categories are retried."""
+        assert "rate_limit" in retries.RETRYABLE_CATEGORIES
+        assert "auth" not in retries.RETRYABLE_CATEGORIES
+        assert "client" not in retries.RETRYABLE_CATEGORIES
+
+
+class TestBackoff:
+    """Tests for backoff computation."""
+
+    def test_full_jitter_bounds(self):
+        """Test the delay is drawn up to the capped exponential backoff."""
+        assert retries.full_jitter(1, 0.5, 10, rng=lambda: 1.0) == 0.5
+        assert retries.full_jitter(3, 0.5, 10, rng=lambda: 1.0) == 2.0
+        assert retries.full_jitter(10, 0.5, 10, rng=lambda: 1.0) == 10
+        assert retries.full_jitter(3, 0.5, 10, rng=lambda: 0.0) == 0.0
+
+    def test_retry_after(self):
+        """Test the Retry-After header is read when present and numeric."""
+        assert retries.retry_after(http_error(429, {"retry-after": "7"})) == 7.0
+        assert retries.retry_after(http_error(429)) is None
+        assert retries.retry_after(http_error(429, {"retry-after": "soon"})) is None
+        assert retries.retry_after(ValueError()) is None
+
+
+class TestDeadline:
+    """Tests for job deadlines."""
+
+    def test_no_deadline(self):
+        """Test there is no time limit outside a deadline block."""
+        assert retries.time_left() is None
+        with retries.deadline(None):
+            assert retries.time_left() is None
+
+    def test_nested_deadlines_only_tighten(self):
+        """Test an inner deadline cannot extend the outer one."""
+        with retries.deadline(5):
+            with retries.deadline(60):
+                assert retries.time_left() <= 5
+            with retries.deadline(1):
+                assert retries.time_left() <= 1
+        assert retries.time_left() is None
+
+    def test_time_left_decreases(self):
+        """Test the remaining time counts down."""
+        with retries.deadline(10):
+            first = retries.time_left()
+            time.sleep(0.01)
+            assert retries.time_left() < first
@@ -0,0 +1,118 @@
+"""Tests for single-flight de-duplication."""
+
+import threading
+
+import pytest
+
+from homework_generator.single_flight import SingleFlight, file_lock
+
+
+class TestSingleFlight:
+    """Tests for in-process coalescing of identical calls."""
+
+    def test_sequential_calls_each_run(self):
+        """Test calls that do not overlap are not coalesced."""
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            return len(calls)
+
+        assert flight.do("k", work) == (1, False)
+        assert flight.do("k", work) == (2, False)
+        assert flight.in_flight() == 0
+
+    def test_concurrent_calls_share_result(self):
+        """Test concurrent callers with the same key wait for one call."""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+        leader.start()
+        started.wait(5)
+
+        followers = [
+            threading.Thread(target=lambda: results.append(flight.do("k", work)))
+            for _ in range(3)
+        ]
+        for thread in followers:
+            thread.start()
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        assert len(calls) == 1
+        assert sorted(results) == [("result", False)] + [("result", True)] * 3
+
+    def test_error_is_shared_and_key_released(self):
+        """Test a failed call raises for waiters and does not stick."""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise ValueError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("k", fail)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=call)
+        follower.start()
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        assert len(errors) == 2
+        assert flight.in_flight() == 0
+        assert flight.do("k", lambda: "ok") == ("ok", False)
+
+
+class TestFileLock:
+    """Tests for the cross-process lock file."""
+
+    def test_creates_lock_file(self, tmp_path):
+        """Test the lock file and its directory are created."""
+        path = tmp_path / "locks" / "key.lock"
+        with file_lock(path):
+            assert path.exists()
+
+    def test_excludes_other_holders(self, tmp_path):
+        """Test a second holder blocks until the first releases."""
+        pytest.importorskip("fcntl")
+        path = tmp_path / "key.lock"
+        order = []
+
+        def second():
+            with file_lock(path):
+                order.append("second")
+
+        with file_lock(path):
+            # flock locks belong to the open file, so a second open in
+            # another thread contends like another process would
+            thread = threading.Thread(target=second)
+            thread.start()
+            thread.join(0.2)
+            order.append("first")
+        thread.join(5)
+
+        assert order == ["first", "second"]
@@ -0,0 +1,119 @@
+"""Tests for optional span tracing."""
+
+import json
+import pytest
+from unittest.mock import Mock
+from homework_generator import tracing
+from homework_generator.content_generator import ContentGenerator
+from homework_generator.formatter import AssignmentFormatter
+
+
+class TestTracing:
+    """Tests for tracing hooks and exporters."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.exporter = tracing.InMemorySpanExporter()
+
+    def teardown_method(self):
+        """Leave tracing disabled for other tests."""
+        tracing.disable()
+
+    def test_traced_disabled_calls_through(self):
+        """Test traced functions run normally with tracing disabled."""
+        func = tracing.traced("test")(lambda x: x * 2)
+
+        assert not tracing.is_enabled()
+        assert func(3) == 6
+
+    def test_traced_records_span(self):
+        """Test enabled tracing exports a span per call."""
+        tracing.enable(self.exporter)
+        func = tracing.traced("double")(lambda x: x * 2)
+
+        assert func(2) == 4
+        (span,) = self.exporter.spans
+        assert span.name == "double"
+        assert span.status == "OK"
+        assert span.end_time_ns >= span.start_time_ns
+
+    def test_nested_spans_share_trace(self):
+        """Test inner spans are parented to the enclosing span."""
+        tracing.enable(self.exporter)
+
+        @tracing.traced("inner")
+        def inner():
+            tracing.set_attribute("key", "value")
+
+        with tracing.span("outer"):
+            inner()
+
+        inner_span, outer_span = self.exporter.spans
+        assert inner_span.parent_id == outer_span.span_id
+        assert inner_span.trace_id == outer_span.trace_id
+        assert outer_span.parent_id is None
+        assert inner_span.attributes == {"key": "value"}
+
+    def test_exception_marks_span(self):
+        """Test exceptions are recorded and re-raised."""
+        tracing.enable(self.exporter)
+
+        @tracing.traced("failing")
+        def failing():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            failing()
+
+        (span,) = self.exporter.spans
+        assert span.status == "ERROR"
+        assert span.attributes["exception.type"] == "ValueError"
+
+    def test_set_attribute_disabled_is_noop(self):
+        """Test set_attribute does nothing without tracing."""
+        tracing.set_attribute("key", "value")
+
+    def test_file_exporter(self, tmp_path):
+        """Test spans are written to a JSON-lines file."""
+        path = tmp_path / "spans.jsonl"
+        tracing.enable(tracing.FileSpanExporter(str(path)))
+
+        with tracing.span("a"):
+            pass
+        with tracing.span("b"):
+            pass
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["name"] for line in lines] == ["a", "b"]
+        assert lines[0]["start_time_unix_nano"] <= lines[0]["end_time_unix_nano"]
+
+    def test_pipeline_spans(self):
+        """Test generation and formatting emit their spans."""
+        tracing.enable(self.exporter)
+        client = Mock()
+        client.model = "test-model"
+        client.generate_response.return_value = json.dumps(
+            {
+                "assignments": [
+                    {
+                        "title": "T",
+                        "grade_level": "5th Grade",
+                        "subject": "Math",
+                        "difficulty": "Easy",
+                        "instructions": "Do it.",
+                        "questions": ["1 + 1?"],
+                    }
+                ]
+            }
+        )
+
+        assignments = ContentGenerator(client).generate_assignments(
+            "addition", 1, "easy", "5th Grade"
+        )
+        AssignmentFormatter().format_packet(assignments)
+
+        assert [span.name for span in self.exporter.spans] == [
+            "content.build_prompt",
+            "content.validate_response",
+            "formatter.format_packet",
+        ]
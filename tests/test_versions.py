@@ -0,0 +1,87 @@
+"""Tests for shuffled packet versions."""
+
+from homework_generator.models import Assignment
+from homework_generator.versions import apply_version, plan_versions, version_label
+
+
+def make_assignments(count=3, questions=5, answers=True):
+    return [
+        Assignment(
+            title=f"Assignment {i}",
+            subject="Mathematics",
+            difficulty="Easy",
+            questions=[f"Question {i}.{j}" for j in range(questions)],
+            answers=[f"Answer {i}.{j}" for j in range(questions)] if answers else None,
+        )
+        for i in range(count)
+    ]
+
+
+class TestVersions:
+    """Tests for planning and applying versions."""
+
+    def test_version_labels(self):
+        """Test versions are lettered like spreadsheet columns."""
+        assert [version_label(i) for i in (0, 1, 25, 26, 27)] == [
+            "A",
+            "B",
+            "Z",
+            "AA",
+            "AB",
+        ]
+
+    def test_version_a_is_original(self):
+        """Test the first version keeps the packet as generated."""
+        assignments = make_assignments()
+
+        first = plan_versions(assignments, 3)[0]
+
+        assert first.label == "A"
+        assert apply_version(assignments, first) == assignments
+
+    def test_versions_differ_and_keep_questions(self):
+        """Test later versions reorder the same questions."""
+        assignments = make_assignments()
+
+        versions = plan_versions(assignments, 4)
+
+        orders = {
+            tuple(q for a in apply_version(assignments, v) for q in a.questions)
+            for v in versions
+        }
+        assert len(orders) == 4
+        for order in orders:
+            assert sorted(order) == sorted(q for a in assignments for q in a.questions)
+
+    def test_seeded(self):
+        """Test the same seed plans the same versions and another seed doesn't."""
+        assignments = make_assignments()
+
+        assert plan_versions(assignments, 3, seed=7) == plan_versions(
+            assignments, 3, seed=7
+        )
+        assert plan_versions(assignments, 3, seed=7) != plan_versions(
+            assignments, 3, seed=8
+        )
+
+    def test_answers_follow_questions(self):
+        """Test answers are reordered with their questions, short lists padded."""
+        assignments = make_assignments(count=1)
+        assignments[0].answers = assignments[0].answers[:3]
+
+        for version in plan_versions(assignments, 3):
+            (reordered,) = apply_version(assignments, version)
+            for question, answer in reordered.question_answers():
+                index = question.split(" ")[1]
+                if int(index.split(".")[1]) < 3:
+                    assert answer == f"Answer {index}"
+                else:
+                    assert answer != f"Answer {index}"
+                    assert len(reordered.answers) == 5
+
+    def test_keep_assignment_order(self):
+        """Test assignments can stay in place while questions move."""
+        assignments = make_assignments()
+
+        for version in plan_versions(assignments, 3, shuffle_assignments=False):
+            assert version.assignment_order == [0, 1, 2]